@@ -1,13 +1,16 @@
-import Shovel_Classes
+import Shovel_Daemon
 import sys
-import toolkit
 
 if __name__ == '__main__':
     try:
         wb_name = sys.argv[1]
-        extract = Shovel_Classes.Extractor(shovel_wb=wb_name, extract_all=True)
-        extract.process_flow()
+        backend = sys.argv[2] if len(sys.argv) > 2 else "com" # "openpyxl" with a workbook path runs without Excel
+        if not Shovel_Daemon.run_job("extract", wb_name, backend, run_all=True): # no daemon running, runs in this process
+            import Shovel_Classes
+            extract = Shovel_Classes.Extractor(shovel_wb=wb_name, extract_all=True, backend=backend)
+            extract.process_flow()
     except Exception as e:
+        import toolkit
         toolkit.error_occur(e)
 
 # wb_name = "Shovel.xlsm"
@@ -1,11 +1,14 @@
-import Shovel_Classes
+import Shovel_Daemon
 import sys
-import toolkit
 
 if __name__ == '__main__':
     try:
         wb_name = sys.argv[1]
-        load = Shovel_Classes.Loader(shovel_wb=wb_name, load_all=True)
-        load.extract_to_table()
+        backend = sys.argv[2] if len(sys.argv) > 2 else "com" # "openpyxl" with a workbook path runs without Excel
+        if not Shovel_Daemon.run_job("load", wb_name, backend, run_all=True): # no daemon running, runs in this process
+            import Shovel_Classes
+            load = Shovel_Classes.Loader(shovel_wb=wb_name, load_all=True, backend=backend)
+            load.extract_to_table()
     except Exception as e:
+        import toolkit
         toolkit.error_occur(e)
\ No newline at end of file
@@ -0,0 +1,12 @@
+import Shovel_Classes
+import sys
+import toolkit
+
+if __name__ == '__main__':
+    try:
+        wb_name = sys.argv[1]
+        backend = sys.argv[2] if len(sys.argv) > 2 else "com" # "openpyxl" with a workbook path runs without Excel
+        extract = Shovel_Classes.Extractor(shovel_wb=wb_name, backend=backend, dry_run=True) # no Plaxis connection
+        extract.process_flow()
+    except Exception as e:
+        toolkit.error_occur(e)
@@ -0,0 +1,934 @@
+import functools
+import importlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import Counter
+from contextlib import ExitStack
+from unittest import mock
+import numpy as np
+from Shovel_Soil import synthetic_mesh
+
+### Notes ###
+
+# Offline benchmarks of Loader.extract_to_table and Extractor.process_flow, runnable on Linux.
+# Plaxis is replaced by FakePlaxis (plx.new_server, s.open, g.getresults, phases/elements/ResultTypes)
+# with configurable latency and node count, listening on a local socket once "launched" so that the
+# Boilerplate readiness probing and reconnection run for real (FakePlaxisPool: one per port for the worker pool). Excel by FakeExcel, which implements the part of the
+# COM ListObject/Range surface used by ExcelTable on an in-memory sheet. Every fake COM member access
+# and every remote Plaxis call is counted.
+# Each run appends one JSON line per scenario to the results file, tagged with the current commit,
+# so that results can be compared across commits.
+# The memory scenario measures the peak RSS of the result layouts, each in its own process as the peak never drops.
+# Usage: python Shovel_Benchmark.py [results file] [node count]
+
+#################### Simulated Plaxis ####################
+
+class FakeValue:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+class FakePlaxisObject:
+    def __init__(self, name: str = None, identification: str = None):
+        self.Name = FakeValue(name)
+        self.Identification = FakeValue(identification)
+
+RESULT_TYPES = {"Plate": ["X", "Y", "Ux", "Uy", "Utot", "Nx2D", "Q2D", "M2D", "Nx2D_EnvelopeMax2D", "Nx2D_EnvelopeMin2D",
+                           "M2D_EnvelopeMax2D", "M2D_EnvelopeMin2D"],
+                 "Interface": ["X", "Y", "Ux", "Uy", "InterfaceEffectiveNormalStress", "InterfaceShearStress",
+                               "InterfaceRelativeShearStress"],
+                 "Soil": ["X", "Y", "Ux", "Uy", "Utot", "SigmaxxE", "SigmayyE", "SigmaE_1", "PActive", "PExcess"],
+                 "EmbeddedBeamRow": ["X", "Y", "Ux", "Uy", "N", "Q", "M", "Tskin"],
+                 "NodeToNodeAnchor": ["X", "Y", "Ux", "Uy", "AnchorForce2D"]}
+
+class FakeResultTypes:
+    """ g.ResultTypes, <Type>.<Property> resolves to the string "<Type>.<Property>" for the members of RESULT_TYPES.
+        dir() lists the members, a missing one raises AttributeError like the server does
+    """
+    def __init__(self, plaxis):
+        self.plaxis = plaxis
+
+    def __getattr__(self, elem_type):
+        if elem_type not in RESULT_TYPES:
+            raise AttributeError(elem_type)
+        return _FakeResultGroup(self.plaxis, elem_type)
+
+    def __dir__(self):
+        return list(RESULT_TYPES)
+
+class _FakeResultGroup:
+    def __init__(self, plaxis, elem_type):
+        self.plaxis = plaxis
+        self.elem_type = elem_type
+
+    def __getattr__(self, prop):
+        if prop.startswith("__"):
+            raise AttributeError(prop)
+        time.sleep(self.plaxis.latency) # every lookup is a server round trip
+        self.plaxis.calls['lookup'] += 1
+        if prop not in RESULT_TYPES[self.elem_type]:
+            self.plaxis.calls['failed_lookup'] += 1
+            raise AttributeError(f"{self.elem_type} has no result type {prop}")
+        return f"{self.elem_type}.{prop}"
+
+    def __dir__(self):
+        self.plaxis.calls['dir'] += 1
+        return list(RESULT_TYPES[self.elem_type])
+
+class FakeServer:
+    """ s of plx.new_server
+    """
+    def __init__(self, plaxis):
+        self.plaxis = plaxis
+        self.active = True
+
+    def open(self, path):
+        time.sleep(self.plaxis.open_latency)
+        self.plaxis.calls['open'] += 1
+
+class FakeGlobal:
+    """ g of plx.new_server, with plates Plate_1...Plate_n and phases Phase_1...Phase_n
+    """
+    def __init__(self, plaxis):
+        self.plaxis = plaxis
+        self.phases = []
+        self.plates = []
+        for i in range(1, plaxis.phase_count + 1):
+            phase = FakePlaxisObject(identification=f"Phase_{i} [Phase_{i}]")
+            setattr(self, f"Phase_{i}", phase)
+            self.phases.append(phase)
+        for i in range(1, plaxis.element_count + 1):
+            element = FakePlaxisObject(name=f"Plate_{i}")
+            setattr(self, f"Plate_{i}", element)
+            self.plates.append(element)
+        self.ResultTypes = FakeResultTypes(plaxis)
+
+    def getresults(self, *args):
+        """ getresults(element, phase, resulttype, location), or getresults(phase, resulttype, location) for every soil node
+        """
+        resulttype = args[-2]
+        time.sleep(self.plaxis.latency)
+        plaxis = self.plaxis
+        if plaxis.drop_after is not None and plaxis.calls['getresults'] == plaxis.drop_after:
+            plaxis.drop_after = None
+            plaxis.server.active = False
+            raise ConnectionResetError("Simulated dropped session")
+        if plaxis.crash_after is not None and plaxis.calls['getresults'] == plaxis.crash_after:
+            plaxis.crash()
+            raise ConnectionResetError("Simulated Plaxis crash")
+        plaxis.calls['getresults'] += 1
+        if len(args) == 3:
+            return list(plaxis.soil_values(resulttype.split(".")[-1]))
+        return list(plaxis.values(resulttype.split(".")[-1]))
+
+class FakePlaxis:
+    """ Simulated Plaxis Output server, use fake_plx() in place of plxscripting.easy
+    """
+    def __init__(self, element_count: int, phase_count: int, node_count: int = 10, latency: float = 0.0,
+                 open_latency: float = 0.0, drop_after: int = None, crash_after: int = None, port: int = 0,
+                 soil_node_count: int = 1000):
+        """ With drop_after, the session drops once after that many getresults calls.
+            With crash_after, Plaxis stops answering after that many calls and cannot be launched again.
+            The server takes a free port unless port is given. The soil mesh is the synthetic mesh of Shovel_Soil
+        """
+        self.element_count = element_count
+        self.phase_count = phase_count
+        self.node_count = node_count
+        self.latency = latency
+        self.open_latency = open_latency
+        self.drop_after = drop_after
+        self.crash_after = crash_after
+        self.crashed = False
+        self.calls = Counter()
+        self.results = {}
+        self.soil_node_count = soil_node_count
+        self.soil_results = {}
+        self.server = None
+        # the server port is reserved now and only accepts connections once launched
+        self.socket = socket.socket()
+        self.socket.bind(("localhost", port))
+        self.port = self.socket.getsockname()[1]
+        self.listening = False
+
+    def launch(self, args=None) -> object:
+        """ subprocess.Popen of the Plaxis executable: starts accepting connections on the port
+        """
+        self.calls['launch'] += 1
+        if self.crashed:
+            return FakeProcess(exit_code=1)
+        if not self.listening:
+            self.socket.listen(16)
+            self.listening = True
+            threading.Thread(target=self.accept, daemon=True).start()
+        return FakeProcess()
+
+    def accept(self):
+        while True:
+            try:
+                conn, address = self.socket.accept()
+            except OSError: # closed
+                return
+            conn.close()
+
+    def crash(self):
+        self.crashed = True
+        self.server.active = False
+        self.close()
+
+    def close(self):
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR) # also stops a pending accept, the port then refuses connections
+        except OSError: # never listened
+            pass
+        self.socket.close()
+
+    def values(self, prop: str) -> list:
+        if prop not in self.results:
+            if prop == 'X':
+                self.results[prop] = [0.0] * self.node_count
+            elif prop == 'Y':
+                self.results[prop] = [-i * 0.5 for i in range(self.node_count)]
+            else:
+                self.results[prop] = [float(len(prop) * i) for i in range(self.node_count)]
+        return self.results[prop]
+
+    def soil_values(self, prop: str) -> np.ndarray:
+        if prop not in self.soil_results:
+            if not self.soil_results:
+                self.soil_results['X'], self.soil_results['Y'] = synthetic_mesh(self.soil_node_count)
+            x, y = self.soil_results['X'], self.soil_results['Y']
+            self.soil_results[prop] = np.sin(x / 10) * y * 0.001 * len(prop)
+        return self.soil_results[prop]
+
+    def new_server(self, address=None, port=None, timeout=None, password=None):
+        self.calls['new_server'] += 1
+        self.server = FakeServer(self)
+        return self.server, FakeGlobal(self)
+
+    def fake_plx(self):
+        return types.SimpleNamespace(new_server=self.new_server)
+
+class FakePlaxisPool:
+    """ FakePlaxis servers on consecutive ports, used in place of a FakePlaxis by simulated():
+        launches and connections go to the server of their port
+    """
+    def __init__(self, count: int, element_count: int, phase_count: int, **kwargs):
+        self.port = free_ports(count)
+        self.servers = {self.port + i: FakePlaxis(element_count, phase_count, port=self.port + i, **kwargs) for i in range(count)}
+        self.element_count = element_count
+        self.phase_count = phase_count
+
+    @property
+    def calls(self) -> Counter:
+        return sum((plaxis.calls for plaxis in self.servers.values()), Counter())
+
+    def launch(self, args) -> object:
+        port = int(next(arg for arg in args if arg.startswith("--AppServerPort=")).split("=", 1)[1])
+        return self.servers[port].launch(args)
+
+    def new_server(self, address=None, port=None, timeout=None, password=None):
+        return self.servers[int(port)].new_server(address, port, timeout, password)
+
+    def fake_plx(self):
+        return types.SimpleNamespace(new_server=self.new_server)
+
+    def close(self):
+        for plaxis in self.servers.values():
+            plaxis.close()
+
+class FakeProcess:
+    def __init__(self, exit_code: int = None):
+        self.exit_code = exit_code
+
+    def poll(self):
+        return self.exit_code
+
+    def terminate(self):
+        return
+
+#################### Simulated Excel ####################
+
+class FakeExcel:
+    """ Excel.Application, holding the fake workbooks by name
+    """
+    def __init__(self):
+        self.calls = 0 # COM member accesses
+        self.ScreenUpdating = True
+        self.Calculation = -4105
+        self.workbooks = {}
+        self.Workbooks = FakeWorkbooks(self)
+
+    def add_workbook(self, name: str) -> object:
+        self.workbooks[name] = FakeWorkbook(self, name)
+        return self.workbooks[name]
+
+    def fake_win32com(self):
+        return types.SimpleNamespace(client=types.SimpleNamespace(gencache=types.SimpleNamespace(EnsureDispatch=lambda name: self)))
+
+class FakeWorkbooks:
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, name):
+        """ Workbooks are found by name, with or without extension
+        """
+        self.app.calls += 1
+        return self.app.workbooks[os.path.splitext(name)[0]]
+
+    def Open(self, path):
+        self.app.calls += 1
+        return self.app.workbooks[os.path.splitext(os.path.basename(path))[0]]
+
+class FakeWorkbook:
+    def __init__(self, app, name):
+        self.app = app
+        self.Name = name + ".xlsm"
+        self.sheets = {}
+
+    def add_sheet(self, name: str) -> object:
+        self.sheets[name] = FakeSheet(self.app)
+        return self.sheets[name]
+
+    def Worksheets(self, name):
+        self.app.calls += 1
+        return self.sheets[name]
+
+    def Save(self):
+        self.app.calls += 1
+
+    def SaveAs(self, path, file_format=None):
+        """ The workbook is then known under its new name, as in Excel
+        """
+        self.app.calls += 1
+        name = os.path.splitext(os.path.basename(path))[0]
+        self.app.workbooks.pop(os.path.splitext(self.Name)[0], None)
+        self.app.workbooks[name] = self
+        self.Name = name + ".xlsm"
+
+    def Activate(self):
+        self.app.calls += 1
+
+    def Close(self, save=False):
+        self.app.calls += 1
+
+class FakeSheet:
+    """ Cells are kept per column, tables grow when written to directly below their last row like ListObjects do
+    """
+    def __init__(self, app):
+        self.app = app
+        self.columns = {}
+        self.tables = {}
+        self.discard = False
+
+    def add_table(self, name: str, header: list, first_col: int, rows: list = (), header_row: int = 1) -> object:
+        table = FakeListObject(self, header_row, first_col, len(header))
+        self.tables[name] = table
+        self.write(header_row, first_col, header_row, first_col + len(header) - 1, [header])
+        if len(rows):
+            self.write(header_row + 1, first_col, header_row + len(rows), first_col + len(header) - 1, rows)
+        return table
+
+    def ListObjects(self, name):
+        self.app.calls += 1
+        return self.tables[name]
+
+    def Range(self, start, end=None):
+        self.app.calls += 1
+        end = end or start
+        return FakeRange(self, start.r1, start.c1, end.r2, end.c2)
+
+    def read(self, r1, c1, r2, c2) -> tuple:
+        rows = []
+        for r in range(r1, r2 + 1):
+            rows.append(tuple(self.columns[c][r - 1] if c in self.columns and r <= len(self.columns[c]) else None
+                              for c in range(c1, c2 + 1)))
+        return tuple(rows)
+
+    def write(self, r1, c1, r2, c2, value):
+        row_count = r2 - r1 + 1
+        if self.discard: # only the table sizes are kept, for memory measurements
+            rows = ()
+        elif isinstance(value, np.ndarray): # converted by COM like nested sequences
+            rows = value.tolist()
+        elif not isinstance(value, (list, tuple)): # a scalar fills the range
+            rows = [[value] * (c2 - c1 + 1)] * row_count
+        elif value and not isinstance(value[0], (list, tuple)): # one row is repeated over the range
+            rows = [list(value)] * row_count
+        else:
+            rows = value
+        for j, c in enumerate(range(c1, c2 + 1) if not self.discard else ()):
+            column = self.columns.setdefault(c, [])
+            if len(column) < r2:
+                column.extend([None] * (r2 - len(column)))
+            column[r1 - 1:r2] = [row[j] if j < len(row) else None for row in rows]
+        for table in self.tables.values(): # writing right below a table extends it
+            if table.first_col <= c2 and c1 <= table.last_col and r1 <= table.bottom + 1 <= r2:
+                table.row_count = r2 - table.header_row
+
+    def delete(self, r1, c1, r2, c2):
+        """ Deletes cells and shifts the cells below up
+        """
+        for c in range(c1, c2 + 1):
+            if c in self.columns:
+                del self.columns[c][r1 - 1:r2]
+        for table in self.tables.values():
+            if table.first_col <= c2 and c1 <= table.last_col:
+                overlap = min(r2, table.bottom) - max(r1, table.header_row + 1) + 1
+                if overlap > 0:
+                    table.row_count -= overlap
+
+class FakeRange:
+    def __init__(self, sheet, r1, c1, r2, c2):
+        self.sheet = sheet
+        self.r1, self.c1, self.r2, self.c2 = r1, c1, r2, c2
+
+    @property
+    def Value(self):
+        self.sheet.app.calls += 1
+        values = self.sheet.read(self.r1, self.c1, self.r2, self.c2)
+        if self.r1 == self.r2 and self.c1 == self.c2:
+            return values[0][0]
+        return values
+
+    @Value.setter
+    def Value(self, value):
+        self.sheet.app.calls += 1
+        self.sheet.write(self.r1, self.c1, self.r2, self.c2, value)
+
+    FormulaR1C1 = Value # no formulas in the fake sheets
+
+    def __call__(self, row=None, col=None):
+        """ Range() is the value, Range(row, col) a cell relative to the range
+        """
+        if row is None:
+            return self.Value
+        return self.Cells(row, col)
+
+    def Cells(self, row, col):
+        self.sheet.app.calls += 1
+        return FakeRange(self.sheet, self.r1 + row - 1, self.c1 + col - 1, self.r1 + row - 1, self.c1 + col - 1)
+
+    def GetOffset(self, rows, cols):
+        self.sheet.app.calls += 1
+        return FakeRange(self.sheet, self.r1 + rows, self.c1 + cols, self.r2 + rows, self.c2 + cols)
+
+    def Delete(self, shift=None):
+        self.sheet.app.calls += 1
+        self.sheet.delete(self.r1, self.c1, self.r2, self.c2)
+
+class FakeListObject:
+    def __init__(self, sheet, header_row, first_col, col_count):
+        self.sheet = sheet
+        self.header_row = header_row
+        self.first_col = first_col
+        self.last_col = first_col + col_count - 1
+        self.row_count = 0
+        self.ListRows = _FakeCount(self, lambda: self.row_count)
+        self.ListColumns = FakeListColumns(self)
+
+    @property
+    def bottom(self) -> int:
+        return self.header_row + self.row_count
+
+    @property
+    def Range(self):
+        self.sheet.app.calls += 1
+        return FakeRange(self.sheet, self.header_row, self.first_col, self.bottom, self.last_col)
+
+    @property
+    def HeaderRowRange(self):
+        self.sheet.app.calls += 1
+        return FakeRange(self.sheet, self.header_row, self.first_col, self.header_row, self.last_col)
+
+    @property
+    def DataBodyRange(self):
+        self.sheet.app.calls += 1
+        if not self.row_count:
+            return None
+        return FakeRange(self.sheet, self.header_row + 1, self.first_col, self.bottom, self.last_col)
+
+class _FakeCount:
+    def __init__(self, table, count):
+        self.table = table
+        self.count = count
+
+    @property
+    def Count(self):
+        self.table.sheet.app.calls += 1
+        return self.count()
+
+class FakeListColumns(_FakeCount):
+    def __init__(self, table):
+        super().__init__(table, lambda: table.last_col - table.first_col + 1)
+
+    def __call__(self, key):
+        self.table.sheet.app.calls += 1
+        if isinstance(key, str):
+            header = self.table.sheet.read(self.table.header_row, self.table.first_col, self.table.header_row, self.table.last_col)[0]
+            key = header.index(key) + 1
+        return FakeListColumn(self.table, self.table.first_col + key - 1)
+
+class FakeListColumn:
+    def __init__(self, table, col):
+        self.table = table
+        self.col = col
+
+    @property
+    def Range(self):
+        return FakeRange(self.table.sheet, self.table.header_row, self.col, self.table.bottom, self.col)
+
+    @property
+    def DataBodyRange(self):
+        return FakeRange(self.table.sheet, self.table.header_row + 1, self.col, self.table.bottom, self.col)
+
+#################### Scenarios ####################
+
+def import_shovel():
+    """ Imports Shovel_Classes, with empty modules standing in for the Windows only dependencies
+        that are not installed. They are replaced by the fakes while a scenario runs
+    """
+    for name in ("psutil", "plxscripting", "plxscripting.easy"):
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            sys.modules[name] = types.ModuleType(name)
+            if name == "plxscripting.easy":
+                sys.modules["plxscripting"].easy = sys.modules[name]
+    import Shovel_Classes
+    return Shovel_Classes
+
+def build_shovel_workbooks(xl: FakeExcel, output_folder: str, model_count: int, element_count: int, phase_count: int,
+                           action: str, port: int = 10001, profile_columns: dict = None):
+    """ Fake Shovel workbook with one extraction row per model, phase and plate, and an empty extraction template.
+        profile_columns adds optional column:value pairs to the profile
+    """
+    settings = [["Plaxis installation folder", "C:\\Plaxis"], ["Host", "localhost"], ["Plaxis input port", 10000],
+                ["Plaxis output port", port], ["Plaxis password", "benchmark"], ["Project Name", "Benchmark"],
+                ["Template Excel path", os.path.join(output_folder, "Template.xlsm")], ["Output folder path", output_folder],
+                ["Existing Excel path", None], ["Use result cache", "No"], ["Incremental load", "No"],
+                ["Progress display", "None"]]
+    models = [f"Model_{i}" for i in range(1, model_count + 1)]
+    extractions = [[0, model, f"Phase_{p} [Phase_{p}]", "Plate", f"Plate_{e}", None, None, None, None, "Plate forces"]
+                   for model in models for p in range(1, phase_count + 1) for e in range(1, element_count + 1)]
+    for no, row in enumerate(extractions, start=1):
+        row[0] = no
+
+    shovel = xl.add_workbook("Shovel")
+    sheet = shovel.add_sheet("Plaxis_extractor")
+    sheet.add_table("tbl_Settings", ["Settings", "Value"], 1, settings)
+    sheet.add_table("tbl_PlaxisFiles", ["Path", "Model Name", "Action", "Load Status"], 4,
+                    [[os.path.join(output_folder, model + ".p2dx"), model, action, "Ready"] for model in models])
+    profile_columns = profile_columns or {}
+    sheet.add_table("tbl_Profiles", ["No.", "Name", "Element Type"] + [f"Property {i}" for i in range(1, 9)] + list(profile_columns), 10,
+                    [[1, "Plate forces", "Plate", "M2D", "Q2D", "Nx2D", None, None, None, None, None] + list(profile_columns.values())])
+    sheet.add_table("tbl_Extraction", ["No.", "Model", "Phase", "Element Type"] + [f"Element {i}" for i in range(1, 6)] + ["Profile"], 30,
+                    extractions)
+    shovel.add_sheet("_system").add_table("tbl_AllElements", ["Element Type", "Model", "Element Name"], 1)
+
+    template = xl.add_workbook("Template") # template tables hold one empty row, like the real template
+    sheet = template.add_sheet("Extractor")
+    sheet.add_table("tbl_Data", ["Index", "X coordinate", "Y coordinate"] + [f"Value {i}" for i in range(1, 9)], 1, [[None] * 11])
+    sheet.add_table("tbl_Extraction", ["Index", "No.", "Model", "Phase", "Element", "Profile", "Extraction Status"], 13, [[None] * 7])
+    template.add_sheet("_Profiles").add_table("tbl_AllProfiles", ["Name", "Element Type"] + [f"Property {i}" for i in range(1, 9)], 1, [[None] * 10])
+
+def simulated(Shovel_Classes, xl: FakeExcel, plaxis: FakePlaxis) -> ExitStack:
+    """ Replaces Excel, Plaxis, the process functions, the toolkit message boxes and the per-user folder by the fakes
+        until the returned stack is closed
+    """
+    import toolkit
+    patches = ExitStack()
+    user_folder = patches.enter_context(tempfile.TemporaryDirectory())
+    patches.enter_context(mock.patch.object(toolkit, "user_folder", lambda: user_folder))
+    patches.enter_context(mock.patch.object(Shovel_Classes, "win32com", xl.fake_win32com()))
+    patches.enter_context(mock.patch.object(Shovel_Classes, "plx", plaxis.fake_plx()))
+    patches.enter_context(mock.patch.object(Shovel_Classes, "psu", types.SimpleNamespace(process_iter=lambda: [])))
+    patches.enter_context(mock.patch.object(Shovel_Classes, "subprocess", types.SimpleNamespace(Popen=plaxis.launch)))
+    patches.enter_context(mock.patch.object(toolkit, "mbox", lambda *args, **kwargs: 0))
+    return patches
+
+def fake_inventory_worker(element_count: int, phase_count: int, open_latency: float, settings_dict: dict, ports, reuse: bool):
+    """ Loader process pool initializer running the worker against its own FakePlaxis, on the port it is given
+    """
+    Shovel_Classes = import_shovel()
+    port = ports.get()
+    plaxis = FakePlaxis(element_count, phase_count, open_latency=open_latency, port=port)
+    Shovel_Classes.plx = plaxis.fake_plx() # for the lifetime of the worker process
+    Shovel_Classes.psu = types.SimpleNamespace(process_iter=lambda: [])
+    Shovel_Classes.subprocess = types.SimpleNamespace(Popen=plaxis.launch)
+    Shovel_Classes.inventory_worker_start(settings_dict, port, reuse)
+
+def free_ports(count: int) -> int:
+    """ First of count consecutive free local ports
+    """
+    while True:
+        probe = socket.socket()
+        probe.bind(("localhost", 0))
+        first = probe.getsockname()[1]
+        probe.close()
+        sockets = []
+        try:
+            for port in range(first, first + count):
+                sockets.append(socket.socket())
+                sockets[-1].bind(("localhost", port))
+            return first
+        except OSError:
+            continue
+        finally:
+            for sock in sockets:
+                sock.close()
+
+def set_setting(xl: FakeExcel, name: str, value):
+    """ Sets a value of tbl_Settings in the fake Shovel workbook, adding the setting if needed
+    """
+    sheet = xl.workbooks["Shovel"].sheets["Plaxis_extractor"]
+    table = sheet.tables["tbl_Settings"]
+    names = [row[0] for row in sheet.read(table.header_row + 1, table.first_col, table.bottom, table.first_col)]
+    row = table.header_row + 1 + (names.index(name) if name in names else len(names))
+    sheet.write(row, table.first_col, row, table.first_col + 1, [[name, value]])
+
+def add_profile(xl: FakeExcel, profile: list, every: int = 2):
+    """ Adds profile, [name, element type, properties], to tbl_Profiles and switches every other extraction row to it
+    """
+    sheet = xl.workbooks["Shovel"].sheets["Plaxis_extractor"]
+    table = sheet.tables["tbl_Profiles"]
+    row = [table.row_count + 1] + profile
+    sheet.write(table.bottom + 1, table.first_col, table.bottom + 1, table.first_col + len(row) - 1, [row])
+    table = sheet.tables["tbl_Extraction"]
+    for r in range(table.header_row + every, table.bottom + 1, every):
+        sheet.write(r, table.last_col, r, table.last_col, [[profile[0]]])
+
+def run_scenario(element_count: int, phase_count: int, model_count: int = 2, node_count: int = 10,
+                 latency: float = 0.0, open_latency: float = 0.0, drop_after: int = None) -> dict:
+    """ Loads the model inventories then extracts every (model, phase, plate) profile against the fakes.
+        With drop_after, the Plaxis session drops once during the extraction
+    """
+    Shovel_Classes = import_shovel()
+    result = {"elements": element_count, "phases": phase_count, "models": model_count, "nodes": node_count, "latency": latency}
+    with tempfile.TemporaryDirectory() as output_folder:
+        for stage, action in (("load", "Load Model"), ("extract", "Extract Data")):
+            xl = FakeExcel()
+            plaxis = FakePlaxis(element_count, phase_count, node_count, latency, open_latency, drop_after if stage == "extract" else None)
+            build_shovel_workbooks(xl, output_folder, model_count, element_count, phase_count, action, plaxis.port)
+            with simulated(Shovel_Classes, xl, plaxis):
+                start = time.perf_counter()
+                if stage == "load":
+                    Shovel_Classes.Loader("Shovel").extract_to_table()
+                else:
+                    Shovel_Classes.Extractor("Shovel").process_flow()
+                result[stage] = {"wall_time": time.perf_counter() - start, "plaxis_calls": dict(plaxis.calls), "com_calls": xl.calls}
+            plaxis.close()
+    return result
+
+def run_resume(element_count: int = 100, phase_count: int = 5, model_count: int = 3, node_count: int = 10,
+               checkpoint_every: int = 150) -> dict:
+    """ Crashes Plaxis in the middle of the last model, then resumes the extraction from the checkpoint journal.
+        Checks that the resumed output holds every unit once, with contiguous indexes
+    """
+    Shovel_Classes = import_shovel()
+    unit_count = element_count * phase_count * model_count
+    result = {"elements": element_count, "phases": phase_count, "models": model_count, "nodes": node_count,
+              "checkpoint_every": checkpoint_every}
+    with tempfile.TemporaryDirectory() as output_folder:
+        xl = FakeExcel() # the same Excel instance holds the output between the two runs
+        # 5 getresults calls per unit (X, Y and the 3 plate forces), halfway through the last model
+        crash_after = 5 * (unit_count - element_count * phase_count // 2)
+        plaxis = FakePlaxis(element_count, phase_count, node_count, crash_after=crash_after)
+        build_shovel_workbooks(xl, output_folder, model_count, element_count, phase_count, "Extract Data", plaxis.port)
+        set_setting(xl, "Checkpoint every", checkpoint_every)
+        start = time.perf_counter()
+        with simulated(Shovel_Classes, xl, plaxis):
+            try:
+                Shovel_Classes.Extractor("Shovel").process_flow()
+                crashed = False
+            except Exception:
+                crashed = True
+        result["crash"] = {"crashed": crashed, "wall_time": time.perf_counter() - start, "plaxis_calls": dict(plaxis.calls)}
+
+        plaxis = FakePlaxis(element_count, phase_count, node_count)
+        set_setting(xl, "Plaxis output port", plaxis.port)
+        start = time.perf_counter()
+        with simulated(Shovel_Classes, xl, plaxis):
+            Shovel_Classes.Extractor("Shovel", resume=True).process_flow()
+        result["resume"] = {"wall_time": time.perf_counter() - start, "plaxis_calls": dict(plaxis.calls)}
+        plaxis.close()
+
+        output = xl.workbooks["Benchmark Plaxis Extraction"].sheets["Extractor"]
+        table = output.tables["tbl_Extraction"]
+        indexes = [row[0] for row in output.read(table.header_row + 1, table.first_col, table.bottom, table.first_col) if row[0] is not None]
+        result["output_ok"] = sorted(indexes) == list(range(1, unit_count + 1))
+    return result
+
+def run_inventory(model_count: int = 12, worker_count: int = 4, open_latency: float = 1.0,
+                  element_count: int = 20, phase_count: int = 5) -> dict:
+    """ Loads the inventory of model_count models sequentially, then on a pool of worker_count processes,
+        every model taking open_latency seconds to open
+    """
+    Shovel_Classes = import_shovel()
+    result = {"models": model_count, "workers": worker_count, "open_latency": open_latency}
+    with tempfile.TemporaryDirectory() as output_folder:
+        for stage, workers in (("sequential", 1), ("parallel", worker_count)):
+            xl = FakeExcel()
+            plaxis = FakePlaxis(element_count, phase_count, open_latency=open_latency)
+            build_shovel_workbooks(xl, output_folder, model_count, element_count, phase_count, "Load Model", plaxis.port)
+            if workers > 1:
+                plaxis.close()
+                set_setting(xl, "Plaxis output port", free_ports(workers))
+                set_setting(xl, "Plaxis workers", workers)
+            with simulated(Shovel_Classes, xl, plaxis):
+                start = time.perf_counter()
+                loader = Shovel_Classes.Loader("Shovel")
+                loader.worker_initializer = functools.partial(fake_inventory_worker, element_count, phase_count, open_latency)
+                loader.extract_to_table()
+                wall_time = time.perf_counter() - start
+            plaxis.close()
+            table = xl.workbooks["Shovel"].sheets["_system"].tables["tbl_AllElements"]
+            result[stage] = {"wall_time": wall_time, "rows": table.row_count, "com_calls": xl.calls,
+                             "workers": {str(port): stats for port, stats in loader.worker_stats.items()}}
+    return result
+
+def run_reduction(element_count: int = 20, phase_count: int = 5, node_count: int = 2000, spacing: float = 10.0) -> dict:
+    """ Extracts dense profiles (nodes every 0.5 m) in full, then reduced to spacing with peaks kept
+    """
+    Shovel_Classes = import_shovel()
+    result = {"elements": element_count, "phases": phase_count, "nodes": node_count, "spacing": spacing}
+    with tempfile.TemporaryDirectory() as output_folder:
+        for stage, profile_columns in (("full", None), ("reduced", {"Spacing": spacing, "Keep peaks": "Yes"})):
+            xl = FakeExcel()
+            plaxis = FakePlaxis(element_count, phase_count, node_count)
+            build_shovel_workbooks(xl, output_folder, 1, element_count, phase_count, "Extract Data", plaxis.port, profile_columns)
+            with simulated(Shovel_Classes, xl, plaxis):
+                start = time.perf_counter()
+                Shovel_Classes.Extractor("Shovel").process_flow()
+                wall_time = time.perf_counter() - start
+            plaxis.close()
+            output = xl.workbooks["Benchmark Plaxis Extraction"].sheets["Extractor"].tables["tbl_Data"]
+            result[stage] = {"wall_time": wall_time, "data_rows": output.row_count}
+    return result
+
+def run_validation(element_count: int = 50, phase_count: int = 5, model_count: int = 2, latency: float = 0.002) -> dict:
+    """ Extracts with half the extraction rows asking plates for a soil result type, without and with validation
+        of the result types, every remote call taking latency seconds
+    """
+    Shovel_Classes = import_shovel()
+    result = {"elements": element_count, "phases": phase_count, "models": model_count, "latency": latency}
+    with tempfile.TemporaryDirectory() as output_folder:
+        for stage, validate in (("unvalidated", "No"), ("validated", "Yes")):
+            xl = FakeExcel()
+            plaxis = FakePlaxis(element_count, phase_count, latency=latency)
+            build_shovel_workbooks(xl, output_folder, model_count, element_count, phase_count, "Extract Data", plaxis.port)
+            add_profile(xl, ["Plate stresses", "Plate", "M2D", "SigmaxxE"])
+            set_setting(xl, "Validate result types", validate)
+            with simulated(Shovel_Classes, xl, plaxis):
+                start = time.perf_counter()
+                extractor = Shovel_Classes.Extractor("Shovel")
+                extractor.process_flow()
+                wall_time = time.perf_counter() - start
+            plaxis.close()
+            pruned = len(extractor.capabilities.pruned) if extractor.capabilities else 0
+            result[stage] = {"wall_time": wall_time, "plaxis_calls": dict(plaxis.calls), "pruned": pruned}
+    return result
+
+def run_pipeline(element_count: int = 50, phase_count: int = 5, model_count: int = 2, latency: float = 0.002,
+                 write_delay: float = 0.002) -> dict:
+    """ Extracts with every getresults call taking latency seconds and every profile written taking write_delay seconds,
+        fetching and writing in turn (queue depth 0), then through the pipeline
+    """
+    Shovel_Classes = import_shovel()
+    result = {"elements": element_count, "phases": phase_count, "models": model_count, "latency": latency, "write_delay": write_delay}
+    write_profile = Shovel_Classes.ExcelSink.write_profile
+
+    def slow_write_profile(sink, *args):
+        time.sleep(write_delay)
+        return write_profile(sink, *args)
+
+    with tempfile.TemporaryDirectory() as output_folder:
+        for stage, depth in (("sequential", 0), ("pipelined", 16)):
+            xl = FakeExcel()
+            plaxis = FakePlaxis(element_count, phase_count, latency=latency)
+            build_shovel_workbooks(xl, output_folder, model_count, element_count, phase_count, "Extract Data", plaxis.port)
+            set_setting(xl, "Pipeline queue depth", depth)
+            with simulated(Shovel_Classes, xl, plaxis), mock.patch.object(Shovel_Classes.ExcelSink, "write_profile", slow_write_profile):
+                start = time.perf_counter()
+                Shovel_Classes.Extractor("Shovel").process_flow()
+                result[stage] = {"wall_time": time.perf_counter() - start, "plaxis_calls": dict(plaxis.calls)}
+            plaxis.close()
+    return result
+
+def run_soil(line_count: int = 20, phase_count: int = 10, soil_node_count: int = 100000, model_count: int = 2) -> dict:
+    """ Extracts soil displacements along line_count vertical cut lines behind the wall of the synthetic mesh
+    """
+    Shovel_Classes = import_shovel()
+    result = {"lines": line_count, "phases": phase_count, "soil_nodes": soil_node_count, "models": model_count}
+    with tempfile.TemporaryDirectory() as output_folder:
+        xl = FakeExcel()
+        plaxis = FakePlaxis(line_count, phase_count, soil_node_count=soil_node_count)
+        build_shovel_workbooks(xl, output_folder, model_count, line_count, phase_count, "Extract Data", plaxis.port)
+        add_profile(xl, ["Soil displacements", "Soil", "Ux", "Uy"], every=1)
+        sheet = xl.workbooks["Shovel"].sheets["Plaxis_extractor"]
+        table = sheet.tables["tbl_Extraction"]
+        for r in range(table.header_row + 1, table.bottom + 1): # Plate_<i> -> the cut line i m behind the wall
+            i = int(sheet.read(r, table.first_col + 4, r, table.first_col + 4)[0][0].split("_")[1])
+            sheet.write(r, table.first_col + 3, r, table.first_col + 4, [["Soil", f"SoilLine_{i}_0_{i}_-30_0.5"]])
+        with simulated(Shovel_Classes, xl, plaxis):
+            start = time.perf_counter()
+            Shovel_Classes.Extractor("Shovel").process_flow()
+            wall_time = time.perf_counter() - start
+        plaxis.close()
+        output = xl.workbooks["Benchmark Plaxis Extraction"].sheets["Extractor"].tables["tbl_Data"]
+        result["extract"] = {"wall_time": wall_time, "plaxis_calls": dict(plaxis.calls), "data_rows": output.row_count}
+    return result
+
+def run_reader(element_count: int = 100, phase_count: int = 10, model_count: int = 3, node_count: int = 10) -> dict:
+    """ Extracts, then reads every profile of one element back through the results sidecar and checks it
+        against the output tables
+    """
+    from Shovel_Reader import ResultsReader
+    Shovel_Classes = import_shovel()
+    result = {"elements": element_count, "phases": phase_count, "models": model_count, "nodes": node_count}
+    with tempfile.TemporaryDirectory() as output_folder:
+        xl = FakeExcel()
+        plaxis = FakePlaxis(element_count, phase_count, node_count)
+        build_shovel_workbooks(xl, output_folder, model_count, element_count, phase_count, "Extract Data", plaxis.port)
+        with simulated(Shovel_Classes, xl, plaxis):
+            start = time.perf_counter()
+            Shovel_Classes.Extractor("Shovel").process_flow()
+            wall_time = time.perf_counter() - start
+        plaxis.close()
+
+        start = time.perf_counter()
+        reader = ResultsReader.open(os.path.join(output_folder, "Benchmark Plaxis Extraction Results.npz"))
+        profiles = list(reader.profiles(model="Model_2", element="Plate_1"))
+        read_time = time.perf_counter() - start
+        sheet = xl.workbooks["Benchmark Plaxis Extraction"].sheets["Extractor"]
+        table = sheet.tables["tbl_Data"]
+        rows = sheet.read(table.header_row + 1, table.first_col, table.bottom, table.first_col + 5)
+        ok = len(profiles) == phase_count
+        for record, block in profiles:
+            expected = [row[5] for row in rows if row[0] == record["Index"]] # Value 3, Nx2D
+            ok = ok and np.array_equal(block["Nx2D"], expected)
+        result["extract"] = {"wall_time": wall_time, "profiles": len(reader), "read_time": read_time, "output_ok": bool(ok)}
+        reader.close()
+    return result
+
+def run_bulk_delete(row_count: int = 10000) -> dict:
+    """ Deletes a contiguous block and then scattered rows from a fake table of row_count rows
+    """
+    Shovel_Classes = import_shovel()
+    xl = FakeExcel()
+    sheet = xl.add_workbook("Bulk").add_sheet("Sheet1")
+    sheet.add_table("tbl", ["Model", "Element"], 1, [[f"Model_{i % 10}", f"Plate_{i}"] for i in range(row_count)])
+    result = {"rows": row_count}
+    with mock.patch.object(Shovel_Classes, "win32com", xl.fake_win32com()):
+        table = Shovel_Classes.ExcelTable("Bulk", "Sheet1", "tbl")
+        for case, criteria in (("contiguous", {"Element": [f"Plate_{i}" for i in range(row_count // 10)]}),
+                               ("scattered", {"Model": ["Model_3"]})):
+            xl.calls = 0
+            start = time.perf_counter()
+            deleted = table.bulk_delete(criteria)
+            result[case] = {"wall_time": time.perf_counter() - start, "deleted": deleted, "com_calls": xl.calls}
+    return result
+
+def peak_rss_mb() -> float:
+    """ Peak resident memory of this process in MB. On Linux ru_maxrss carries the peak of the parent process
+        over fork and exec, so the peak of this process image (VmHWM) is read instead
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2**10 # kB
+    except OSError: # not Linux
+        pass
+    try:
+        import resource
+    except ImportError: # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def measure_memory(layout: str, value_count: int = 1000000, node_count: int = 100, property_count: int = 3) -> dict:
+    """ Extracts value_count nodal values into a buffered output data table, either as result lists
+        written through write_dict_to_table ("lists") or as ResultBlocks ("arrays"), in this process.
+        The fake sheet discards the values, so the peak RSS is the cost of the results and the buffered rows
+    """
+    Shovel_Classes = import_shovel()
+    from Shovel_Results import ResultBlock, fetch_values
+    names = ['X', 'Y'] + [f"Property_{i}" for i in range(1, property_count + 1)]
+    block_count = value_count // (node_count * len(names))
+    xl = FakeExcel()
+    sheet = xl.add_workbook("Memory").add_sheet("Extractor")
+    sheet.add_table("tbl_Data", ["Index"] + names, 1)
+    sheet.discard = True
+    source = np.random.default_rng(0).normal(size=node_count)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    with mock.patch.object(Shovel_Classes, "win32com", xl.fake_win32com()):
+        table = Shovel_Classes.ExcelTable("Memory", "Extractor", "tbl_Data")
+        with table.buffered(freeze_app=False):
+            for index in range(1, block_count + 1):
+                if layout == "lists": # g.getresults values as Python floats, transposed into rows
+                    results = {name: [r for r in source.tolist()] for name in names}
+                    table.write_dict_to_table({index: list(results.values())})
+                else:
+                    results = ResultBlock({name: fetch_values(source.tolist()) for name in names})
+                    table.write_array_to_table(results.com_rows(index))
+    return {"layout": layout, "values": block_count * node_count * len(names), "wall_time": time.perf_counter() - start,
+            "baseline_rss_mb": baseline, "peak_rss_mb": peak_rss_mb(), "extraction_rss_mb": peak_rss_mb() - baseline}
+
+def run_memory(value_count: int = 1000000, node_count: int = 100) -> dict:
+    """ Peak RSS of the list and array result layouts, each measured in a fresh process
+    """
+    result = {"values": value_count, "nodes": node_count}
+    for layout in ("lists", "arrays"):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--memory", layout, str(value_count), str(node_count)],
+                                capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        result[layout] = json.loads(output.splitlines()[-1])
+    return result
+
+def commit_id() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+def benchmark(results_path: str = "Shovel Benchmark Results.jsonl", node_count: int = 10,
+              element_counts: tuple = (10, 100, 1000), phase_counts: tuple = (5, 50)):
+    """ Runs every scenario and appends the results to results_path as JSON lines
+    """
+    stamp = {"commit": commit_id(), "time": time.strftime("%Y-%m-%d %H:%M:%S")}
+    results = [dict(stamp, scenario="bulk_delete", **run_bulk_delete())]
+    for element_count in element_counts:
+        for phase_count in phase_counts:
+            results.append(dict(stamp, scenario="end_to_end", **run_scenario(element_count, phase_count, node_count=node_count)))
+    results.append(dict(stamp, scenario="reconnect", **run_scenario(100, 5, node_count=node_count, drop_after=1000)))
+    results.append(dict(stamp, scenario="resume", **run_resume(node_count=node_count)))
+    results.append(dict(stamp, scenario="memory", **run_memory()))
+    results.append(dict(stamp, scenario="inventory", **run_inventory()))
+    results.append(dict(stamp, scenario="reduction", **run_reduction()))
+    results.append(dict(stamp, scenario="validation", **run_validation()))
+    results.append(dict(stamp, scenario="pipeline", **run_pipeline()))
+    results.append(dict(stamp, scenario="soil", **run_soil()))
+    results.append(dict(stamp, scenario="reader", **run_reader()))
+    with open(results_path, "a") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+            print(json.dumps(result))
+    return results
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ["--memory"]: # child process of run_memory
+        print(json.dumps(measure_memory(sys.argv[2], *[int(arg) for arg in sys.argv[3:5]])))
+        sys.exit()
+    benchmark(*(sys.argv[1:2] or ["Shovel Benchmark Results.jsonl"]), *[int(arg) for arg in sys.argv[2:3]])
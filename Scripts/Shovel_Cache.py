@@ -0,0 +1,116 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+### Notes ###
+
+# Results are stored per (model path, model fingerprint, phase, element, result type).
+# The fingerprint changes whenever the .p2dx file or its .p2dxdat folder is modified,
+# stale results of a model are dropped as soon as a new fingerprint is seen for its path.
+# Nodal values are stored as float64 blobs, an empty blob means that Plaxis returned no data.
+
+class ResultCache:
+    """ Persistent SQLite store of extracted Plaxis results, kept in the output folder.
+        Shared between PlaxisSession objects, all access is serialised with a lock.
+    """
+    def __init__(self, folder: str, max_size_mb: float = 512, filename: str = "Shovel Results Cache.sqlite"):
+        self.path = os.path.join(folder, filename)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.fingerprints = {}
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS results (
+                                model_path TEXT, fingerprint TEXT, phase TEXT, element TEXT, result_type TEXT,
+                                data BLOB, nbytes INTEGER, last_access REAL,
+                                PRIMARY KEY (model_path, fingerprint, phase, element, result_type))""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON results (last_access)")
+        self.conn.commit()
+
+    @staticmethod
+    def model_fingerprint(model_path: str) -> str:
+        """ Hash of the .p2dx content together with the size and modified time of every file in its .p2dxdat folder
+        """
+        digest = hashlib.sha1()
+        with open(model_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+
+        data_folder = os.path.splitext(model_path)[0] + ".p2dxdat"
+        if os.path.isdir(data_folder):
+            for root, dirs, files in os.walk(data_folder):
+                dirs.sort()
+                for name in sorted(files):
+                    stat = os.stat(os.path.join(root, name))
+                    digest.update(f"{os.path.relpath(os.path.join(root, name), data_folder)}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()
+
+    def fingerprint(self, model_path: str) -> str:
+        """ Fingerprint of a model, computed once per run. Results of older versions of the model are removed
+        """
+        if model_path not in self.fingerprints:
+            fingerprint = self.model_fingerprint(model_path)
+            with self.lock:
+                self.conn.execute("DELETE FROM results WHERE model_path = ? AND fingerprint != ?", (model_path, fingerprint))
+            self.fingerprints[model_path] = fingerprint
+        return self.fingerprints[model_path]
+
+    def get_many(self, model_path: str, phase: str, element: str, result_types: list) -> dict:
+        """ Returns a dictionary of result_type:float64 array for every result type that is cached
+        """
+        fingerprint = self.fingerprint(model_path)
+        with self.lock:
+            rows = self.conn.execute("SELECT result_type, data FROM results WHERE model_path = ? AND fingerprint = ? AND phase = ? AND element = ?",
+                                     (model_path, fingerprint, phase, element)).fetchall()
+            cached = {result_type: np.frombuffer(data, dtype=np.float64) for result_type, data in rows if result_type in result_types}
+            if cached:
+                self.conn.execute("UPDATE results SET last_access = ? WHERE model_path = ? AND fingerprint = ? AND phase = ? AND element = ?",
+                                  (time.time(), model_path, fingerprint, phase, element))
+            self.hits += len(cached)
+            self.misses += len(result_types) - len(cached)
+        return cached
+
+    def put_many(self, model_path: str, phase: str, element: str, results_dict: dict):
+        """ Stores a dictionary of result_type:[data]
+        """
+        fingerprint = self.fingerprint(model_path)
+        now = time.time()
+        rows = []
+        for result_type, data in results_dict.items():
+            blob = np.asarray(data, dtype=np.float64).tobytes()
+            rows.append((model_path, fingerprint, phase, element, result_type, blob, len(blob), now))
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+
+    def evict(self):
+        """ Removes the least recently used results until the store is within its size limit
+        """
+        with self.lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            evicted = []
+            for rowid, nbytes in self.conn.execute("SELECT rowid, nbytes FROM results ORDER BY last_access"):
+                if total <= self.max_bytes:
+                    break
+                evicted.append((rowid,))
+                total -= nbytes
+            self.conn.executemany("DELETE FROM results WHERE rowid = ?", evicted)
+            self.conn.commit()
+        return len(evicted)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+    def close(self):
+        self.evict()
+        self.conn.close()
@@ -0,0 +1,115 @@
+import json
+import os
+
+### Notes ###
+
+# The result types of every element type, the members of g.ResultTypes.<Type>, are listed once with dir()
+# and kept per Plaxis version (the name of the installation folder) in a file of the per-user folder, shared
+# by every project, so that a new server session only lists the element types it has never seen.
+# Extraction rows asking for a result type that their element type does not have are pruned before the run
+# instead of failing one getresults call at a time.
+# Element types that could not be listed are never pruned.
+
+def element_type(elem_str: str) -> str:
+    """ ResultTypes group of an element name, e.g. Plate_1 -> Plate, NegativeInterface_2 -> Interface,
+        SoilLine_0_0_0_-10 -> Soil
+    """
+    elem_type = elem_str.split('_')[0]
+    if elem_type == 'NegativeInterface' or elem_type == 'PositiveInterface':
+        elem_type = 'Interface'
+    elif elem_type == 'SoilLine' or elem_type == 'SoilNode': # soil cut lines, see Shovel_Soil
+        elem_type = 'Soil'
+    return elem_type
+
+
+def plaxis_version(plaxis_folder: str) -> str:
+    """ Version key of an installation, the name of its folder (e.g. PLAXIS 2D CONNECT Edition V21)
+    """
+    return os.path.basename(os.path.normpath(str(plaxis_folder or "")))
+
+
+class CapabilityIndex:
+    """ Result types available per element type for one Plaxis version, optionally cached in a JSON file
+        of version:{element type:[result types]}
+    """
+    def __init__(self, version: str, path: str = None):
+        self.version = version
+        self.path = path
+        self.types = {} # element type: set of result types
+        self.pruned = {} # (model, phase, element, profile): [missing result types]
+        if path and os.path.isfile(path):
+            try:
+                with open(path) as f:
+                    known = json.load(f).get(version, {})
+            except (OSError, ValueError):
+                known = {}
+            self.types = {elem_type: set(members) for elem_type, members in known.items()}
+
+    def unknown(self, elem_types) -> list:
+        return [elem_type for elem_type in elem_types if elem_type not in self.types]
+
+    def learn(self, g, elem_types) -> list:
+        """ Lists the result types of every element type not known yet on the server of g, saving them to disk.
+            Returns the element types that were listed
+        """
+        listed = []
+        for elem_type in self.unknown(elem_types):
+            try:
+                group = getattr(g.ResultTypes, elem_type)
+                members = {name for name in dir(group) if not name.startswith("_")}
+            except Exception: # not a result type group, or the server cannot list it
+                continue
+            if members:
+                self.types[elem_type] = members
+                listed.append(elem_type)
+        if listed:
+            self.save()
+        return listed
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        index[self.version] = {elem_type: sorted(members) for elem_type, members in self.types.items()}
+        with open(self.path, "w") as f:
+            json.dump(index, f, indent=1)
+
+    def missing(self, elem_type: str, properties: list) -> list:
+        """ Result types of properties that elem_type does not have, empty when it is not known
+        """
+        members = self.types.get(elem_type)
+        if members is None:
+            return []
+        return [prop for prop in properties if isinstance(prop, str) and prop not in members] # empty cells may read as NaN
+
+    def prune(self, model: str, extractions: list, profile_dict: dict) -> list:
+        """ Removes the elements of the extraction rows that cannot have every result type of their profile,
+            recording them in pruned. Rows without any element left are dropped
+        """
+        kept_rows = []
+        for ext in extractions:
+            phase, profile = ext[1], ext[-1]
+            elements = []
+            for element in ext[2:-1]:
+                missing = self.missing(element_type(element), ['X', 'Y'] + profile_dict.get(profile, []))
+                if missing:
+                    self.pruned[(model, phase, element, profile)] = missing
+                else:
+                    elements.append(element)
+            if elements:
+                kept_rows.append(ext[:2] + elements + ext[-1:])
+        return kept_rows
+
+    def summary(self) -> str:
+        """ One line per element type, profile and missing result types, with the number of pruned units
+        """
+        groups = {}
+        for (model, phase, element, profile), missing in self.pruned.items():
+            key = (element_type(element), profile, tuple(missing))
+            groups[key] = groups.get(key, 0) + 1
+        return "\n".join(f"{count} x {profile} on {elem_type}: no {', '.join(missing)}"
+                         for (elem_type, profile, missing), count in sorted(groups.items()))
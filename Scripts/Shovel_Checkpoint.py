@@ -0,0 +1,90 @@
+import json
+import os
+
+### Notes ###
+
+# The checkpoint journal lists the extraction units (model, phase, element, profile) that are safely
+# saved in the output workbook, with the index each one was given. Units are recorded as they are
+# written and committed to the journal only after the output has been saved, after each model and
+# every `every` units, so the journal never lists a unit that a crash could lose.
+# The first line of the journal holds the path of the output workbook and the last index it held before the run,
+# every other line one unit.
+# A resumed run reopens that workbook, skips the journaled units and carries on from the last index.
+# The journal is deleted once a run completes.
+
+class CheckpointJournal:
+    """ Journal of the completed extraction units of a run, see Extractor.checkpoint
+    """
+    def __init__(self, output_path: str, project_name: str, every: int = 200):
+        self.path = os.path.join(output_path, project_name + " Plaxis Extraction Journal.jsonl")
+        self.every = max(int(every), 1)
+        self.output_file = None
+        self.completed = set() # (model, phase, element, profile)
+        self.last_index = 0
+        self.pending = [] # units written to the output but not saved yet
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def load(self) -> bool:
+        """ Reads the journal of an interrupted run, False if there is none
+        """
+        if not self.exists():
+            return False
+        with open(self.path) as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        if not lines:
+            return False
+        self.output_file = lines[0]["output"]
+        self.last_index = lines[0].get("index", 0)
+        for unit in lines[1:]:
+            self.completed.add((unit["model"], unit["phase"], unit["element"], unit["profile"]))
+            self.last_index = max(self.last_index, unit["index"])
+        return True
+
+    def start(self, output_file: str, last_index: int = 0):
+        """ Starts the journal of a new run writing into output_file, whose rows before the run end at last_index
+        """
+        self.output_file = output_file
+        self.completed = set()
+        self.last_index = last_index
+        self.pending = []
+        with open(self.path, "w") as f:
+            f.write(json.dumps({"output": output_file, "index": last_index}) + "\n")
+
+    def models(self) -> set:
+        """ Models with at least one committed unit
+        """
+        return {unit[0] for unit in self.completed}
+
+    def is_complete(self, model: str, phase: str, element: str, profile: str) -> bool:
+        return (model, phase, element, profile) in self.completed
+
+    def record(self, model: str, phase: str, element: str, profile: str, no, index: int, status: str):
+        self.pending.append({"model": model, "phase": phase, "element": element, "profile": profile,
+                             "no": no, "index": index, "status": status})
+
+    def due(self) -> bool:
+        return len(self.pending) >= self.every
+
+    def commit(self):
+        """ Appends the pending units, to be called once the output holding them has been saved
+        """
+        if not self.pending:
+            return
+        with open(self.path, "a") as f:
+            for unit in self.pending:
+                f.write(json.dumps(unit) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        for unit in self.pending:
+            self.completed.add((unit["model"], unit["phase"], unit["element"], unit["profile"]))
+            self.last_index = max(self.last_index, unit["index"])
+        self.pending = []
+
+    def finish(self):
+        """ Removes the journal once the run is complete
+        """
+        self.pending = []
+        if self.exists():
+            os.remove(self.path)
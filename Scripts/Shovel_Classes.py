@@ -1,11 +1,37 @@
-import win32com.client
+try:
+    import win32com.client
+except ImportError: # Excel COM is only available on Windows, the columnar sinks do not need it
+    win32com = None
 import pandas as pd
 import numpy as np
 import psutil as psu
 import plxscripting.easy as plx
 import subprocess
+import socket
 import time
+import os
+import json
+from contextlib import contextmanager, ExitStack
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import multiprocessing
+import multiprocessing.util
+from queue import Queue
 import toolkit
+import Shovel_Envelope
+import Shovel_Compare
+from Shovel_Cache import ResultCache
+from Shovel_Sinks import ResultSink, ColumnarSink
+from Shovel_Pipeline import Pipeline, results_nbytes
+from Shovel_Plan import ExtractionPlan
+from Shovel_Results import ResultBlock, fetch_values, stack_rows
+from Shovel_Reduce import profile_reductions
+from Shovel_Capability import CapabilityIndex, element_type, plaxis_version
+from Shovel_Soil import SOIL_MESH, SoilSampler, is_cut_line
+from Shovel_Metrics import metrics
+from Shovel_Progress import progress_display
+from Shovel_Reader import sidecar_path, write_sidecar
+from Shovel_Checkpoint import CheckpointJournal
 
 ### Notes ###
 
@@ -24,11 +50,13 @@ class ExcelTable:
     def __init__(self, wb, sheet, tablename):
         """Creates a listobject from the table specified
         """
-        xl = win32com.client.gencache.EnsureDispatch('Excel.Application')
-        self.wb = xl.Workbooks(wb)
+        self.xl = win32com.client.gencache.EnsureDispatch('Excel.Application')
+        self.wb = self.xl.Workbooks(wb)
         self.sheet = self.wb.Worksheets(sheet)
         self.table = self.sheet.ListObjects(tablename)
         self.df = None
+        self.buffer = None # start_col:[rows] while buffering writes, None otherwise
+        self.col_count = None # columns of a table do not change during a run, counted once
 
     @classmethod
     def open_wb(cls, wb_path, sheet, tablename):
@@ -39,10 +67,31 @@ class ExcelTable:
         wb_name = str(wb.Name.split(".")[0])
         return cls(wb_name, sheet, tablename)
 
+    def sibling(self, sheet, tablename):
+        """ Opens another table of the same workbook
+        """
+        return type(self)(self.wb.Name, sheet, tablename)
+
     def headerlist(self):
         """Retrieves the header row range as a Tuple
         """
         return self.table.HeaderRowRange()[0]
+
+    def column_count(self) -> int:
+        if self.col_count is None:
+            self.col_count = self.table.ListColumns.Count
+        return self.col_count
+
+    def row_count(self) -> int:
+        return self.table.ListRows.Count
+
+    def column_values(self, column: str) -> list:
+        """ Values of one column of the data body as a list
+        """
+        values = self.table.ListColumns(column).DataBodyRange.Value
+        if not isinstance(values, tuple): # a single row is returned as a value
+            return [values]
+        return [row[0] for row in values]
     
     def dataframe(self, first_col_as_index: bool = False) -> object:
         """ Generates a dataframe based on the ListObject. First Column can optionally be the index.
@@ -81,23 +130,76 @@ class ExcelTable:
     
     def search_and_delete(self, delete_dict: dict):
         """ Dictionary of column name:[items to be removed]
+            Rows matching any item of any column are removed
         """
         if delete_dict == False:
             return
 
         for column in delete_dict:
-            for item in delete_dict[column]:
-                try:
-                    self.table.Range.AutoFilter(self.table.ListColumns(column).Index, item)
-                    delete_range = self.table.DataBodyRange.SpecialCells(12) # enum: xlAllVisibleCells
-                    self.table.AutoFilter.ShowAllData()
-                    delete_range.Delete(-4162) # enum: xlShiftUp'
-                except:
-                    if self.table.ShowAutoFilter:
-                        if self.table.AutoFilter.FilterMode:
-                            self.table.AutoFilter.ShowAllData()
-                    pass
+            self.bulk_delete({column: delete_dict[column]})
         return
+
+    def match_rows(self, criteria: dict) -> object:
+        """ Boolean array of the data body rows where each column in criteria holds one of its items
+        """
+        mask = None
+        for column, items in criteria.items():
+            if isinstance(items, (str, int, float)): # a single item
+                items = [items]
+            items = set(items)
+            values = self.column_values(column)
+            column_mask = np.fromiter((value in items for value in values), dtype=bool, count=len(values))
+            mask = column_mask if mask is None else mask & column_mask
+        return mask
+
+    def bulk_delete(self, criteria: dict, max_ranges: int = 20) -> int:
+        """ Deletes every row where each column in criteria holds one of its items, e.g. {"Model":["A"], "Element":["Plate_1"]}
+            Key columns are read once, matching rows are deleted as contiguous ranges from the bottom up,
+            or by rewriting the surviving rows in one assignment when the matches are scattered.
+            Returns the number of rows deleted
+        """
+        if self.table.DataBodyRange is None:
+            return 0
+
+        mask = self.match_rows(criteria)
+
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            return 0
+
+        # contiguous runs of matching rows as (first, last), 0-based within the data body
+        breaks = np.flatnonzero(np.diff(rows) != 1)
+        runs = list(zip(rows[np.r_[0, breaks + 1]], rows[np.r_[breaks, len(rows) - 1]]))
+
+        col_count = self.table.ListColumns.Count
+        with metrics.timer("excel_write"):
+            if len(runs) <= max_ranges:
+                for first, last in reversed(runs): # bottom up so that row numbers above stay valid
+                    body = self.table.DataBodyRange
+                    self.sheet.Range(body.Cells(int(first) + 1, 1), body.Cells(int(last) + 1, col_count)).Delete(-4162) # enum: xlShiftUp
+            else:
+                body = self.table.DataBodyRange
+                values = body.Value # full precision, the text of FormulaR1C1 only holds 15 significant digits
+                formulas = body.FormulaR1C1 # keeps formulas and relative references of the table
+                survivors = [list(row) for row, delete in zip(values, mask) if not delete]
+                if not survivors:
+                    self.clear_table()
+                    return len(rows)
+                survivor_formulas = [list(row) for row, delete in zip(formulas, mask) if not delete]
+                formula_cols = [any(isinstance(row[c], str) and row[c].startswith("=") for row in survivor_formulas) for c in range(col_count)]
+                c = 0
+                while c < col_count: # consecutive columns of values, or of formulas, are written in one assignment
+                    last = c
+                    while last + 1 < col_count and formula_cols[last + 1] == formula_cols[c]:
+                        last += 1
+                    target = self.sheet.Range(body.Cells(1, c + 1), body.Cells(len(survivors), last + 1))
+                    if formula_cols[c]:
+                        target.FormulaR1C1 = [row[c:last + 1] for row in survivor_formulas]
+                    else:
+                        target.Value = [row[c:last + 1] for row in survivors]
+                    c = last + 1
+                self.sheet.Range(body.Cells(len(survivors) + 1, 1), body.Cells(len(formulas), col_count)).Delete(-4162) # enum: xlShiftUp
+        return len(rows)
     
     def write_dict_to_table(self, data_dict: dict, wipe_table: bool = False, start_col: int = 1):
         """ Writes a dictionary consisting of data:iterable data pair into excel table
@@ -109,6 +211,10 @@ class ExcelTable:
         """
         if wipe_table:
             self.clear_table()
+
+        if self.buffer is not None:
+            self.buffer.setdefault(start_col, []).append(self.dict_to_rows(data_dict, start_col))
+            return
         
         for key in data_dict:
             data = data_dict[key]
@@ -141,10 +247,92 @@ class ExcelTable:
                     data_start_range = self.table.ListColumns(start_col).Range(last_row, 1).GetOffset(1, key_col_count)
                     data_end_range = data_start_range.GetOffset(data_row_count - 1, data_col_count - 1)
 
-                self.sheet.Range(key_start_range, key_end_range).Value = key
-                if input_data:
-                    self.sheet.Range(data_start_range, data_end_range).Value = input_data
+                with metrics.timer("excel_write"):
+                    self.sheet.Range(key_start_range, key_end_range).Value = key
+                    if input_data:
+                        self.sheet.Range(data_start_range, data_end_range).Value = input_data
 
+    def dict_to_rows(self, data_dict: dict, start_col: int = 1) -> list:
+        """ Converts a write_dict_to_table dictionary into the list of rows that would be written,
+            with the key repeated at the start of every row
+        """
+        max_cols = self.column_count() - start_col + 1
+        rows = []
+        for key in data_dict:
+            data = data_dict[key]
+            if not isinstance(key, tuple): #key has to be hashable type
+                key = (key,)
+            key = list(key)
+
+            if not data:
+                input_data = [[]]
+            elif isinstance(data[0], list):
+                input_data = [list(d) for d in zip(*data)]
+            else:
+                input_data = [[d] for d in data]
+
+            if len(key) + len(input_data[0]) > max_cols:
+                raise Exception("Data will fall outside table")
+            rows.extend(key + d for d in input_data)
+        return rows
+
+    def write_array_to_table(self, rows: np.ndarray, start_col: int = 1):
+        """ Writes a 2D array (e.g. ResultBlock.com_rows) below the table in one Range.Value assignment,
+            or adds it to the buffer. The array is handed to COM as it is
+        """
+        if rows.shape[1] > self.column_count() - start_col + 1:
+            raise Exception("Data will fall outside table")
+        if self.buffer is not None:
+            self.buffer.setdefault(start_col, []).append(rows)
+            return
+        self.write_rows(rows, start_col)
+
+    def write_rows(self, input_data, start_col: int = 1):
+        """ Assigns a rectangular block of rows to the range below the table
+        """
+        if not len(input_data):
+            return
+        col_count = len(input_data[0])
+        last_row = self.table.ListRows.Count + 1
+        start_range = self.table.ListColumns(start_col).Range(last_row, 1).GetOffset(1, 0)
+        end_range = start_range.GetOffset(len(input_data) - 1, col_count - 1)
+        with metrics.timer("excel_write"):
+            self.sheet.Range(start_range, end_range).Value = input_data
+
+    def flush(self):
+        """ Writes every buffered row to the bottom of the table, one Range.Value assignment per start column
+        """
+        if not self.buffer:
+            return
+
+        for start_col, chunks in self.buffer.items():
+            self.write_rows(stack_rows(chunks), start_col) # Range.Value needs a rectangular block
+        self.buffer = {}
+
+    @contextmanager
+    def buffered(self, freeze_app: bool = True):
+        """ Collects every write_dict_to_table call in memory and flushes them when the block exits.
+            ScreenUpdating and Calculation are switched off for the duration if freeze_app is set.
+            Usage: with table.buffered(): ...
+        """
+        if self.buffer is not None: # already buffering, the outer block flushes
+            yield self
+            return
+
+        if freeze_app:
+            screen_updating = self.xl.ScreenUpdating
+            calculation = self.xl.Calculation
+            self.xl.ScreenUpdating = False
+            self.xl.Calculation = -4135 # enum: xlCalculationManual
+        self.buffer = {}
+        try:
+            yield self
+            self.flush()
+        finally:
+            self.buffer = None
+            if freeze_app:
+                self.xl.Calculation = calculation
+                self.xl.ScreenUpdating = screen_updating
 
     def write_df_to_table(self, df: object, wipe_table: bool = False, starting_col: int = 1) -> bool:
         """ Inserts a dataframe to the bottom of a table. Option given to wipe table first. Index column will be excluded
@@ -162,7 +350,8 @@ class ExcelTable:
         # Getting entire pasting range
         start_range = self.table.ListColumns(starting_col).Range(last_row, 1).GetOffset(1, 0)
         end_range = start_range.GetOffset(len(df.index) - 1, len(df.columns) - 1)
-        self.sheet.Range(start_range, end_range).Value = data_list # Paste data
+        with metrics.timer("excel_write"):
+            self.sheet.Range(start_range, end_range).Value = data_list # Paste data
         return True
 
     def close(self, save: bool=False):
@@ -172,7 +361,53 @@ class ExcelTable:
         self.wb.SaveAs(full_path)
         if close:
             self.wb.Close(False)
+
+    def commit(self):
+        """ Makes table changes permanent. Nothing to do with COM, Excel holds the changes
+        """
+        return
+
+    def save(self, full_path: str = None):
+        """ Saves the workbook, as a macro enabled workbook at full_path if given
+        """
+        with metrics.timer("save"):
+            if full_path:
+                self.wb.SaveAs(full_path, 52) # enum for .xlsm format
+            else:
+                self.wb.Save()
+        self.wb.Activate()
+
+    @classmethod
+    def release(cls, path: str = None):
+        """ Nothing is cached with COM, Excel holds the workbooks
+        """
+        return
             
+def table_class(backend: str = "com") -> type:
+    """ Table class of a workbook backend: "com" for a live Excel application, "openpyxl" to work on the file directly
+    """
+    if str(backend).lower() == "openpyxl":
+        from Shovel_Workbook import OpenpyxlTable # openpyxl is only needed for headless runs
+        return OpenpyxlTable
+    return ExcelTable
+
+def reuse_plaxis(settings_dict: dict) -> bool:
+    """ 'Reuse running Plaxis' setting, a healthy server already listening on the port is used instead of relaunching
+    """
+    return str(settings_dict.get("Reuse running Plaxis") or "Yes").lower() not in ("no", "false", "0")
+
+def start_metrics(settings_dict: dict, report_name: str):
+    """ Enables the run instrumentation if 'Run report' is set, the JSON report (and the cProfile dump
+        if 'Profile run' is set) is written into the output folder when the run finishes
+    """
+    output_folder = settings_dict.get("Output folder path")
+    if not output_folder or str(settings_dict.get("Run report") or "No").lower() not in ("yes", "true", "1"):
+        return
+    profile_path = None
+    if str(settings_dict.get("Profile run") or "No").lower() in ("yes", "true", "1"):
+        profile_path = os.path.join(output_folder, report_name + " Profile.prof")
+    metrics.enable(os.path.join(output_folder, report_name + " Run Report.json"), profile_path)
+
 class Boilerplate:
     """ This class represents ONE application instance of either Plaxis Input or Output.
         If both Input and Output must be open, another instance of this class must be created.
@@ -193,12 +428,20 @@ class Boilerplate:
     def app_check_plaxis(self, plx_output: bool = False, terminate: bool = False) -> object:
         """ Checks if Plaxis is currently running. Default launches plaxis input.
             Enable terminate to ensure that process is killed. Will return process object otherwise if found.
+            The process launched by this object is checked first, before scanning the system processes.
         """
         if plx_output:
             app_name = "Plaxis2DOutput.exe"
         else:
             app_name = "Plaxis2DXInput.exe"
 
+        if self.process is not None and self.process.poll() is None:
+            if terminate:
+                self.process.terminate()
+                self.process = None
+                return None
+            return self.process
+
         for process in psu.process_iter():
             if process.name() == app_name:
                 if terminate:
@@ -208,9 +451,10 @@ class Boilerplate:
                     return process
         return None
 
-    def app_plaxis_launcher(self, plx_output: bool = False, timeout: float = 5.0) -> tuple:
+    def app_plaxis_launcher(self, plx_output: bool = False, timeout: float = 5.0, ready_timeout: float = 120.0) -> tuple:
         """ Launches Plaxis with optional timeout setting, recommended to stick to 5.0
             Default launches plaxis input.
+            The server port is polled until Plaxis accepts connections (up to ready_timeout) before connecting.
         """
         if plx_output:
             app_name = "Plaxis2DOutput.exe"
@@ -218,27 +462,531 @@ class Boilerplate:
             app_name = "Plaxis2DXInput.exe"
 
         args = [self.plaxis_folder + app_name, f"--AppServerPort={self.port}", f"--AppServerPassWord={self.password}"]
-        self.process = subprocess.Popen(args)
-        self.s, self.g = plx.new_server(address=self.host, port=self.port, timeout=timeout, password=self.password)
+        with metrics.timer("launch"):
+            self.process = subprocess.Popen(args)
+            if not self.app_wait_ready(ready_timeout):
+                raise Exception(f"{app_name} did not open port {self.port} within {ready_timeout} s")
+            self.s, self.g = plx.new_server(address=self.host, port=self.port, timeout=timeout, password=self.password)
         if self.s.active == True:
             return(self.process, self.s, self.g)
         return None
 
+    def app_port_open(self, timeout: float = 0.5) -> bool:
+        """ True if something accepts connections on the server port
+        """
+        try:
+            with socket.create_connection((self.host, self.port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+
+    def app_wait_ready(self, timeout: float = 120.0, delay: float = 0.05, max_delay: float = 2.0) -> bool:
+        """ Polls the server port with exponential backoff until it accepts connections.
+            Returns False on timeout or if the launched process exits first
+        """
+        end = time.perf_counter() + timeout
+        while True:
+            if self.app_port_open():
+                return True
+            if self.process is not None and self.process.poll() is not None:
+                return False
+            remaining = end - time.perf_counter()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
+
+    def app_connect(self, timeout: float = 5.0) -> bool:
+        """ Connects to a server already listening on the port, True if the connection is active
+        """
+        if not self.app_port_open():
+            return False
+        try:
+            self.s, self.g = plx.new_server(address=self.host, port=self.port, timeout=timeout, password=self.password)
+        except Exception:
+            self.s, self.g = None, None
+            return False
+        return self.app_connected()
+
+    def app_start(self, plx_output: bool = False, reuse: bool = True, terminate: bool = True) -> tuple:
+        """ Connects to a healthy server already running on the port if reuse is set,
+            otherwise (optionally terminating the running instance first) launches a new one
+        """
+        if reuse and self.app_connect():
+            return(self.process, self.s, self.g)
+        if terminate:
+            self.app_check_plaxis(plx_output=plx_output, terminate=True)
+        return self.app_plaxis_launcher(plx_output=plx_output)
+
+    def app_alive(self) -> bool:
+        """ True if the connection is active and the server still answers on its port
+        """
+        if self.process is not None and self.process.poll() is not None:
+            return False
+        return self.app_connected() and self.app_port_open()
+
+    def app_reconnect(self, plx_output: bool = False) -> tuple:
+        """ Restores a dropped connection, to the same server if it still answers, otherwise
+            to a relaunched instance. The launched instance is terminated if it stopped answering
+        """
+        self.s, self.g = None, None
+        if self.app_connect():
+            return(self.process, self.s, self.g)
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+        self.process = None
+        metrics.count("relaunch")
+        return self.app_plaxis_launcher(plx_output=plx_output)
+
+    def app_connected(self) -> bool:
+        """ True if this object already holds an active server connection, e.g. the warm Output of the Shovel daemon
+        """
+        try:
+            return self.s is not None and self.s.active == True
+        except Exception:
+            return False
+
+class PlaxisRegistry:
+    """ Caches the Plaxis proxy objects of ONE opened model so that phases, elements
+        and ResultTypes are resolved once through attribute lookup instead of eval.
+        Must be invalidated whenever a new model is opened on the server.
+    """
+    def __init__(self, g):
+        self.g = g
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, *attr_path: str) -> object:
+        """ Returns g.attr1.attr2... and caches the result under the attribute path
+        """
+        obj = self.cache.get(attr_path)
+        if obj is not None:
+            self.hits += 1
+            return obj
+
+        self.misses += 1
+        obj = self.g
+        for attr in attr_path:
+            obj = getattr(obj, attr)
+        self.cache[attr_path] = obj
+        return obj
+
+    def phase(self, phase_ID: str) -> object:
+        return self.resolve(phase_ID)
+
+    def element(self, elem_str: str) -> object:
+        return self.resolve(elem_str)
+
+    def collection(self, name: str) -> object:
+        """ Returns a model collection such as phases or plates
+        """
+        return self.resolve(name)
+
+    def resulttype(self, elem_type: str, property: str) -> object:
+        return self.resolve("ResultTypes", elem_type, property)
+
+    def invalidate(self, g=None):
+        """ Drops every cached proxy, optionally switching to a new global object
+        """
+        if g is not None:
+            self.g = g
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self.cache),
+                "hit_rate": self.hits / total if total else 0.0}
+
+class PlaxisConnectionLost(Exception):
+    """ Raised when the remote Plaxis session dropped in the middle of a request
+    """
+
+class PlaxisSession:
+    """ One connected Plaxis Output instance used for extraction. Owns its own object registry
+        so that several sessions on different ports can extract models side by side.
+    """
+    def __init__(self, bp: Boilerplate, cache: ResultCache = None):
+        self.bp = bp
+        if not bp.app_connected(): # otherwise reuses the running Output instead of launching another one
+            bp.app_plaxis_launcher(plx_output=True)
+        self.process, self.s, self.g = bp.process, bp.s, bp.g
+        self.registry = PlaxisRegistry(self.g)
+        self.calls = Counter() # remote getresults calls made, object lookups are counted by the registry
+        self.cache = cache
+        self.model_path = None # model that results are requested for
+        self.model_label = None # its name in tbl_PlaxisFiles, the key of its metrics
+        self.loaded_path = None # model that is actually opened in Plaxis
+        self.soil = None # SoilSampler of the soil cut lines of the current model
+
+    def open_model(self, model_path: str, model_name: str = None):
+        """ Sets the model to extract from. With a result cache the model is only opened in Plaxis
+            once a result is requested that is not cached. model_name is the name of the model in tbl_PlaxisFiles
+        """
+        self.model_path = model_path
+        self.model_label = model_name
+        if self.cache is None:
+            self.load_model()
+        return
+
+    def load_model(self):
+        if self.loaded_path != self.model_path:
+            with metrics.timer("open_model", self.model_name()):
+                try:
+                    self.s.open(self.model_path)
+                except Exception:
+                    if self.bp.app_alive():
+                        raise
+                    self.reconnect()
+                    self.s.open(self.model_path)
+            self.registry.invalidate() # proxies of the previous model are no longer valid
+            self.loaded_path = self.model_path
+            self.calls['open'] += 1
+        return
+
+    def model_name(self) -> str:
+        if self.model_label is not None:
+            return self.model_label
+        return os.path.splitext(os.path.basename(self.model_path))[0] if self.model_path else None
+
+    def extract_results(self, phase_str: str, elem_str: str, properties: list) -> dict:
+        """ Extracts every result type in properties for one phase/element pair.
+            Phase and element objects are only looked up once for the whole batch.
+            Returns a dictionary of property:float64 array, failed properties return an empty list
+        """
+        results_dict = {prop: [] for prop in properties}
+        if self.cache is None:
+            self.fetch_results(phase_str, elem_str, results_dict)
+            return results_dict
+
+        cached = self.cache.get_many(self.model_path, phase_str, elem_str, properties)
+        missing = {prop: [] for prop in properties if prop not in cached}
+        if missing:
+            self.load_model()
+            self.fetch_results(phase_str, elem_str, missing)
+            fetched = {prop: values for prop, values in missing.items() if len(values)} # a failed fetch is retried next run
+            self.cache.put_many(self.model_path, phase_str, elem_str, fetched)
+        results_dict.update(cached)
+        results_dict.update(missing)
+        return results_dict
+
+    def reconnect(self):
+        """ Restores a dropped Plaxis connection, the model has to be opened again
+        """
+        self.bp.app_reconnect(plx_output=True)
+        self.process, self.s, self.g = self.bp.process, self.bp.s, self.bp.g
+        self.registry.invalidate(self.g)
+        self.loaded_path = None
+        self.calls['reconnect'] += 1
+
+    def fetch_results(self, phase_str: str, elem_str: str, results_dict: dict):
+        """ Fills results_dict of property:[] with the results from the opened Plaxis model.
+            If the connection drops, reconnects, reopens the model and fetches again once
+        """
+        try:
+            self.try_fetch_results(phase_str, elem_str, results_dict)
+        except PlaxisConnectionLost:
+            self.reconnect()
+            self.load_model()
+            self.try_fetch_results(phase_str, elem_str, results_dict)
+
+    def try_fetch_results(self, phase_str: str, elem_str: str, results_dict: dict):
+        """ Fetches from the current connection. A failed lookup or result is skipped,
+            unless the connection is gone, which raises PlaxisConnectionLost
+        """
+        g = self.g
+        registry = self.registry
+
+        try:
+            elem_type = element_type(elem_str)
+            phase_ID = phase_str[phase_str.find('[')+1:phase_str.find(']')]
+            phase_obj = registry.phase(phase_ID)
+            element_obj = None if elem_str == SOIL_MESH else registry.element(elem_str) # every soil node
+        except:
+            if not self.bp.app_alive():
+                raise PlaxisConnectionLost()
+            return
+
+        model_name = self.model_name()
+        for prop in results_dict:
+            try:
+                resulttype_obj = registry.resulttype(elem_type, prop)
+                with metrics.timer("getresults", model_name):
+                    if element_obj is None:
+                        results = g.getresults(phase_obj, resulttype_obj, 'node')
+                    else:
+                        results = g.getresults(element_obj, phase_obj, resulttype_obj, 'node')
+                self.calls['getresults'] += 1
+                results_dict[prop] = fetch_values(results)
+            except:
+                if not self.bp.app_alive():
+                    raise PlaxisConnectionLost()
+        return
+
+    def extract_phase(self, phase_str: str, element_props: dict) -> dict:
+        """ Extracts a whole phase in one grouped pass.
+            element_props is a dictionary of element:[properties]
+            Returns a dictionary of element:ResultBlock. Soil cut lines are sampled from the results of every soil node,
+            see Shovel_Soil
+        """
+        cut_lines = {element: properties for element, properties in element_props.items() if is_cut_line(element)}
+        sampled = {}
+        if cut_lines:
+            if self.soil is None or self.soil.model_path != self.model_path:
+                self.soil = SoilSampler(self.model_path)
+            sampled = self.soil.sample_phase(lambda phase, properties: self.extract_results(phase, SOIL_MESH, properties),
+                                             phase_str, cut_lines)
+        return {element: ResultBlock(sampled[element] if element in sampled else self.extract_results(phase_str, element, properties),
+                                     phase_str, element)
+                for element, properties in element_props.items()}
+
+    def collect_profiles(self, extractions: list, profile_dict: dict):
+        """ Generator yielding (extraction row, {element:ResultBlock}) for every extraction row, as soon as its elements are fetched.
+            The fetches go through an ExtractionPlan, so that an element shared by several rows
+            is only requested once per phase and result type, then fanned out to the rows
+        """
+        plan = ExtractionPlan(extractions, profile_dict)
+
+        def fetch(phase: str, element_props: dict) -> dict:
+            if any(is_cut_line(element) for element in element_props): # one soil mesh fetch serves every cut line of the phase
+                element_props = dict(element_props, **{element: properties for element, properties in plan.fetches[phase].items()
+                                                       if is_cut_line(element)})
+            return self.extract_phase(phase, element_props)
+
+        for phase in plan.fetches:
+            yield from plan.fan_out(phase, fetch)
+
+    def close(self):
+        if self.process:
+            self.process.terminate()
+
+class ExcelSink(ResultSink):
+    """ Writes the extraction into the output workbook, either a copy of the template or an existing extraction file
+    """
+    def __init__(self, settings_dict: dict, profiles_df: object, extract_all: bool = False, table_cls: type = None):
+        self.table_cls = table_cls or ExcelTable
+        self.settings_dict = settings_dict
+        self.profiles_df = profiles_df
+        self.extract_all = extract_all
+        self.output_path = settings_dict["Output folder path"]
+        self.project_name = settings_dict["Project Name"]
+        self.output_data_table = None
+        self.output_map_table = None
+        self.output_profile_table = None
+        self.output_istemplate = True
+        self.output_workbook = None # path of the workbook holding the results once saved
+        self.resume = False
+        self.journaled_models = set() # models with checkpointed rows in a resumed output
+        self.buffers = None
+
+    def open(self, resume_file: str = None, resume_index: int = 0, journaled_models: set = ()):
+        """ Opens extraction workbook defined in the shovel settings table,
+            If no path is provided, use the template workbook specified.
+            resume_file reopens the output of an interrupted run, rows after resume_index were not checkpointed and are removed.
+            journaled_models are the models of that run with checkpointed rows
+        """
+        if resume_file:
+            wb_path = resume_file
+            self.output_istemplate = False
+            self.resume = True
+            self.journaled_models = set(journaled_models)
+        elif self.settings_dict["Existing Excel path"] == None:
+            if self.settings_dict["Template Excel path"] == None:
+                toolkit.mbox("Extraction stopped", "Please enter path of extraction file or template")
+                exit()
+            else:
+                wb_path = self.settings_dict["Template Excel path"]
+                self.output_istemplate = True
+        else:
+            wb_path = self.settings_dict["Existing Excel path"]
+            self.output_istemplate = False
+
+        self.output_data_table = self.table_cls.open_wb(wb_path, "Extractor", "tbl_Data")
+        self.output_map_table = self.output_data_table.sibling("Extractor", "tbl_Extraction")
+        self.output_profile_table = self.output_data_table.sibling("_Profiles", "tbl_AllProfiles")
+        if self.output_istemplate:
+            self.output_workbook = os.path.join(self.output_path, self.project_name + ' Plaxis Extraction.xlsm')
+        else:
+            self.output_workbook = wb_path
+
+        if self.resume:
+            self.discard_after(resume_index)
+        elif self.extract_all:
+            self.output_data_table.clear_table()
+            self.output_map_table.clear_table() 
+        return
+
+    def discard_after(self, last_index: int):
+        """ Removes the rows written after the last checkpoint of an interrupted run
+        """
+        for table in (self.output_map_table, self.output_data_table):
+            if table.row_count():
+                stale = [index for index in table.column_values("Index") if index is not None and index > last_index]
+                if stale:
+                    table.bulk_delete({"Index": stale})
+
+    def start_model(self, model_name: str) -> int:
+        """ Removes all profiles of the current model in the output table. Returns the max index for the add profile step
+        """
+        if self.resume: # rows of a model without checkpointed rows predate the run, their deletion may not have been saved
+            keep_rows = model_name in self.journaled_models
+        else:
+            keep_rows = self.extract_all or self.output_istemplate
+        if (self.output_map_table.row_count() <= 1) and (self.output_data_table.row_count() <= 1):
+            max_index = 0
+        elif keep_rows:
+            max_index = self.max_index()
+        else:
+            self.output_map_table.dataframe()
+            current_dict = self.output_map_table.df_to_dict("Index", filter_column="Model", filter_data=model_name)
+            self.output_map_table.search_and_delete({"Model": [model_name]})
+            self.output_data_table.search_and_delete({"Index": list(current_dict)})
+            max_index = self.max_index()
+
+        # Rows of the model are kept in memory and written to each table in one go
+        self.buffers = ExitStack()
+        self.buffers.enter_context(self.output_data_table.buffered())
+        self.buffers.enter_context(self.output_map_table.buffered())
+        return max_index
+
+    def max_index(self) -> int:
+        return int(max((index for index in self.output_map_table.column_values("Index") if index is not None), default=0))
+
+    def write_profile(self, index: int, no, model_name: str, phase: str, element: str, profile: str, status: str, results: dict):
+        if status == 'Extracted':
+            self.output_data_table.write_array_to_table(results.com_rows(index)) # rows of index, x coord, y coord, data
+
+        extraction_dict = {(index, no, model_name, phase, element, profile, status): []} # dictionary of profile: empty list
+        self.output_map_table.write_dict_to_table(extraction_dict)
+
+    def end_model(self, model_name: str):
+        self.buffers.close()
+        self.buffers = None
+
+    def checkpoint(self):
+        """ Writes the buffered rows and saves the output workbook
+        """
+        self.output_data_table.flush()
+        self.output_map_table.flush()
+        self.save()
+
+    def save(self):
+        """ Saves the output, a template is saved once as the extraction file which is then saved in place
+        """
+        if self.output_istemplate:
+            new_file_name = self.project_name + ' Plaxis Extraction'
+            self.output_map_table.save(os.path.join(self.output_path, new_file_name))
+            self.output_istemplate = False
+        else:
+            self.output_map_table.save()
+
+    def close(self):
+        self.output_profile_table.write_df_to_table(self.profiles_df.loc[:, 'Name':'Property 8'], wipe_table=True) # Copies the profile table over, without the optional reduction columns
+        self.save()
+        if str(self.settings_dict.get("Write results index") or "Yes").lower() not in ("no", "false", "0"):
+            self.write_results_index()
+
+    def write_results_index(self):
+        """ Writes the sidecar of the saved output read by Shovel_Reader.ResultsReader
+        """
+        with metrics.timer("save"):
+            mtime = os.path.getmtime(self.output_workbook) if os.path.isfile(self.output_workbook) else None
+            write_sidecar(sidecar_path(self.output_workbook), self.output_map_table.dataframe(),
+                          self.output_data_table.dataframe(), self.output_profile_table.dataframe(), mtime)
+
+def list_elements(bp: Boilerplate, registry: PlaxisRegistry, model: str, path: str) -> list:
+    """ Opens a model in the Output of bp and lists the names of its phases and structural elements
+    """
+    with metrics.timer("open_model", model):
+        try:
+            bp.s.open(path)
+        except Exception:
+            if bp.app_alive():
+                raise
+            bp.app_reconnect(plx_output=True) # the connection dropped, carries on with a new one
+            registry.invalidate(bp.g)
+            bp.s.open(path)
+    registry.invalidate()
+    elements = []
+    for elem_type in Loader.extraction_list:
+        try:
+            if elem_type != "phases":
+                elements.extend(element.Name.value for element in registry.collection(elem_type))
+            else:
+                elements.extend(element.Identification.value for element in registry.collection(elem_type))
+        except:
+            pass
+    return elements
+
+_inventory_worker = None # (Boilerplate, PlaxisRegistry) of an inventory worker process
+
+def inventory_worker_init(settings_dict: dict, ports: object, reuse: bool):
+    """ Initializer of the Loader process pool, takes the next port of the ports queue
+    """
+    inventory_worker_start(settings_dict, ports.get(), reuse)
+
+def inventory_worker_start(settings_dict: dict, port: int, reuse: bool):
+    """ Launches or connects the Plaxis Output of this worker process
+    """
+    global _inventory_worker
+    bp = Boilerplate(settings_dict["Host"], port, settings_dict["Plaxis password"], settings_dict["Plaxis installation folder"])
+    bp.app_start(plx_output=True, reuse=reuse, terminate=False) # the other workers run the same executable
+    _inventory_worker = (bp, PlaxisRegistry(bp.g))
+    # runs when the pool shuts the worker process down
+    multiprocessing.util.Finalize(None, inventory_worker_stop, exitpriority=10)
+
+def inventory_worker_stop():
+    """ Terminates the Plaxis Output launched by this worker process, a reused one keeps running
+    """
+    global _inventory_worker
+    if _inventory_worker is None:
+        return
+    bp = _inventory_worker[0]
+    _inventory_worker = None
+    if bp.process is not None and bp.process.poll() is None:
+        bp.process.terminate()
+
+def inventory_worker_list(model: str, path: str) -> tuple:
+    """ Lists the elements of a model in a worker process. Returns (model, elements, worker port, seconds)
+    """
+    bp, registry = _inventory_worker
+    start = time.perf_counter()
+    elements = list_elements(bp, registry, model, path)
+    return model, elements, bp.port, time.perf_counter() - start
+
 class Loader:
     """ This class iterates through the model table, opens models that are queued to be loaded
         and extracts all element and phase data from them
     """
-    def __init__(self, shovel_wb: str, load_all: bool=False):
-        settings = ExcelTable(shovel_wb,"Plaxis_extractor", "tbl_Settings")
+    extraction_list = ["phases", "plates", "EmbeddedBeamRows", "NodeToNodeAnchors", "FixedEndAnchors", "Geogrids", "Interfaces"]
+
+    def __init__(self, shovel_wb: str, load_all: bool=False, backend: str = "com", bp: Boilerplate = None):
+        """ bp is an already connected Plaxis Output (see Shovel_Daemon), otherwise a new Output is launched.
+            With more than one 'Plaxis workers', models are opened by a pool of processes, each with its own
+            Output on the ports from the output port on, and no Output is launched here
+        """
+        self.table_cls = table_class(backend)
+        settings = self.table_cls(shovel_wb,"Plaxis_extractor", "tbl_Settings")
         settings.dataframe()
         self.settings_dict = settings.df_to_dict("Settings", ["Value"])
-        self.bp = Boilerplate(self.settings_dict["Host"], self.settings_dict["Plaxis output port"], 
-                              self.settings_dict["Plaxis password"], self.settings_dict["Plaxis installation folder"])
-        self.bp.app_check_plaxis(plx_output=True, terminate=True)
-        process, self.s, self.g = self.bp.app_plaxis_launcher(plx_output=True)
+        start_metrics(self.settings_dict, "Shovel Load")
+        self.worker_count = max(int(self.settings_dict.get("Plaxis workers") or 1), 1)
+        self.worker_initializer = inventory_worker_init # replaced by the benchmark to run the workers against fakes
+        self.worker_stats = {} # port: {"models", "seconds"}
+        self.s, self.g, self.registry = None, None, None
+        if bp is not None and bp.app_connected():
+            self.bp = bp
+        else:
+            self.bp = Boilerplate(self.settings_dict["Host"], self.settings_dict["Plaxis output port"], 
+                                  self.settings_dict["Plaxis password"], self.settings_dict["Plaxis installation folder"])
+            if self.worker_count == 1:
+                self.bp.app_start(plx_output=True, reuse=reuse_plaxis(self.settings_dict))
+        if self.bp.g is not None:
+            self.s, self.g = self.bp.s, self.bp.g
+            self.registry = PlaxisRegistry(self.g)
 
-        self.element_tbl = ExcelTable(shovel_wb, "_system", "tbl_AllElements")
-        model_tbl = ExcelTable(shovel_wb, "Plaxis_extractor", "tbl_PlaxisFiles")
+        self.element_tbl = self.table_cls(shovel_wb, "_system", "tbl_AllElements")
+        model_tbl = self.table_cls(shovel_wb, "Plaxis_extractor", "tbl_PlaxisFiles")
         model_tbl.dataframe()
         self.load_all = load_all
         if load_all:
@@ -246,6 +994,103 @@ class Loader:
         else:
             self.model_dict = model_tbl.df_to_dict("Model Name", ["Path"], "Action", "Load Model")
 
+        # Incremental loading skips models whose file did not change since they were last loaded
+        self.inventory_path = None
+        output_folder = self.settings_dict.get("Output folder path")
+        if output_folder and str(self.settings_dict.get("Incremental load") or "Yes").lower() not in ("no", "false", "0"):
+            self.inventory_path = os.path.join(output_folder, "Shovel Inventory.json")
+
+    def plx_start(self):
+        """ Launches or connects the Output of this process, which __init__ leaves to the worker pool
+            when there is more than one worker
+        """
+        if self.g is None:
+            self.bp.app_start(plx_output=True, reuse=reuse_plaxis(self.settings_dict))
+            self.s, self.g = self.bp.s, self.bp.g
+            self.registry = PlaxisRegistry(self.g)
+
+    def plx_list_elements(self, model: str, path: str) -> list:
+        """ Opens a model and lists the names of its phases and structural elements
+        """
+        elements = list_elements(self.bp, self.registry, model, path)
+        self.s, self.g = self.bp.s, self.bp.g
+        return elements
+
+    def plx_list_models(self, model_paths: dict, progress: object) -> dict:
+        """ Lists the elements of every model:path, on the worker pool when there is more than one worker.
+            Returns a dictionary of model:[elements] in model_paths order
+        """
+        task = progress.task("Models", len(model_paths))
+        if self.worker_count == 1 or len(model_paths) < 2:
+            self.plx_start()
+            listed = {}
+            for model, path in model_paths.items():
+                task.describe(model)
+                listed[model] = self.plx_list_elements(model, path)
+                task.advance()
+            return listed
+        return self.plx_list_models_parallel(model_paths, task)
+
+    def plx_list_models_parallel(self, model_paths: dict, task: object) -> dict:
+        """ Spreads the models over a process pool, each worker process keeping its own Output open
+            on its own port. Models are handed out one at a time, so a slow model does not hold up the others
+        """
+        first_port = int(self.settings_dict["Plaxis output port"]) + (1 if self.bp.app_connected() else 0) # leaves a connected Output alone
+        worker_count = min(self.worker_count, len(model_paths))
+        context = multiprocessing.get_context("spawn") # as on Windows, the workers only inherit what is passed to them
+        ports = context.Queue()
+        for i in range(worker_count):
+            ports.put(first_port + i)
+
+        listed = {}
+        self.worker_stats = {}
+        with ProcessPoolExecutor(max_workers=worker_count, mp_context=context, initializer=self.worker_initializer,
+                                 initargs=(self.settings_dict, ports, reuse_plaxis(self.settings_dict))) as pool:
+            futures = [pool.submit(inventory_worker_list, model, path) for model, path in model_paths.items()]
+            for future in as_completed(futures):
+                model, elements, port, seconds = future.result()
+                task.describe(model) # follows the completion order
+                listed[model] = elements
+                stats = self.worker_stats.setdefault(port, {"models": 0, "seconds": 0.0})
+                stats["models"] += 1
+                stats["seconds"] += seconds
+                metrics.record("open_model", seconds, model)
+                task.advance()
+        for port, stats in self.worker_stats.items():
+            metrics.count(f"worker_{port}_models", stats["models"])
+        return {model: listed[model] for model in model_paths}
+
+    def worker_report(self) -> str:
+        """ Models listed and throughput of every worker of the last parallel listing
+        """
+        return "\n".join(f"Output port {port}: {stats['models']} models in {stats['seconds']:.1f} s, "
+                         f"{60 * stats['models'] / stats['seconds'] if stats['seconds'] else 0:.1f} models/min"
+                         for port, stats in sorted(self.worker_stats.items()))
+
+    def xl_read_inventory(self) -> dict:
+        """ Reads the AllElements table into a dictionary of model:[elements]
+        """
+        df = self.element_tbl.dataframe()
+        inventory = {}
+        for model, element in zip(df["Model"].tolist(), df[self.xl_element_column(df)].tolist()):
+            if model is not None:
+                inventory.setdefault(model, []).append(element)
+        return inventory
+
+    @staticmethod
+    def xl_element_column(df: object) -> str:
+        """ Name of the AllElements column holding element names, which follows the model column
+        """
+        return df.columns[list(df.columns).index("Model") + 1]
+
+    @staticmethod
+    def diff_elements(old: list, new: list) -> tuple:
+        """ Returns the (added, removed) elements between two inventories of a model, keeping their order
+        """
+        old_set = set(old)
+        new_set = set(new)
+        return [e for e in new if e not in old_set], [e for e in old if e not in new_set]
+
     def extract_to_table(self) -> bool:
         """ Extracts all element and phase data of the current model into shovel AllElements table
         """
@@ -253,217 +1098,437 @@ class Loader:
             toolkit.mbox("Loading model info into excel...", "No model to load")
             exit()
 
+        if self.inventory_path:
+            return self.extract_incremental()
+
         if self.load_all:
             try:
                 self.element_tbl.clear_table()
             except Exception:
                 pass
 
-        window = toolkit.create_window("Loading model info into excel...") # Window for progressbar
-        extraction_list = ["phases", "plates", "EmbeddedBeamRows", "NodeToNodeAnchors", "FixedEndAnchors", "Geogrids", "Interfaces"]
-        new_elements_dict = {}
-        for i, model in enumerate(self.model_dict, start=1):
-            progressbar = toolkit.create_progressbar(window, model, i) # 1 bar per model
-            path = self.model_dict[model]
-            if not self.load_all:
-                self.element_tbl.search_and_delete({"Model": [model]}) 
-            self.s.open(path)
-
-            for elem_type in extraction_list:
-                try:
-                    if elem_type != "phases":
-                        new_elements_dict[model] = new_elements_dict.get(model, []) + [element.Name.value for element in eval("self.g." + elem_type)]
-                    else:
-                        new_elements_dict[model] = new_elements_dict.get(model, []) + [element.Identification.value for element in eval("self.g." + elem_type)]
-                except:
-                    pass
-
-                toolkit.step_progressbar(progressbar, 14.3)
+        progress = progress_display(self.settings_dict, "Loading model info into excel...")
+        if not self.load_all:
+            self.element_tbl.search_and_delete({"Model": list(self.model_dict)})
+        new_elements_dict = self.plx_list_models(self.model_dict, progress)
 
         self.element_tbl.write_dict_to_table(new_elements_dict, start_col=2)
-        window.destroy()
-        toolkit.mbox("Plaxis model extraction", "Done!")
+        self.element_tbl.commit()
+        metrics.finish()
+        progress.close()
+        toolkit.mbox("Plaxis model extraction", "\n".join(["Done!"] + ([self.worker_report()] if self.worker_stats else [])))
+
+    def extract_incremental(self):
+        """ Only opens models whose fingerprint changed since the last load, and only writes
+            the elements that were added to or removed from them
+        """
+        try:
+            with open(self.inventory_path) as f:
+                fingerprints = json.load(f)
+        except (OSError, ValueError):
+            fingerprints = {}
+
+        current = self.xl_read_inventory()
+        element_col = self.xl_element_column(self.element_tbl.df)
+        if self.load_all: # models that are no longer listed are dropped, as a full reload would
+            stale = [model for model in current if model not in self.model_dict]
+            if stale:
+                self.element_tbl.search_and_delete({"Model": stale})
+
+        progress = progress_display(self.settings_dict, "Loading model info into excel...")
+        changed = {}
+        new_fingerprints = {}
+        for model, path in self.model_dict.items():
+            fingerprint = ResultCache.model_fingerprint(path)
+            if fingerprints.get(path) != fingerprint or model not in current:
+                changed[model] = path
+                new_fingerprints[path] = fingerprint
+        skipped = len(self.model_dict) - len(changed)
+
+        new_elements_dict = {}
+        for model, elements in self.plx_list_models(changed, progress).items():
+            added, removed = self.diff_elements(current.get(model, []), elements)
+            if removed:
+                self.element_tbl.bulk_delete({"Model": [model], element_col: removed})
+            if added:
+                new_elements_dict[model] = added
+        fingerprints.update(new_fingerprints)
+
+        if new_elements_dict:
+            self.element_tbl.write_dict_to_table(new_elements_dict, start_col=2)
+        self.element_tbl.commit()
+        with open(self.inventory_path, "w") as f:
+            json.dump(fingerprints, f, indent=1)
+        metrics.finish()
+        progress.close()
+        toolkit.mbox("Plaxis model extraction", "\n".join([f"Done! {skipped} unchanged models skipped"] + ([self.worker_report()] if self.worker_stats else [])))
 
 class Extractor:
 
-    def __init__(self, shovel_wb: str, extract_all: bool=False) -> None:
-        settings = ExcelTable(shovel_wb,"Plaxis_extractor", "tbl_Settings")
+    def __init__(self, shovel_wb: str, extract_all: bool=False, backend: str = "com", dry_run: bool = False, bp: Boilerplate = None,
+                 resume: bool = False) -> None:
+        """ With dry_run, Plaxis is not launched and process_flow only reports the extraction plan of every model.
+            bp is an already connected Plaxis Output (see Shovel_Daemon) that is reused and left running.
+            With resume (or the 'Resume extraction' setting), an interrupted run is continued from its checkpoint journal
+        """
+        self.table_cls = table_class(backend)
+        settings = self.table_cls(shovel_wb,"Plaxis_extractor", "tbl_Settings")
         settings.dataframe()
         self.settings_dict = settings.df_to_dict("Settings", ["Value"])
+        self.dry_run = dry_run
+        if not dry_run:
+            start_metrics(self.settings_dict, self.settings_dict["Project Name"] + " Plaxis Extraction")
 
         # Plaxis output boilerplate object
-        self.bp_output = Boilerplate(self.settings_dict["Host"], self.settings_dict["Plaxis output port"], 
-                              self.settings_dict["Plaxis password"], self.settings_dict["Plaxis installation folder"])
-        self.bp_output.app_check_plaxis(plx_output=True, terminate=True)
-        self.process, self.s_o, self.g_o = self.bp_output.app_plaxis_launcher(plx_output=True)
+        self.owns_output = bp is None or not bp.app_connected()
+        if self.owns_output:
+            self.bp_output = Boilerplate(self.settings_dict["Host"], self.settings_dict["Plaxis output port"], 
+                                  self.settings_dict["Plaxis password"], self.settings_dict["Plaxis installation folder"])
+        else:
+            self.bp_output = bp
+        self.cache = None
+        self.session = None
+        self.process, self.s_o, self.g_o = None, None, None
+        self.registry = None
+        self.plx_calls = Counter()
+        if not dry_run:
+            if self.owns_output:
+                self.bp_output.app_start(plx_output=True, reuse=reuse_plaxis(self.settings_dict))
+            if self.settings_dict["Output folder path"] and str(self.settings_dict.get("Use result cache") or "Yes").lower() not in ("no", "false", "0"):
+                self.cache = ResultCache(self.settings_dict["Output folder path"], float(self.settings_dict.get("Result cache size (MB)") or 512))
+            self.session = PlaxisSession(self.bp_output, self.cache)
+            self.process, self.s_o, self.g_o = self.session.process, self.session.s, self.session.g
+            self.registry = self.session.registry
+            self.plx_calls = self.session.calls
+        self.worker_count = max(int(self.settings_dict.get("Plaxis workers") or 1), 1)
+        # Plaxis fetching runs ahead of the sink by up to this many extraction rows, 0 to fetch and write in turn
+        pipeline_depth = self.settings_dict.get("Pipeline queue depth")
+        self.pipeline_depth = 16 if pd.isna(pipeline_depth) or pipeline_depth == "" else int(pipeline_depth)
+        pipeline_mb = self.settings_dict.get("Pipeline memory (MB)") # 0 lets a single row through at a time
+        self.pipeline_max_bytes = None if pd.isna(pipeline_mb) or pipeline_mb == "" else int(float(pipeline_mb) * 1024 * 1024)
         
         # Extraction table converted to dataframe
-        extraction_tbl = ExcelTable(shovel_wb, "Plaxis_extractor", "tbl_Extraction")
+        extraction_tbl = self.table_cls(shovel_wb, "Plaxis_extractor", "tbl_Extraction")
         self.extraction_df = extraction_tbl.dataframe().drop(columns=["Element Type"])
-        profiles_tbl = ExcelTable(shovel_wb, "Plaxis_extractor", "tbl_Profiles")
+        profiles_tbl = self.table_cls(shovel_wb, "Plaxis_extractor", "tbl_Profiles")
         self.profiles_df = profiles_tbl.dataframe(first_col_as_index=True)
+        self.reductions = profile_reductions(self.profiles_df) # profile:ProfileReduction, from the optional tbl_Profiles columns
         extraction_models = set(self.extraction_df.loc[:, 'Model'].values.tolist())
 
         # Get dictionary of models to be extracted
-        model_tbl = ExcelTable(shovel_wb, "Plaxis_extractor", "tbl_PlaxisFiles")
+        model_tbl = self.table_cls(shovel_wb, "Plaxis_extractor", "tbl_PlaxisFiles")
         model_tbl.dataframe()
         self.extract_all = extract_all
         if extract_all:
             all_model_dict = model_tbl.df_to_dict("Model Name", ["Path"])
         else:
             all_model_dict = model_tbl.df_to_dict("Model Name", ["Path"], "Action", "Extract Data")
-        self.model_dict = {model:all_model_dict[model] for model in extraction_models}
+        self.model_dict = {model:path for model, path in all_model_dict.items() if model in extraction_models} # keeps tbl_PlaxisFiles order
 
         # Class variables to be used in later functions
         self.all_profiles = []
-        self.output_data_table = None
-        self.output_map_table = None
         self.output_path = self.settings_dict["Output folder path"]
         self.project_name = self.settings_dict["Project Name"]
         self.output_max_index = 0
-        self.output_istemplate = True
-        self.window = toolkit.create_window("Plaxis data extraction")
-        self.progressbar = None
+        # Extraction rows asking for result types that their element type does not have are pruned before the run
+        self.capabilities = None
+        if str(self.settings_dict.get("Validate result types") or "Yes").lower() not in ("no", "false", "0"):
+            self.capabilities = CapabilityIndex(plaxis_version(self.settings_dict["Plaxis installation folder"]),
+                                                os.path.join(toolkit.user_folder(), "Shovel ResultTypes.json")) # shared by every project
+        output_format = str(self.settings_dict.get("Output format") or "Excel")
+        if dry_run:
+            self.sink = ResultSink()
+        elif output_format.lower() == "excel":
+            self.sink = ExcelSink(self.settings_dict, self.profiles_df, extract_all, self.table_cls)
+        else:
+            self.sink = ColumnarSink(self.output_path, self.project_name, output_format)
+        self.envelopes = None # envelopes of every extracted element over its phases, computed per model
+        self.envelope_records = []
+        if str(self.settings_dict.get("Compute envelopes") or "No").lower() in ("yes", "true", "1"):
+            self.envelopes = []
+        self.comparison_records = None # results of every model, kept until the models are compared at the end of the run
+        if str(self.settings_dict.get("Compare models") or "No").lower() in ("yes", "true", "1"):
+            self.comparison_records = []
+        # Checkpoints save the output workbook and journal the completed units, so that a crashed run can be resumed
+        self.journal = None
+        self.resume = resume or str(self.settings_dict.get("Resume extraction") or "No").lower() in ("yes", "true", "1")
+        self.resuming = False
+        if isinstance(self.sink, ExcelSink) and self.output_path:
+            self.journal = CheckpointJournal(self.output_path, self.project_name, int(self.settings_dict.get("Checkpoint every") or 1000))
+        self.progress = None if dry_run else progress_display(self.settings_dict, "Plaxis data extraction")
+        self.model_progress = None
+        self.element_progress = None
 
 
-    def plx_open_model(self, model_path: str):
-        self.s_o.open(model_path)
+    def plx_open_model(self, model_name: str, model_path: str):
+        self.session.open_model(model_path, model_name)
         return
     
-    def plx_extract_model(self, phase_str: str, elem_str: str, property: str) -> list: 
+    def plx_extract_model(self, phase_str: str, elem_str: str, property: str) -> np.ndarray: 
         """ Extracts data from plaxis based on subprofile list
 
         """
-        g = self.g_o
-        
-        try:
-            elem_type = elem_str.split('_')[0]
-            if elem_type == 'NegativeInterface' or elem_type == 'PositiveInterface':
-                elem_type = 'Interface'
-            phase_ID = phase_str[phase_str.find('[')+1:phase_str.find(']')]
-            phase_obj = eval(f"g.{phase_ID}")
-            element_obj = eval(f"g.{elem_str}")
-            resulttype_obj = eval(f"g.ResultTypes.{elem_type}.{property}")
-            results = g.getresults(element_obj, phase_obj, resulttype_obj, 'node')
-            data = [r for r in results]
-        except:
-            data = []         
-        return data
+        return self.plx_extract_results(phase_str, elem_str, [property])[property]
 
-    def xl_open_extraction_wb(self):
-        """ Opens extraction workbook defined in the shovel settings table,
-            If no path is provided, use the template workbook specified.
+    def plx_extract_results(self, phase_str: str, elem_str: str, properties: list) -> dict:
+        """ Extracts every result type in properties for one phase/element pair, see PlaxisSession.extract_results
         """
-        if self.settings_dict["Existing Excel path"] == None:
-            if self.settings_dict["Template Excel path"] == None:
-                toolkit.mbox("Extraction stopped", "Please enter path of extraction file or template")
-                exit()
-            else:
-                wb_path = self.settings_dict["Template Excel path"]
-                self.output_istemplate = True
-        else:
-            wb_path = self.settings_dict["Existing Excel path"]
-            self.output_istemplate = False
+        return self.session.extract_results(phase_str, elem_str, properties)
 
-        self.output_data_table = ExcelTable.open_wb(wb_path, "Extractor", "tbl_Data")
-        wb_name = self.output_data_table.wb.Name
-        self.output_map_table = ExcelTable(wb_name, "Extractor", "tbl_Extraction")
-        self.output_profile_table = ExcelTable(wb_name, "_Profiles", "tbl_AllProfiles")
+    def plx_extract_phase(self, phase_str: str, element_props: dict) -> dict:
+        """ Extracts a whole phase in one grouped pass, see PlaxisSession.extract_phase
+        """
+        return self.session.extract_phase(phase_str, element_props)
 
-        if self.extract_all:
-            self.output_data_table.clear_table()
-            self.output_map_table.clear_table() 
-        return
-    
-    def xl_remove_profiles(self, model_name: str):
-        """ Removes all profiles of the current model in the output table. Sets the max_index value for add profile step
+    def plx_launch_workers(self) -> list:
+        """ Launches the extra Plaxis Output instances of the worker pool on the ports following the output port.
+            The main session is always the first worker.
         """
-        
-        if (self.output_map_table.table.ListRows.Count <= 1) and (self.output_data_table.table.ListRows.Count <= 1):
-            self.output_max_index = 0
-        elif self.extract_all or self.output_istemplate:
-            self.output_max_index = int(max(self.output_map_table.table.ListColumns("Index").DataBodyRange())[0])
-        else:
-            self.output_map_table.dataframe()
-            current_dict = self.output_map_table.df_to_dict("Index", filter_column="Model", filter_data=model_name)
-            self.output_map_table.search_and_delete({"Model":model_name})
-            for index in current_dict:
-                self.output_data_table.search_and_delete({"Index": index})
-            self.output_max_index = int(max(self.output_map_table.table.ListColumns("Index").DataBodyRange())[0])
-        return
+        def launch(port):
+            bp = Boilerplate(self.settings_dict["Host"], port, 
+                             self.settings_dict["Plaxis password"], self.settings_dict["Plaxis installation folder"])
+            bp.app_start(plx_output=True, reuse=reuse_plaxis(self.settings_dict), terminate=False) # the other workers run the same executable
+            return PlaxisSession(bp, self.cache)
 
-    def xl_add_profiles(self, model_name: str):
-        """ Adds data to the output table
+        ports = [self.bp_output.port + i for i in range(1, self.worker_count)]
+        with ThreadPoolExecutor(max_workers=len(ports)) as pool:
+            return [self.session] + list(pool.map(launch, ports))
+
+    def xl_get_extractions(self, model_name: str) -> tuple:
+        """ Returns the extraction rows of a model sorted by phase, and the dictionary of profile:[properties]
         """
         # Extraction list
         extractions = self.extraction_df.loc[self.extraction_df['Model'] == model_name, ~self.extraction_df.columns.isin(['Model', 'Element Type'])].values.tolist()
         clean_ext = []
-        for e in extractions: #Remove None
-            cleaned = [a for a in e if a is not None]
+        for e in extractions: #Remove None, and NaN that pandas reads empty cells of text columns as
+            cleaned = [a for a in e if not pd.isna(a)]
             if len(cleaned):
                 clean_ext.append(cleaned)
 
         required_profiles = set([ext[-1] for ext in clean_ext])
         profile_list = self.profiles_df.loc[self.profiles_df['Name'].isin(required_profiles), ['Name'] + list(self.profiles_df.loc[:,'Property 1':'Property 8'])].values.tolist()
-        profile_dict = {profile[0]:[p for p in profile[1:] if p is not None] for profile in profile_list} # Remove None
+        profile_dict = {profile[0]:[p for p in profile[1:] if not pd.isna(p)] for profile in profile_list} # Remove None and NaN
+        if self.capabilities is not None: # skips the result types that the element types do not have
+            clean_ext = self.capabilities.prune(model_name, clean_ext, profile_dict)
+
+        if self.resuming: # skips the units completed before the run was interrupted
+            remaining = []
+            for ext in clean_ext:
+                elements = [element for element in ext[2:-1] if not self.journal.is_complete(model_name, ext[1], element, ext[-1])]
+                if elements:
+                    remaining.append(ext[:2] + elements + ext[-1:])
+            clean_ext = remaining
 
         sorted_extractions = sorted(clean_ext, key=lambda a : a[1]) #sort by phase
-        step = 100/len(sorted_extractions)
+        return sorted_extractions, profile_dict
+
+    def validate_extractions(self):
+        """ Lists the result types of the element types to extract that are not known yet for this Plaxis version,
+            see Shovel_Capability. ResultTypes are only listed once a model is open, so the first model is opened if needed
+        """
+        if self.capabilities is None or self.session is None:
+            return
+        element_columns = [column for column in self.extraction_df.columns if str(column).startswith("Element")]
+        elements = self.extraction_df.loc[self.extraction_df['Model'].isin(list(self.model_dict)), element_columns].values.ravel()
+        unknown = self.capabilities.unknown({element_type(element) for element in elements if isinstance(element, str)})
+        if not unknown:
+            return
+        if self.session.loaded_path is None:
+            model, path = next(iter(self.model_dict.items()))
+            self.session.open_model(path, model)
+            self.session.load_model()
+        self.capabilities.learn(self.session.g, unknown)
+
+    def plan(self) -> dict:
+        """ Extraction plan of every model, see Shovel_Plan.ExtractionPlan
+        """
+        return {model: ExtractionPlan(*self.xl_get_extractions(model)) for model in self.model_dict}
 
-        for ext in sorted_extractions:
+    def report_plan(self) -> str:
+        """ Prints the extraction plan of every model with the planned and naive getresults call counts
+        """
+        plans = self.plan()
+        report = "\n".join(plan.describe(model) for model, plan in plans.items())
+        planned = sum(plan.planned_calls for plan in plans.values())
+        naive = sum(plan.naive_calls for plan in plans.values())
+        summary = f"{len(plans)} models, {planned} planned getresults calls instead of {naive}"
+        print(report)
+        print(summary)
+        return summary
+
+    def xl_add_profiles(self, model_name: str):
+        """ Adds data to the output
+        """
+        sorted_extractions, profile_dict = self.xl_get_extractions(model_name)
+        collected = self.session.collect_profiles(sorted_extractions, profile_dict)
+        if self.pipeline_depth > 0: # fetches the next rows from Plaxis while the current ones are written
+            collected = Pipeline(collected, self.pipeline_depth, self.pipeline_max_bytes, results_nbytes)
+        self.write_profiles(model_name, collected, profile_dict)
+
+    def start_progress(self, extractions: dict):
+        """ Progress tasks of the models and of the elements to extract, extractions being model:[extraction rows]
+        """
+        self.model_progress = self.progress.task("Models", len(extractions))
+        self.element_progress = self.progress.task("Elements", sum(len(ext) - 3 for rows in extractions.values() for ext in rows))
+
+    def write_profiles(self, model_name: str, collected, profile_dict: dict):
+        """ Writes the output of PlaxisSession.collect_profiles into the sink, assigning indexes in order.
+            profile_dict is the dictionary of profile:[properties] the results were collected for
+        """
+        element_progress = self.element_progress
+        for ext, phase_results in collected:
             no = ext[0]
             phase = ext[1]
             elements = ext[2:-1]
             profile = ext[-1]
 
             for element in elements:
-                x_coord = self.plx_extract_model(phase, element, 'X')
-                y_coord = self.plx_extract_model(phase, element, 'Y')
-                data_list = []
-                properties = profile_dict[profile]
-                for prop in properties: # iterates through the properties in the profile indicated
-                    data_list.append(self.plx_extract_model(phase, element, prop))
+                results = phase_results[element] # ResultBlock of X, Y and the profile properties in order
+                if profile in self.reductions:
+                    results = self.reductions[profile].apply(results)
+                data_list = [results[prop] for prop in profile_dict[profile]] # iterates through the properties in the profile indicated
 
                 self.output_max_index += 1
-                if not data_list[0]:
+                if not data_list or not len(data_list[0]):
                     status = 'No data'
                 else:
                     status = 'Extracted'
-                    new_data = {self.output_max_index: [x_coord, y_coord, *data_list]} # dictionary of index: [x coord, y coord, data]
-                    self.output_data_table.write_dict_to_table(new_data) 
+                self.sink.write_profile(self.output_max_index, no, model_name, phase, element, profile, status, results)
+                metrics.count("profiles")
+                if self.journal is not None:
+                    self.journal.record(model_name, phase, element, profile, no, self.output_max_index, status)
+                    if self.journal.due():
+                        self.checkpoint()
+                if self.envelopes is not None and status == 'Extracted':
+                    self.envelope_records.append((model_name, phase, element, results))
+                if self.comparison_records is not None and status == 'Extracted':
+                    self.comparison_records.append((model_name, phase, element, results))
+                element_progress.advance()
 
-                extraction_dict = {(self.output_max_index, no, model_name, phase, element, profile, status): []} # dictionary of profile: empty list
-                self.output_map_table.write_dict_to_table(extraction_dict)
+    def checkpoint(self):
+        """ Saves the output and commits the units written so far to the journal
+        """
+        if self.journal is not None:
+            self.sink.checkpoint()
+            self.journal.commit()
 
-            toolkit.step_progressbar(self.progressbar, step)
-        
-        self.output_profile_table.write_df_to_table(self.profiles_df, wipe_table=True) # Copies entire profile table over
+    def compute_envelopes(self):
+        """ Computes the envelopes of the model that was just written and releases its results
+        """
+        if self.envelope_records:
+            self.envelopes.extend(Shovel_Envelope.compute_envelopes(self.envelope_records))
+            self.envelope_records = []
 
-    def xl_save_wb(self):
-        wb = self.output_map_table.wb
-        if self.output_istemplate:
-            new_file_name = self.project_name + ' Plaxis Extraction'
-            wb.SaveAs(f'{self.output_path}\\{new_file_name}', 52) # enum for .xlsm format
-            wb.Activate()
-        else:
-            wb.Save()
-            wb.Activate()
+    def compare_models(self):
+        """ Compares the profiles of every extracted model against the 'Reference model' (the first model by default),
+            see Shovel_Compare
+        """
+        comparison = Shovel_Compare.compare_models(self.comparison_records, self.settings_dict.get("Reference model"))
+        comparison.save(os.path.join(self.output_path, self.project_name + ' Plaxis Comparison.xlsx'))
+        self.comparison_records = []
 
     def process_flow(self):
-        if not self.model_dict:
-            toolkit.mbox("Plaxis Extraction", "No models to extract from")
-            return
+        try:
+            if not self.model_dict:
+                toolkit.mbox("Plaxis Extraction", "No models to extract from")
+                return
+            if self.dry_run:
+                toolkit.mbox("Plaxis Extraction plan", self.report_plan())
+                return
         
-        self.xl_open_extraction_wb()
-        for i, model in enumerate(self.model_dict, start=1):
-            self.progressbar = toolkit.create_progressbar(self.window, model, i)
-
-            path = self.model_dict[model]
-            self.plx_open_model(path)
-            self.xl_remove_profiles(model)
-            self.xl_add_profiles(model)
-
-        self.xl_save_wb()
-        self.process.terminate()
-        self.window.destroy()
-        toolkit.mbox("Plaxis Extraction", "Extraction complete")
\ No newline at end of file
+            self.validate_extractions()
+            self.resuming = self.resume and self.journal is not None and self.journal.load()
+            if self.resuming:
+                self.sink.open(self.journal.output_file, self.journal.last_index, self.journal.models())
+            else:
+                self.sink.open()
+                if self.journal is not None:
+                    self.journal.start(self.sink.output_workbook, self.sink.max_index()) # rows before the run are kept on resume
+            if self.worker_count > 1 and len(self.model_dict) > 1:
+                self.process_flow_parallel()
+            else:
+                self.start_progress({model: self.xl_get_extractions(model)[0] for model in self.model_dict})
+                for model in self.model_dict:
+                    self.model_progress.describe(model)
+                    metrics.model = model
+                    if self.resuming and not self.xl_get_extractions(model)[0]: # completed before the interruption
+                        self.model_progress.advance()
+                        continue
+
+                    with metrics.timer("model"):
+                        self.plx_open_model(model, self.model_dict[model])
+                        with self.sink.model(model) as max_index:
+                            self.output_max_index = max_index
+                            self.xl_add_profiles(model)
+                        self.checkpoint()
+                        self.compute_envelopes()
+                        if self.cache:
+                            self.cache.commit()
+                    self.model_progress.advance()
+
+            self.sink.close()
+            if self.journal is not None:
+                self.journal.finish()
+            if self.envelopes:
+                Shovel_Envelope.save_envelopes(os.path.join(self.output_path, self.project_name + ' Plaxis Envelopes.npz'), self.envelopes)
+            if self.comparison_records:
+                self.compare_models()
+            if self.owns_output and self.session.process: # a reused server was not launched here and keeps running
+                self.session.process.terminate()
+            for name, count in self.plx_calls.items():
+                metrics.count("plaxis_" + name, count)
+            metrics.finish()
+        finally: # also stops the display thread when the extraction fails
+            if self.progress is not None:
+                self.progress.close()
+        message = "Extraction complete"
+        if self.capabilities is not None and self.capabilities.pruned:
+            metrics.count("pruned", len(self.capabilities.pruned))
+            message += f"\nSkipped, result type not available:\n{self.capabilities.summary()}"
+        if self.cache:
+            stats = self.cache.stats()
+            self.cache.close()
+            message += f"\nResult cache: {stats['hits']} hits, {stats['misses']} misses, {self.plx_calls['open']} models opened"
+        toolkit.mbox("Plaxis Extraction", message)
+
+    def process_flow_parallel(self):
+        """ Extracts models on a pool of Plaxis Output instances. Each worker takes the next model from the queue,
+            while the results are written into the sink in model order on this thread, as Excel COM
+            objects cannot be shared between threads.
+        """
+        sessions = self.plx_launch_workers()
+        idle_sessions = Queue()
+        for session in sessions:
+            idle_sessions.put(session)
+
+        def extract(model, extractions, profile_dict):
+            session = idle_sessions.get()
+            try:
+                session.open_model(self.model_dict[model], model)
+                return list(session.collect_profiles(extractions, profile_dict))
+            finally:
+                idle_sessions.put(session)
+
+        jobs = {model: self.xl_get_extractions(model) for model in self.model_dict}
+        jobs = {model: job for model, job in jobs.items() if job[0]} # models completed before an interruption are skipped
+        self.start_progress({model: job[0] for model, job in jobs.items()})
+        try:
+            with ThreadPoolExecutor(max_workers=len(sessions)) as pool:
+                futures = {model: pool.submit(extract, model, *jobs[model]) for model in jobs}
+                for model in jobs: # results are merged in model order
+                    self.model_progress.describe(model)
+                    metrics.model = model
+                    collected = futures[model].result()
+                    with metrics.timer("model"): # writing only, the extraction overlaps other models
+                        with self.sink.model(model) as max_index:
+                            self.output_max_index = max_index
+                            self.write_profiles(model, collected, jobs[model][1])
+                        self.checkpoint()
+                        self.compute_envelopes()
+                        if self.cache:
+                            self.cache.commit()
+                    self.model_progress.advance()
+        finally:
+            for session in sessions[1:]: # the main session is terminated at the end of process_flow
+                self.plx_calls.update(session.calls)
+                session.close()
@@ -0,0 +1,272 @@
+import time
+import numpy as np
+import pandas as pd
+from Shovel_Envelope import element_axis
+
+### Notes ###
+
+# Compares the profiles of the same element across models, e.g. SLS against ULS or the varied EI cases of a section.
+# Profiles are matched on (element, phase ID, property), the phase ID being the part of the phase name in brackets
+# so that phases named differently in each model still line up. Nodes differ between models and mesh refinements,
+# so every profile is linearly interpolated onto a common elevation grid per match, NaN outside its own extent.
+# Short profiles are resampled in a single np.interp call: rows are sorted once and moved apart by a multiple
+# of the overall extent, so that they can be concatenated into one increasing sequence. Longer profiles are
+# interpolated one by one into the same buffer, where the per call overhead no longer matters.
+# Results are long tables indexed by (Element, Phase, Property, Elevation) with one column per model.
+# Positions run along the axis of each element over all models (Shovel_Envelope.element_axis), so the
+# "Elevation" of a horizontal element (e.g. a strut or a soil cut line) is its X coordinate.
+
+def phase_id(phase: str) -> str:
+    """ Plaxis ID of a phase name such as 'Excavation [Phase_5]', the name itself when there is none
+    """
+    if '[' in phase and ']' in phase:
+        return phase[phase.find('[')+1:phase.find(']')]
+    return phase
+
+
+FUSED_MAX_NODES = 64 # mean profile length up to which the fused pass beats one np.interp per profile, see benchmark()
+
+def batch_resample(positions: list, values: list, grids: list) -> list:
+    """ Linear interpolation of every values[i] at positions[i] onto grids[i], into one buffer.
+        Grid points outside the extent of their profile are NaN
+    """
+    if not positions:
+        return []
+    grid_lengths = np.array([len(g) for g in grids])
+    if sum(len(p) for p in positions) <= FUSED_MAX_NODES * len(positions):
+        resampled = fused_resample(positions, values, grids, grid_lengths)
+    else:
+        offsets = np.concatenate(([0], np.cumsum(grid_lengths)))
+        resampled = np.empty(offsets[-1])
+        for i, (position, data, grid) in enumerate(zip(positions, values, grids)):
+            if len(position) > 1 and position[0] > position[-1]: # walls are listed top to bottom
+                position, data = position[::-1], data[::-1]
+            if np.any(np.diff(position) < 0):
+                order = np.argsort(position, kind="stable")
+                position, data = position[order], data[order]
+            resampled[offsets[i]:offsets[i + 1]] = np.interp(grid, position, data, left=np.nan, right=np.nan)
+    return np.split(resampled, np.cumsum(grid_lengths)[:-1])
+
+
+def fused_resample(positions: list, values: list, grids: list, grid_lengths: np.ndarray) -> np.ndarray:
+    """ Every profile in a single np.interp call, see Notes. Returns the concatenated resampled values
+    """
+    lengths = np.array([len(p) for p in positions])
+    rows = np.repeat(np.arange(len(positions)), lengths)
+    position = np.concatenate(positions).astype(np.float64)
+    value = np.concatenate(values).astype(np.float64)
+    grid = np.concatenate(grids).astype(np.float64)
+    grid_rows = np.repeat(np.arange(len(grids)), grid_lengths)
+
+    low = min(position.min(), grid.min()) if len(grid) else position.min()
+    span = max(position.max(), grid.max() if len(grid) else position.max()) - low + 1.0
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    # rows are usually monotonic, descending rows (walls listed top to bottom) are reversed in place of a sort
+    descending = position[starts] > position[starts + lengths - 1]
+    local = np.arange(len(position)) - np.repeat(starts, lengths)
+    order = np.where(descending[rows], np.repeat(starts + lengths - 1, lengths) - local, np.arange(len(position)))
+    shifted_position = position[order] - low + rows * span
+    if np.any(np.diff(shifted_position) < 0): # unordered rows, sorted by row then by position
+        order = np.argsort(position - low + rows * span, kind="stable")
+        shifted_position = position[order] - low + rows * span
+    position, value = position[order], value[order]
+    row_min = position[starts]
+    row_max = position[starts + lengths - 1]
+
+    resampled = np.interp(grid - low + grid_rows * span, shifted_position, value)
+    resampled[(grid < row_min[grid_rows]) | (grid > row_max[grid_rows])] = np.nan
+    return resampled
+
+
+def batch_grids(positions: list, keys: np.ndarray, key_count: int, spacing: float = None, decimals: int = 6) -> list:
+    """ Common grid of every key over the positions of its rows (keys[i] is the key of positions[i]),
+        the same grids as Shovel_Envelope.common_grid computed for every key at once
+    """
+    lengths = np.array([len(p) for p in positions])
+    node_keys = np.repeat(keys, lengths)
+    position = np.concatenate(positions).astype(np.float64)
+    start = np.full(key_count, np.inf)
+    end = np.full(key_count, -np.inf)
+    np.minimum.at(start, node_keys, position)
+    np.maximum.at(end, node_keys, position)
+    if spacing:
+        return [np.arange(start[k], end[k] + spacing / 2, spacing) for k in range(key_count)]
+
+    rounded = np.round(position, decimals)
+    order = np.lexsort((rounded, node_keys))
+    rounded, node_keys = rounded[order], node_keys[order]
+    unique = np.ones(len(rounded), dtype=bool)
+    unique[1:] = (rounded[1:] != rounded[:-1]) | (node_keys[1:] != node_keys[:-1])
+    counts = np.bincount(node_keys[unique], minlength=key_count)
+    max_points = np.zeros(key_count, dtype=np.int64)
+    np.maximum.at(max_points, keys, lengths)
+
+    grids = np.split(rounded[unique], np.cumsum(counts)[:-1])
+    for k in np.flatnonzero(counts > 2 * max_points): # profiles do not share nodes, the union would only add noise
+        grids[k] = np.linspace(start[k], end[k], max_points[k])
+    return grids
+
+
+class Comparison:
+    """ Profiles of several models on common grids. values holds one column per model,
+        difference and ratio are taken against the reference model
+    """
+    def __init__(self, values: pd.DataFrame, reference: str):
+        self.values = values
+        self.models = list(values.columns)
+        self.reference = reference
+
+    @property
+    def difference(self) -> pd.DataFrame:
+        return self.values.sub(self.values[self.reference], axis=0)
+
+    @property
+    def ratio(self) -> pd.DataFrame:
+        reference = self.values[self.reference].where(self.values[self.reference] != 0)
+        return self.values.div(reference, axis=0)
+
+    def governing(self) -> pd.DataFrame:
+        """ Per elevation, the model giving the largest magnitude and the models giving the max and the min
+        """
+        data = self.values.to_numpy()
+        models = np.array(self.models, dtype=object)
+        valid = ~np.isnan(data).all(axis=1)
+        absolute = np.where(np.isnan(data), -np.inf, np.abs(data))
+        governing = absolute.argmax(axis=1)
+        high = np.where(np.isnan(data), -np.inf, data).argmax(axis=1)
+        low = np.where(np.isnan(data), np.inf, data).argmin(axis=1)
+        rows = np.arange(len(data))
+        return pd.DataFrame({"Governing model": np.where(valid, models[governing], None),
+                             "Governing value": np.where(valid, data[rows, governing], np.nan),
+                             "Max": np.where(valid, data[rows, high], np.nan),
+                             "Max model": np.where(valid, models[high], None),
+                             "Min": np.where(valid, data[rows, low], np.nan),
+                             "Min model": np.where(valid, models[low], None)},
+                            index=self.values.index)
+
+    def summary(self) -> pd.DataFrame:
+        """ Per element, phase and property: the peak magnitude of every model and the governing model
+        """
+        peaks = self.values.abs().groupby(level=["Element", "Phase", "Property"], sort=False).max()
+        peaks["Governing model"] = peaks[self.models].idxmax(axis=1, skipna=True) if len(peaks) else []
+        return peaks
+
+    def save(self, path: str):
+        """ Writes the values, difference, ratio, governing and summary tables as sheets of an .xlsx file
+        """
+        with pd.ExcelWriter(path) as writer:
+            self.values.to_excel(writer, sheet_name="Values")
+            self.difference.to_excel(writer, sheet_name="Difference")
+            self.ratio.to_excel(writer, sheet_name="Ratio")
+            self.governing().to_excel(writer, sheet_name="Governing")
+            self.summary().to_excel(writer, sheet_name="Summary")
+
+
+def compare_models(records, reference: str = None, axis: str = None, spacing: float = None) -> Comparison:
+    """ records are (model, phase, element, results) tuples as collected by Extractor, results holding X, Y
+        and the properties. reference defaults to the first model. Profiles found in only one model are still listed.
+        Positions run along axis, by default the axis of each element
+    """
+    element_blocks = {} # element: [(phase, results)] of every model
+    for model, phase, element, results in records:
+        element_blocks.setdefault(element, []).append((phase, results))
+    axes = {element: axis or element_axis(blocks) for element, blocks in element_blocks.items()}
+
+    profiles = {} # (element, phase ID, property): {model: (position, values)}
+    models = []
+    for model, phase, element, results in records:
+        if model not in models:
+            models.append(model)
+        position = results[axes[element]]
+        for prop in results:
+            data = results[prop]
+            if prop in ('X', 'Y') or not len(data) or len(data) != len(position):
+                continue
+            profiles.setdefault((element, phase_id(phase), prop), {})[model] = (position, data)
+    reference = reference or (models[0] if models else None)
+    if reference not in models:
+        raise Exception(f"Reference model {reference} has no extracted profiles")
+
+    keys = list(profiles)
+    row_positions, row_values, row_keys, row_models = [], [], [], []
+    for k, key in enumerate(keys):
+        for model, (position, data) in profiles[key].items():
+            row_positions.append(position)
+            row_values.append(data)
+            row_keys.append(k)
+            row_models.append(models.index(model))
+    grids = batch_grids(row_positions, np.array(row_keys, dtype=np.int64), len(keys), spacing) if keys else []
+    resampled = batch_resample(row_positions, row_values, [grids[k] for k in row_keys])
+
+    grid_lengths = np.array([len(grid) for grid in grids], dtype=np.int64)
+    key_offsets = np.concatenate(([0], np.cumsum(grid_lengths)[:-1])).astype(np.int64)
+    table = np.full((int(grid_lengths.sum()), len(models)), np.nan)
+    for k, m, data in zip(row_keys, row_models, resampled):
+        table[key_offsets[k]:key_offsets[k] + len(data), m] = data
+
+    levels, codes = [], []
+    for i in range(3): # element, phase and property are factorized per key, not per elevation
+        key_codes, level = pd.factorize(np.array([key[i] for key in keys], dtype=object))
+        levels.append(level)
+        codes.append(np.repeat(key_codes, grid_lengths))
+    elevation_codes, elevation_level = pd.factorize(np.concatenate(grids) if grids else np.empty(0))
+    index = pd.MultiIndex(levels=levels + [elevation_level], codes=codes + [elevation_codes],
+                          names=["Element", "Phase", "Property", "Elevation"], verify_integrity=False)
+    return Comparison(pd.DataFrame(table, index=index, columns=models), reference)
+
+
+def records_from_long(df: pd.DataFrame) -> list:
+    """ Comparison records from the long format written by ColumnarSink (Model, Phase, Element, Property, Node, X, Y, Value)
+    """
+    records = []
+    for (model, phase, element), group in df.groupby(["Model", "Phase", "Element"], sort=False):
+        nodes = group[group["Property"] == group["Property"].iloc[0]].sort_values("Node")
+        results = {'X': nodes["X"].to_numpy(), 'Y': nodes["Y"].to_numpy()}
+        for prop, values in group.groupby("Property", sort=False):
+            results[prop] = values.sort_values("Node")["Value"].to_numpy()
+        records.append((model, phase, element, results))
+    return records
+
+
+def benchmark(model_count: int = 4, element_count: int = 50, phase_count: int = 20, node_count: int = 200):
+    """ Compares model_count models of element_count walls over phase_count phases, every model meshed
+        differently. Times the whole comparison, and the fused resampling against one np.interp call per profile
+    """
+    rng = np.random.default_rng(0)
+    records = []
+    for m in range(model_count):
+        y = np.sort(rng.uniform(-30, 0, node_count + 7 * m))[::-1] # a different mesh per model, top to bottom
+        for p in range(phase_count):
+            for e in range(element_count):
+                moment = (1 + 0.1 * m) * 100 * np.sin(y / (3 + e % 5)) + rng.normal(0, 5, len(y))
+                records.append((f"Model_{m}", f"Phase {p} [Phase_{p}]", f"Plate_{e}", {'X': np.zeros(len(y)), 'Y': y, 'M2D': moment}))
+    profile_count = len(records)
+
+    start = time.perf_counter()
+    comparison = compare_models(records)
+    comparison.governing()
+    comparison.summary()
+    total = time.perf_counter() - start
+
+    positions = [results['Y'] for model, phase, element, results in records]
+    values = [results['M2D'] for model, phase, element, results in records]
+    grids = [np.linspace(-29, -1, node_count)] * profile_count
+    lengths = np.array([len(g) for g in grids])
+    start = time.perf_counter()
+    fused_resample(positions, values, grids, lengths)
+    fused = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for position, data, grid in zip(positions, values, grids): # one np.interp per profile
+        order = np.argsort(position, kind="stable")
+        np.interp(grid, position[order], data[order], left=np.nan, right=np.nan)
+    looped = time.perf_counter() - start
+
+    print(f"{profile_count} profiles of {node_count} nodes, {len(comparison.values)} elevations: comparison with governing cases "
+          f"{total * 1000:.1f} ms. Resampling fused {fused * 1000:.1f} ms, one np.interp per profile {looped * 1000:.1f} ms")
+    return total, fused, looped
+
+
+if __name__ == '__main__':
+    benchmark(node_count=20)
+    benchmark(node_count=200)
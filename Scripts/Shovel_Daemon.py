@@ -0,0 +1,177 @@
+import os
+import secrets
+import sys
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+import toolkit
+
+### Notes ###
+
+# The daemon is a long-lived Python process that keeps Shovel_Classes imported and one Plaxis Output
+# connected between jobs. The entry scripts (Plaxis_Load.py, Plaxis_Extract.py...) submit their job
+# through run_job() and only fall back to running it themselves when no daemon is listening, so a
+# button press no longer pays for the imports and the Output cold start.
+# Protocol: the client sends one dictionary {"job": name, ...} per connection and receives
+# {"status": "ok" | "error", "message": str}. Jobs: ping, load, extract, stop.
+# Only this module is imported by the client, heavy modules are imported by the daemon.
+# Jobs are pickled, so the connection must only accept the user who started the daemon: every daemon start
+# writes a new random key into the per-user folder, readable by that user only, and clients read it from there.
+# Start: python Shovel_Daemon.py <shovel workbook> [backend], stop: python Shovel_Daemon.py stop
+
+DAEMON_HOST = "localhost"
+DAEMON_PORT = int(os.environ.get("SHOVEL_DAEMON_PORT") or 10100)
+AUTHKEY_FILE = "Shovel Daemon.key"
+
+def authkey_path() -> str:
+    return os.path.join(toolkit.user_folder(), AUTHKEY_FILE)
+
+def read_authkey() -> bytes:
+    """ Key of the daemon started by this user, None if it never started
+    """
+    try:
+        with open(authkey_path(), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def new_authkey() -> bytes:
+    """ New random key, written to a file only the user can read
+    """
+    key = secrets.token_bytes(32)
+    path = authkey_path()
+    temp_path = path + ".new"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    os.replace(temp_path, path)
+    return key
+
+def submit(job: dict, address: tuple = None) -> dict:
+    """ Sends a job to the daemon and waits for its reply. Returns None if no daemon is listening
+    """
+    authkey = read_authkey()
+    if authkey is None:
+        return None
+    try:
+        conn = Client(address or (DAEMON_HOST, DAEMON_PORT), authkey=authkey)
+    except (OSError, EOFError, AuthenticationError): # no daemon, or one started by another user
+        return None
+    with conn:
+        conn.send(job)
+        return conn.recv()
+
+def run_job(job_name: str, shovel_wb: str, backend: str = "com", run_all: bool = False, address: tuple = None) -> bool:
+    """ Runs a load or extract job on the daemon. Returns False if there is no daemon, so that the
+        caller runs the job itself. Errors of the job are raised here
+    """
+    reply = submit({"job": job_name, "wb": shovel_wb, "backend": backend, "all": run_all}, address)
+    if reply is None:
+        return False
+    if reply["status"] != "ok":
+        raise Exception(reply["message"])
+    return True
+
+
+class ShovelDaemon:
+    """ Serves jobs one at a time on a local socket. handlers is a dictionary of job name:function(job) -> message,
+        so that the protocol can be run against fake handlers
+    """
+    def __init__(self, handlers: dict, address: tuple = None, authkey: bytes = None):
+        self.handlers = dict(handlers)
+        self.handlers.setdefault("ping", lambda job: "ready")
+        self.address = address or (DAEMON_HOST, DAEMON_PORT)
+        self.authkey = authkey
+        self.listener = None
+
+    def handle(self, job: dict) -> dict:
+        handler = self.handlers.get(job.get("job"))
+        if handler is None:
+            return {"status": "error", "message": f"Unknown job: {job.get('job')}"}
+        try:
+            return {"status": "ok", "message": str(handler(job) or "")}
+        except SystemExit: # Loader and Extractor exit when there is nothing to do
+            return {"status": "ok", "message": "Nothing to do"}
+        except Exception as e:
+            return {"status": "error", "message": f"{type(e).__name__}: {e}"}
+
+    def serve(self):
+        """ Serves until a stop job is received
+        """
+        self.listener = Listener(self.address, authkey=self.authkey or new_authkey())
+        try:
+            while True:
+                try:
+                    conn = self.listener.accept()
+                except (OSError, EOFError, AuthenticationError): # failed handshake, e.g. a wrong authkey
+                    continue
+                with conn:
+                    try:
+                        job = conn.recv()
+                    except EOFError:
+                        continue
+                    if job.get("job") == "stop":
+                        conn.send({"status": "ok", "message": "stopped"})
+                        return
+                    conn.send(self.handle(job))
+        finally:
+            self.listener.close()
+
+
+class PlaxisJobs:
+    """ Load and extract handlers sharing one Plaxis Output connection, launched on first use
+        and relaunched if it is no longer active
+    """
+    def __init__(self, shovel_wb: str, backend: str = "com"):
+        import Shovel_Classes
+        self.Shovel_Classes = Shovel_Classes
+        settings = Shovel_Classes.table_class(backend)(shovel_wb, "Plaxis_extractor", "tbl_Settings")
+        settings.dataframe()
+        settings_dict = settings.df_to_dict("Settings", ["Value"])
+        Shovel_Classes.table_class(backend).release()
+        self.bp = Shovel_Classes.Boilerplate(settings_dict["Host"], settings_dict["Plaxis output port"],
+                                             settings_dict["Plaxis password"], settings_dict["Plaxis installation folder"])
+
+    def output(self) -> object:
+        """ Connected Boilerplate of the warm Plaxis Output
+        """
+        if not self.bp.app_alive():
+            self.bp.app_start(plx_output=True, reuse=True)
+        return self.bp
+
+    def load(self, job: dict) -> str:
+        backend = job.get("backend", "com")
+        try:
+            loader = self.Shovel_Classes.Loader(job["wb"], load_all=job.get("all", False), backend=backend, bp=self.output())
+            loader.extract_to_table()
+        finally: # the next job reads the workbooks as saved by this one
+            self.Shovel_Classes.table_class(backend).release()
+        return "Load complete"
+
+    def extract(self, job: dict) -> str:
+        backend = job.get("backend", "com")
+        try:
+            extractor = self.Shovel_Classes.Extractor(job["wb"], extract_all=job.get("all", False), backend=backend, bp=self.output())
+            extractor.process_flow()
+        finally:
+            self.Shovel_Classes.table_class(backend).release()
+        return "Extraction complete"
+
+    def handlers(self) -> dict:
+        return {"load": self.load, "extract": self.extract}
+
+    def close(self):
+        if self.bp.process:
+            self.bp.process.terminate()
+
+
+if __name__ == '__main__':
+    if sys.argv[1] == "stop":
+        submit({"job": "stop"})
+        sys.exit()
+    jobs = PlaxisJobs(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "com")
+    try:
+        ShovelDaemon(jobs.handlers()).serve()
+    finally:
+        jobs.close()
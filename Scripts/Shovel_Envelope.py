@@ -0,0 +1,162 @@
+import time
+import numpy as np
+
+### Notes ###
+
+# An envelope is computed per (model, element, property) over every phase that was extracted.
+# Phases sharing the same node coordinates are stacked directly, otherwise every phase is
+# interpolated onto a common grid along the element axis (Y for walls, X for horizontal elements),
+# which is the coordinate with the largest extent over the nodes of every phase.
+# Positions outside the extent of a phase are NaN for that phase and ignored by the envelope.
+
+class Envelope:
+    """ Max, min and absolute max of one property along an element, over a set of phases
+    """
+    __slots__ = ("model", "element", "property", "phases", "position", "max", "min", "absmax", "max_phase", "min_phase")
+
+    def __init__(self, model, element, property, phases, position, values):
+        self.model = model
+        self.element = element
+        self.property = property
+        self.phases = phases
+        self.position = position
+        all_nan = np.isnan(values).all(axis=0)
+        filled = np.where(np.isnan(values), -np.inf, values)
+        self.max_phase = filled.argmax(axis=0)
+        self.max = np.where(all_nan, np.nan, filled.max(axis=0))
+        filled = np.where(np.isnan(values), np.inf, values)
+        self.min_phase = filled.argmin(axis=0)
+        self.min = np.where(all_nan, np.nan, filled.min(axis=0))
+        self.absmax = np.where(np.abs(self.max) >= np.abs(self.min), self.max, self.min) # signed value with the largest magnitude
+
+    def governing_phase(self, position_index: int, absolute: bool = True) -> str:
+        """ Phase giving the envelope value at a position
+        """
+        if absolute and abs(self.min[position_index]) > abs(self.max[position_index]):
+            return self.phases[self.min_phase[position_index]]
+        return self.phases[self.max_phase[position_index]]
+
+
+def common_grid(positions: list, spacing: float = None, decimals: int = 6) -> np.ndarray:
+    """ Common grid for a list of position arrays. By default the union of every node position,
+        falling back to an even grid as dense as the finest phase when the union is much larger.
+        With spacing, a regular grid with that spacing over the overall extent
+    """
+    start = min(np.min(p) for p in positions)
+    end = max(np.max(p) for p in positions)
+    if spacing:
+        return np.arange(start, end + spacing / 2, spacing)
+
+    grid = np.unique(np.round(np.concatenate(positions), decimals))
+    max_points = max(len(p) for p in positions)
+    if len(grid) > 2 * max_points: # phases do not share nodes, the union would only add noise
+        grid = np.linspace(start, end, max_points)
+    return grid
+
+
+def resample(position: np.ndarray, values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """ Linear interpolation of values onto grid, NaN outside the extent of position
+    """
+    order = np.argsort(position, kind="stable")
+    return np.interp(grid, position[order], values[order], left=np.nan, right=np.nan)
+
+
+def compute_envelope(blocks: list, model: str = "", element: str = "", property: str = "", axis: str = "Y", spacing: float = None) -> Envelope:
+    """ blocks is a list of (phase, {X:[], Y:[], property:[]}) for one element.
+        Returns the envelope of property over every phase with data
+    """
+    phases, positions, values = [], [], []
+    for phase, results in blocks:
+        data = results.get(property)
+        if data is None or not len(data) or len(data) != len(results[axis]):
+            continue
+        phases.append(phase)
+        positions.append(np.asarray(results[axis], dtype=np.float64))
+        values.append(np.asarray(data, dtype=np.float64))
+    if not phases:
+        return None
+
+    same_nodes = spacing is None and all(p.shape == positions[0].shape and np.array_equal(p, positions[0]) for p in positions)
+    if same_nodes: # fast path, every phase is on the same nodes
+        order = np.argsort(positions[0], kind="stable")
+        grid = positions[0][order]
+        stacked = np.vstack(values)[:, order]
+    else:
+        grid = common_grid(positions, spacing)
+        stacked = np.empty((len(values), len(grid)))
+        for i in range(len(values)):
+            stacked[i] = resample(positions[i], values[i], grid)
+    return Envelope(model, element, property, phases, grid, stacked)
+
+
+def group_results(records) -> dict:
+    """ Groups (model, phase, element, results) records into {(model, element): [(phase, results)]}
+    """
+    grouped = {}
+    for model, phase, element, results in records:
+        grouped.setdefault((model, element), []).append((phase, results))
+    return grouped
+
+
+def element_axis(blocks: list) -> str:
+    """ X for elements (or soil cut lines) running horizontally, Y otherwise
+    """
+    extents = {}
+    for axis in ('X', 'Y'):
+        coordinates = [np.asarray(results[axis], dtype=np.float64) for phase, results in blocks if len(results[axis])]
+        extents[axis] = max(p.max() for p in coordinates) - min(p.min() for p in coordinates) if coordinates else 0.0
+    return 'X' if extents['X'] > extents['Y'] else 'Y'
+
+
+def compute_envelopes(records, axis: str = None, spacing: float = None) -> list:
+    """ Envelopes of every property of every element found in the (model, phase, element, results) records.
+        Positions run along axis, by default the axis of each element
+    """
+    envelopes = []
+    for (model, element), blocks in group_results(records).items():
+        properties = []
+        for phase, results in blocks:
+            properties.extend(prop for prop in results if prop not in ('X', 'Y') and prop not in properties)
+        along = axis or element_axis(blocks)
+        for prop in properties:
+            envelope = compute_envelope(blocks, model, element, prop, along, spacing)
+            if envelope is not None:
+                envelopes.append(envelope)
+    return envelopes
+
+
+def save_envelopes(path: str, envelopes: list):
+    """ Writes every envelope once into a compressed .npz file. Each envelope is stored as a
+        (position, max, min, absmax) array, listed in the 'keys' array as model|element|property
+    """
+    arrays = {}
+    keys = []
+    for i, envelope in enumerate(envelopes):
+        keys.append(f"{envelope.model}|{envelope.element}|{envelope.property}")
+        arrays[f"env_{i}"] = np.vstack([envelope.position, envelope.max, envelope.min, envelope.absmax])
+    np.savez_compressed(path, keys=np.array(keys), **arrays)
+
+
+def benchmark(phase_count: int = 100, node_count: int = 500, shifted: bool = True):
+    """ Times the envelope of one element on synthetic data. With shifted, every phase has its
+        own node coordinates so the interpolation path is used
+    """
+    rng = np.random.default_rng(0)
+    blocks = []
+    for i in range(phase_count):
+        y = np.linspace(0, -30, node_count)
+        if shifted:
+            y = y + rng.uniform(-0.05, 0.05)
+        blocks.append((f"Phase_{i}", {'X': np.zeros(node_count), 'Y': y, 'M2D': rng.normal(0, 100, node_count)}))
+
+    start = time.perf_counter()
+    envelope = compute_envelope(blocks, property='M2D')
+    elapsed = time.perf_counter() - start
+    print(f"{phase_count} phases x {node_count} nodes, {'shifted' if shifted else 'shared'} nodes: "
+          f"{elapsed * 1000:.2f} ms, {len(envelope.position)} grid points")
+    return elapsed
+
+
+if __name__ == '__main__':
+    benchmark(shifted=False)
+    benchmark(shifted=True)
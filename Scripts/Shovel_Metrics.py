@@ -0,0 +1,119 @@
+import json
+import time
+import cProfile
+from collections import Counter, defaultdict
+import numpy as np
+
+### Notes ###
+
+# Run instrumentation shared by Loader and Extractor through the module level `metrics` object.
+# Disabled by default: timer() then hands back one shared no-op context, so instrumented code only pays
+# for a method call and an attribute check. Once enabled, every timed block is recorded per
+# (model, stage) and written at the end of the run as a JSON report of count/total/p50/p95/max.
+# Stages: launch, open_model, getresults, excel_write, save, model (whole model)
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "model", "start")
+
+    def __init__(self, metrics, stage, model):
+        self.metrics = metrics
+        self.stage = stage
+        self.model = model
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.stage, time.perf_counter() - self.start, self.model)
+        return False
+
+
+class Metrics:
+    """ Timers and counters of one run. Usage: with metrics.timer("getresults"): ...
+    """
+    def __init__(self):
+        self.enabled = False
+        self.model = None # current model, used when a timer is not given one
+        self.samples = defaultdict(list) # (model, stage): [seconds]
+        self.counters = Counter()
+        self.report_path = None
+        self.profile_path = None
+        self.profiler = None
+        self.started = None
+
+    def enable(self, report_path: str, profile_path: str = None):
+        """ Starts recording, the report is written to report_path by finish().
+            With profile_path, the whole run is also profiled with cProfile and dumped there
+        """
+        self.enabled = True
+        self.samples.clear()
+        self.counters.clear()
+        self.report_path = report_path
+        self.profile_path = profile_path
+        self.started = time.perf_counter()
+        if profile_path:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def timer(self, stage: str, model: str = None):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage, model if model is not None else self.model)
+
+    def record(self, stage: str, seconds: float, model: str = None):
+        self.samples[(model, stage)].append(seconds)
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counters[name] += n
+
+    @staticmethod
+    def summary(samples: list) -> dict:
+        values = np.asarray(samples)
+        return {"count": len(values), "total": float(values.sum()), "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)), "max": float(values.max())}
+
+    def report(self) -> dict:
+        """ Per stage and per model/stage summaries of the recorded timings, in seconds
+        """
+        stages = defaultdict(list)
+        models = defaultdict(dict)
+        for (model, stage), samples in self.samples.items():
+            stages[stage].extend(samples)
+            if model is not None:
+                models[model][stage] = self.summary(samples)
+        return {"wall_time": time.perf_counter() - self.started if self.started else 0.0,
+                "stages": {stage: self.summary(samples) for stage, samples in stages.items()},
+                "models": dict(models),
+                "counters": dict(self.counters)}
+
+    def finish(self) -> dict:
+        """ Writes the report and the profile if enabled, then stops recording
+        """
+        if not self.enabled:
+            return None
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_path)
+            self.profiler = None
+        report = self.report()
+        if self.report_path:
+            with open(self.report_path, "w") as f:
+                json.dump(report, f, indent=1)
+        self.enabled = False
+        return report
+
+
+metrics = Metrics()
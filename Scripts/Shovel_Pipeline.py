@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import deque
+
+### Notes ###
+
+# The producer (Plaxis result fetching) runs in a background thread and the consumer (the sink)
+# iterates on the calling thread, so that Excel COM objects stay on the thread that created them.
+# Items are held in a bounded buffer, limited by item count and optionally by approximate size in bytes.
+
+_DONE = object()
+
+class Pipeline:
+    """ Iterates over producer in a background thread, handing items over through a bounded buffer
+        so that the producer keeps fetching while the consumer is writing.
+        Usage: for item in Pipeline(generator, max_items=16): ...
+    """
+    def __init__(self, producer, max_items: int = 16, max_bytes: int = None, sizeof=None):
+        self.producer = producer
+        self.max_items = max(int(max_items), 1)
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.buffer = deque()
+        self.buffer_bytes = 0
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.error = None
+        self.thread = None
+        # statistics
+        self.peak_items = 0
+        self.peak_bytes = 0
+        self.producer_wait = 0.0
+        self.consumer_wait = 0.0
+
+    def full(self) -> bool:
+        if not self.buffer: # one item is always let through, however large
+            return False
+        if len(self.buffer) >= self.max_items:
+            return True
+        return self.max_bytes is not None and self.buffer_bytes >= self.max_bytes
+
+    def put(self, item, size: int) -> bool:
+        with self.condition:
+            start = time.perf_counter()
+            while self.full() and not self.stopped:
+                self.condition.wait()
+            self.producer_wait += time.perf_counter() - start
+            if self.stopped:
+                return False
+            self.buffer.append((item, size))
+            self.buffer_bytes += size
+            self.peak_items = max(self.peak_items, len(self.buffer))
+            self.peak_bytes = max(self.peak_bytes, self.buffer_bytes)
+            self.condition.notify_all()
+        return True
+
+    def run(self):
+        try:
+            for item in self.producer:
+                size = self.sizeof(item) if self.sizeof else 0
+                if not self.put(item, size):
+                    return
+        except BaseException as e:
+            self.error = e
+        finally:
+            with self.condition:
+                self.buffer.append((_DONE, 0))
+                self.condition.notify_all()
+
+    def __iter__(self):
+        self.thread = threading.Thread(target=self.run, name="Shovel pipeline", daemon=True)
+        self.thread.start()
+        try:
+            while True:
+                with self.condition:
+                    start = time.perf_counter()
+                    while not self.buffer:
+                        self.condition.wait()
+                    self.consumer_wait += time.perf_counter() - start
+                    item, size = self.buffer.popleft()
+                    self.buffer_bytes -= size
+                    self.condition.notify_all()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            with self.condition: # also releases the producer when the consumer stops early
+                self.stopped = True
+                self.condition.notify_all()
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def stats(self) -> dict:
+        return {"peak_items": self.peak_items, "peak_bytes": self.peak_bytes,
+                "producer_wait": self.producer_wait, "consumer_wait": self.consumer_wait}
+
+
+def results_nbytes(item) -> int:
+    """ Approximate size of a PlaxisSession.collect_profiles item, counting 8 bytes per value
+    """
+    ext, phase_results = item
+    return 8 * sum(len(data) for results in phase_results.values() for data in results.values())
+
+
+def benchmark(element_count: int = 50, phase_count: int = 5, latency: float = 0.002, write_delay: float = 0.002):
+    """ Compares fetching and writing in turn with the pipeline, extracting from the fake Plaxis Output of
+        Shovel_Benchmark (latency seconds per getresults call) into a sink taking write_delay seconds per profile
+    """
+    from Shovel_Benchmark import run_pipeline
+    result = run_pipeline(element_count, phase_count, latency=latency, write_delay=write_delay)
+    sequential, pipelined = result["sequential"]["wall_time"], result["pipelined"]["wall_time"]
+    print(f"{result['models'] * element_count * phase_count} profiles: sequential {sequential:.2f} s, pipelined {pipelined:.2f} s")
+    return sequential, pipelined
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,79 @@
+### Notes ###
+
+# An extraction plan turns the extraction rows of one model into the unique (phase, element, result type)
+# fetches needed from Plaxis. Rows sharing an element fetch it once, and X/Y are fetched once per
+# (phase, element) whatever the number of profiles using it. Results are fanned back out to every row.
+# A phase is not fetched as a whole: the rows are yielded in order, each as soon as its elements are fetched
+# (with every result type the phase needs from them), and an element is dropped after its last row, so
+# that writing overlaps fetching and only the elements of the rows in flight are held in memory.
+# The columns of a row are named after the result types, so a profile cannot list a property twice or list X/Y.
+# Extraction rows follow the xl_get_extractions format: [No., Phase, Element 1, ..., Element n, Profile]
+
+def check_profile(profile: str, properties: list):
+    """ Raises if the properties of a profile would not each get their own column
+    """
+    for prop in properties:
+        if prop in ('X', 'Y'):
+            raise Exception(f"Profile {profile}: X and Y are always extracted, remove {prop} from its properties")
+        if properties.count(prop) > 1:
+            raise Exception(f"Profile {profile}: {prop} is listed more than once")
+
+
+class ExtractionPlan:
+    """ Deduplicated, phase ordered list of the Plaxis fetches of one model
+    """
+    def __init__(self, extractions: list, profile_dict: dict):
+        self.extractions = extractions
+        self.profile_dict = profile_dict
+        self.fetches = {} # phase: {element: [result types]}, in order of first use
+        self.rows = {} # phase: [extraction rows]
+        self.last_rows = {} # phase: {element: position of the last row using it in the phase}
+        self.naive_calls = 0
+
+        for profile in {ext[-1] for ext in extractions}:
+            check_profile(profile, profile_dict[profile])
+        for ext in extractions:
+            phase = ext[1]
+            elements = ext[2:-1]
+            properties = profile_dict[ext[-1]]
+            phase_rows = self.rows.setdefault(phase, [])
+            phase_rows.append(ext)
+            phase_fetches = self.fetches.setdefault(phase, {})
+            for element in elements:
+                result_types = phase_fetches.setdefault(element, ['X', 'Y'])
+                result_types.extend(prop for prop in properties if prop not in result_types)
+                self.last_rows.setdefault(phase, {})[element] = len(phase_rows) - 1
+                self.naive_calls += 2 + len(properties) # X, Y and every property, per row and element
+
+    @property
+    def planned_calls(self) -> int:
+        return sum(len(result_types) for phase_fetches in self.fetches.values() for result_types in phase_fetches.values())
+
+    def fan_out(self, phase: str, fetch):
+        """ Yields (extraction row, {element:ResultBlock of X, Y and the profile properties}) for every row of a phase.
+            fetch(phase, {element:[result types]}) returns the ResultBlock of these elements (it may return more),
+            it is called for the elements of a row that were not fetched yet. The rows share the fetched arrays
+        """
+        fetched = {}
+        last_rows = self.last_rows[phase]
+        for i, ext in enumerate(self.rows[phase]):
+            elements = ext[2:-1]
+            missing = {element: self.fetches[phase][element] for element in elements if element not in fetched}
+            if missing:
+                fetched.update(fetch(phase, missing))
+            keys = ['X', 'Y'] + self.profile_dict[ext[-1]]
+            yield ext, {element: fetched[element].select(keys) for element in elements}
+            for element in elements:
+                if last_rows[element] == i:
+                    fetched.pop(element, None)
+
+    def describe(self, model_name: str = "") -> str:
+        """ Readable summary of the plan, used by the dry run
+        """
+        lines = [f"Model {model_name}: {len(self.extractions)} extraction rows, {len(self.fetches)} phases, "
+                 f"{self.planned_calls} planned getresults calls instead of {self.naive_calls}"]
+        for phase, phase_fetches in self.fetches.items():
+            lines.append(f"  {phase}")
+            for element, result_types in phase_fetches.items():
+                lines.append(f"    {element}: {', '.join(result_types)}")
+        return "\n".join(lines)
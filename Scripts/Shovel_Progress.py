@@ -0,0 +1,198 @@
+import logging
+import os
+import sys
+import threading
+import time
+
+### Notes ###
+
+# Progress of Loader and Extractor, decoupled from the extraction thread. The extraction only adds to the
+# counters of its tasks (task.advance(), one attribute increment, no lock and no GUI call). A display thread
+# samples the counters at a fixed interval and shows, per task, done/total, throughput and ETA:
+#   Window  a Tk window owned by the display thread, one bar per task (default when a display is available)
+#   Log     one log line per task every interval, for batch runs without a display (default otherwise)
+#   None    counters only
+# Setting "Progress display" picks the mode, "Progress interval" the refresh interval in seconds
+# (0.25 s for the window, 10 s for the log). The counters are written by one thread only and read
+# by the display thread, which never blocks the extraction, even while a remote call does.
+
+log = logging.getLogger("Shovel.progress")
+
+
+class ProgressTask:
+    """ Counter of one task, advanced by the extraction thread
+    """
+    __slots__ = ("label", "total", "done", "note", "started")
+
+    def __init__(self, label: str, total: int):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.note = "" # e.g. the current model
+        self.started = time.perf_counter()
+
+    def advance(self, count: int = 1):
+        self.done += count
+
+    def describe(self, note: str):
+        self.note = note
+
+    def status(self) -> str:
+        """ done/total, throughput and ETA, e.g. Elements 1200/5000 (24%), 85.3/s, ETA 0:44 - Model_2
+        """
+        done, total = self.done, self.total
+        elapsed = time.perf_counter() - self.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        text = f"{self.label} {done}/{total}"
+        if total:
+            text += f" ({100 * done / total:.0f}%)"
+        text += f", {rate:.1f}/s"
+        if rate > 0 and total and done < total:
+            text += f", ETA {format_seconds((total - done) / rate)}"
+        if self.note:
+            text += f" - {self.note}"
+        return text
+
+
+def format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class Progress:
+    """ Tasks of one run without any display, see Notes
+    """
+    def __init__(self, title: str, interval: float = None):
+        self.title = title
+        self.interval = interval
+        self.tasks = [] # appended by the extraction thread, list.append is atomic
+        self.stopped = threading.Event()
+        self.refreshes = 0
+        self.thread = None
+
+    def task(self, label: str, total: int) -> ProgressTask:
+        task = ProgressTask(label, total)
+        self.tasks.append(task)
+        return task
+
+    def start(self) -> object:
+        self.thread = threading.Thread(target=self.run, name="Shovel progress", daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        return
+
+    def close(self):
+        self.stopped.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+
+
+class LogProgress(Progress):
+    """ Logs the status of every task that moved since the last interval
+    """
+    def __init__(self, title: str, interval: float = None):
+        super().__init__(title, interval or 10.0)
+        if not log.handlers and not logging.getLogger().handlers: # a batch run without logging configured
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s", "%H:%M:%S"))
+            log.addHandler(handler)
+            log.setLevel(logging.INFO)
+
+    def run(self):
+        logged = {}
+        while not self.stopped.wait(self.interval):
+            self.log_tasks(logged)
+        self.log_tasks(logged)
+
+    def log_tasks(self, logged: dict):
+        self.refreshes += 1
+        for task in list(self.tasks):
+            state = (task.done, task.note)
+            if logged.get(id(task)) != state:
+                logged[id(task)] = state
+                log.info(f"{self.title}: {task.status()}")
+
+
+class WindowProgress(LogProgress):
+    """ Tk window owned by the display thread, one label and bar per task. Falls back to the log without a display
+    """
+    def __init__(self, title: str, interval: float = None):
+        super().__init__(title, interval or 0.25)
+        self.rows = [] # (task, label, progressbar)
+
+    def run(self):
+        from tkinter import ttk, Tk, StringVar, HORIZONTAL
+        try:
+            root = Tk()
+        except Exception: # no display
+            self.interval = max(self.interval, 10.0)
+            return super().run()
+        root.title(self.title)
+
+        def refresh():
+            self.refreshes += 1
+            for task in self.tasks[len(self.rows):]: # rows are only added for new tasks
+                text = StringVar(root)
+                ttk.Label(root, textvariable=text, width=70).grid(row=len(self.rows), column=0, padx=20, pady=10, sticky="w")
+                bar = ttk.Progressbar(root, orient=HORIZONTAL, mode='determinate', length=400)
+                bar.grid(row=len(self.rows), column=1, padx=(0, 10), pady=10)
+                self.rows.append((task, text, bar))
+            for task, text, bar in self.rows:
+                text.set(task.status())
+                bar['value'] = 100 * task.done / task.total if task.total else 0
+            if self.stopped.is_set(): # Tcl objects are released on the thread owning the interpreter, before it goes
+                text = bar = None
+                self.rows = []
+                root.destroy()
+            else:
+                root.after(int(self.interval * 1000), refresh)
+
+        refresh()
+        root.mainloop()
+
+
+def has_display() -> bool:
+    return os.name == "nt" or bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def progress_display(settings_dict: dict, title: str) -> Progress:
+    """ Started Progress of the mode given by the "Progress display" setting, see Notes
+    """
+    mode = str(settings_dict.get("Progress display") or ("Window" if has_display() else "Log")).lower()
+    interval = settings_dict.get("Progress interval")
+    interval = float(interval) if interval else None
+    if mode == "window":
+        return WindowProgress(title, interval).start()
+    if mode == "log":
+        return LogProgress(title, interval).start()
+    return Progress(title, interval)
+
+
+def benchmark(count: int = 1000000, blocked: float = 1.0, interval: float = 0.05):
+    """ Posts count elements with the log display refreshing every interval, then blocks for blocked seconds
+        like a slow remote call. Times a post and counts the refreshes made while the extraction was blocked
+    """
+    logging.getLogger("Shovel.progress").disabled = True # counts refreshes without printing them
+    progress = LogProgress("Benchmark", interval).start()
+    task = progress.task("Elements", count)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        task.advance()
+    posting = time.perf_counter() - start
+
+    before = progress.refreshes
+    time.sleep(blocked)
+    during = progress.refreshes - before
+    progress.close()
+    logging.getLogger("Shovel.progress").disabled = False
+    print(f"{count} posts in {posting * 1000:.0f} ms ({1e9 * posting / count:.0f} ns per post), "
+          f"{during} refreshes every {interval} s while blocked for {blocked} s")
+    return posting, during
+
+
+if __name__ == '__main__':
+    benchmark()
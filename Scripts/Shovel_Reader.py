@@ -0,0 +1,269 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from Shovel_Results import ResultBlock
+
+### Notes ###
+
+# Read access to the results of an extraction workbook for post-processing scripts, without Excel.
+# When the output is saved at the end of a run, ExcelSink writes a sidecar '<workbook> Results.npz' next to it:
+#   map columns    Index, No. and the codes of Model/Phase/Element/Profile/Status, with their names
+#   start, count   rows of every profile within the data block of its model
+#   data_<m>       X, Y, Value 1...8 rows of model code m, NaN where a profile has fewer properties
+#   properties     property names of every profile, from tbl_AllProfiles
+#   mtime          modification time of the workbook, a sidecar older than its workbook is rebuilt
+# ResultsReader loads the map columns (small) and loads the data block of a model only when a profile of that
+# model is first read. Hash indexes of column value:map rows are built on first use of a column, so any
+# model/phase/element/profile/status lookup, and a lookup by Index, is a dictionary access.
+# Without an up to date sidecar, the tables are read from the workbook with openpyxl and the sidecar is written.
+
+MAP_COLUMNS = ["Model", "Phase", "Element", "Profile", "Status"]
+VALUE_COLUMNS = ["X", "Y"] + [f"Value {i}" for i in range(1, 9)]
+
+
+def sidecar_path(workbook: str) -> str:
+    return os.path.splitext(workbook)[0] + " Results.npz"
+
+
+def write_sidecar(path: str, map_df: object, data_df: object, profiles_df: object, mtime: float = None):
+    """ Writes the sidecar of an extraction from its tbl_Extraction, tbl_Data and tbl_AllProfiles dataframes
+    """
+    map_df = map_df.dropna(subset=[map_df.columns[0]]) # the empty insert row of a table
+    data_df = data_df.dropna(subset=[data_df.columns[0]])
+    index = map_df.iloc[:, 0].to_numpy(dtype=np.float64).astype(np.int64)
+    arrays = {"index": index, "no": pd.to_numeric(map_df.iloc[:, 1], errors="coerce").to_numpy(dtype=np.float64),
+              "mtime": np.array(mtime if mtime is not None else np.nan)}
+    for column, values in zip(MAP_COLUMNS, [map_df.iloc[:, i] for i in range(2, 7)]):
+        codes, names = pd.factorize(values.to_numpy(dtype=object))
+        arrays[f"{column}_codes"] = codes.astype(np.int32)
+        arrays[f"{column}_names"] = np.array([str(name) for name in names], dtype=str)
+
+    data = data_df.to_numpy(dtype=np.float64, na_value=np.nan)
+    data_index = data[:, 0].astype(np.int64)
+    order = np.argsort(data_index, kind="stable") # nodes keep their order within a profile
+    data, data_index = data[order, 1:], data_index[order]
+    first = np.searchsorted(data_index, index, side="left")
+    last = np.searchsorted(data_index, index, side="right")
+    counts = last - first
+
+    model_codes = arrays["Model_codes"]
+    start = np.zeros(len(index), dtype=np.int64)
+    for code in range(len(arrays["Model_names"])):
+        rows = np.flatnonzero(model_codes == code)
+        block_counts = counts[rows]
+        start[rows] = np.cumsum(block_counts) - block_counts
+        gather = np.repeat(first[rows] - start[rows], block_counts) + np.arange(block_counts.sum())
+        arrays[f"data_{code}"] = data[gather]
+    arrays["start"] = start
+    arrays["count"] = counts.astype(np.int64)
+
+    profiles = profiles_df.dropna(subset=[profiles_df.columns[0]])
+    names = profiles.iloc[:, 0].astype(str).to_numpy()
+    properties = profiles.loc[:, [column for column in profiles.columns if str(column).startswith("Property")]]
+    arrays["profile_names"] = np.array(names, dtype=str)
+    arrays["profile_properties"] = np.array([[str(p) if isinstance(p, str) else "" for p in row] for row in properties.to_numpy(dtype=object)],
+                                            dtype=str).reshape(len(names), -1)
+    np.savez(path, **arrays)
+
+
+class ResultsReader:
+    """ Indexed, lazily loaded results of one extraction, see Notes. Usage:
+            reader = ResultsReader.open("Project Plaxis Extraction.xlsm")
+            for record, block in reader.profiles(model="Model_1", phase="Phase_5 [Phase_5]"):
+                block['M2D']
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.file = np.load(path) # members are read on first access
+        self.index = self.file["index"]
+        self.no = self.file["no"]
+        self.start = self.file["start"]
+        self.count = self.file["count"]
+        self.codes = {column: self.file[f"{column}_codes"] for column in MAP_COLUMNS}
+        self.names = {column: self.file[f"{column}_names"].tolist() for column in MAP_COLUMNS}
+        self.lookup = {column: {name: code for code, name in enumerate(names)} for column, names in self.names.items()}
+        self.properties = {name: [p for p in row if p] for name, row in zip(self.file["profile_names"].tolist(),
+                                                                            self.file["profile_properties"].tolist())}
+        self.hashes = {} # column: {value: map rows}
+        self.index_rows = None # Index: map row
+        self.blocks = {} # model code: data block
+
+    @classmethod
+    def open(cls, path: str) -> object:
+        """ Reader of a workbook, through its sidecar when it is up to date, or of a sidecar file
+        """
+        if path.endswith(".npz"):
+            return cls(path)
+        sidecar = sidecar_path(path)
+        if os.path.isfile(sidecar):
+            with np.load(sidecar) as f:
+                if float(f["mtime"]) == os.path.getmtime(path):
+                    return cls(sidecar)
+        from Shovel_Workbook import OpenpyxlTable
+        data_tbl = OpenpyxlTable(path, "Extractor", "tbl_Data")
+        map_tbl = data_tbl.sibling("Extractor", "tbl_Extraction")
+        profile_tbl = data_tbl.sibling("_Profiles", "tbl_AllProfiles")
+        write_sidecar(sidecar, map_tbl.dataframe(), data_tbl.dataframe(), profile_tbl.dataframe(), os.path.getmtime(path))
+        data_tbl.close()
+        return cls(sidecar)
+
+    def close(self):
+        self.file.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def values_of(self, column: str) -> list:
+        """ Distinct values of a map column, e.g. the models
+        """
+        return list(self.names[column])
+
+    def hash(self, column: str) -> dict:
+        """ Dictionary of value:map rows of a column, built on first use
+        """
+        if column not in self.hashes:
+            codes = self.codes[column]
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(self.names[column]) + 1))
+            self.hashes[column] = {name: order[bounds[code]:bounds[code + 1]] for code, name in enumerate(self.names[column])}
+        return self.hashes[column]
+
+    def rows(self, model=None, phase=None, element=None, profile=None, status=None) -> np.ndarray:
+        """ Map rows matching every given criterion, in extraction order. A criterion is a value or a list of values
+        """
+        criteria = []
+        for column, wanted in zip(MAP_COLUMNS, (model, phase, element, profile, status)):
+            if wanted is not None:
+                table = self.hash(column)
+                wanted = [wanted] if isinstance(wanted, str) else wanted
+                found = [table[value] for value in wanted if value in table]
+                rows = np.sort(np.concatenate(found)) if len(found) > 1 else found[0] if found else np.empty(0, dtype=np.int64)
+                criteria.append((len(rows), column, wanted, rows))
+        if not criteria:
+            return np.arange(len(self.index))
+        criteria.sort(key=lambda criterion: criterion[0])
+        rows = criteria[0][3] # rows of the most selective criterion, filtered by the codes of the others
+        for count, column, wanted, _ in criteria[1:]:
+            codes = [self.lookup[column][value] for value in wanted if value in self.lookup[column]]
+            rows = rows[np.isin(self.codes[column][rows], codes)]
+        return rows
+
+    def row_of(self, index: int) -> int:
+        if self.index_rows is None:
+            self.index_rows = dict(zip(self.index.tolist(), range(len(self.index))))
+        return self.index_rows[index]
+
+    def record(self, row: int) -> dict:
+        """ tbl_Extraction row of a map row
+        """
+        record = {"Index": int(self.index[row]), "No.": None if np.isnan(self.no[row]) else int(self.no[row])}
+        for column in MAP_COLUMNS:
+            code = self.codes[column][row]
+            record[column] = self.names[column][code] if code >= 0 else None
+        return record
+
+    def block(self, model_code: int) -> np.ndarray:
+        if model_code not in self.blocks:
+            self.blocks[model_code] = self.file[f"data_{model_code}"]
+        return self.blocks[model_code]
+
+    def profile_of_row(self, row: int) -> ResultBlock:
+        """ ResultBlock of X, Y and the properties of one map row, empty arrays when it has no data
+        """
+        record_profile = self.names["Profile"][self.codes["Profile"][row]]
+        properties = self.properties.get(record_profile, [])
+        model_code = self.codes["Model"][row]
+        data = self.block(model_code)[self.start[row]:self.start[row] + self.count[row]]
+        columns = {name: data[:, j] for j, name in enumerate(['X', 'Y'] + properties)}
+        return ResultBlock(columns, self.names["Phase"][self.codes["Phase"][row]], self.names["Element"][self.codes["Element"][row]])
+
+    def profile(self, index: int) -> ResultBlock:
+        """ ResultBlock of the profile with this Index
+        """
+        return self.profile_of_row(self.row_of(index))
+
+    def profiles(self, **criteria):
+        """ Yields (record, ResultBlock) of every map row matching criteria, see rows()
+        """
+        for row in self.rows(**criteria):
+            yield self.record(row), self.profile_of_row(row)
+
+    def values(self, prop: str, **criteria) -> tuple:
+        """ (values of prop for every node of the matching profiles in one array, map rows, number of nodes per row).
+            Rows whose profile does not have prop contribute no nodes
+        """
+        rows = self.rows(**criteria)
+        chunks, counts = [], []
+        for row in rows:
+            properties = ['X', 'Y'] + self.properties.get(self.names["Profile"][self.codes["Profile"][row]], [])
+            if prop in properties:
+                data = self.block(self.codes["Model"][row])[self.start[row]:self.start[row] + self.count[row], properties.index(prop)]
+            else:
+                data = np.empty(0)
+            chunks.append(data)
+            counts.append(len(data))
+        return np.concatenate(chunks) if chunks else np.empty(0), rows, np.array(counts, dtype=np.int64)
+
+
+def synthetic_tables(profile_count: int, node_count: int = 20, model_count: int = 10, phase_count: int = 20) -> tuple:
+    """ tbl_Extraction, tbl_Data and tbl_AllProfiles dataframes of profile_count plate profiles
+    """
+    element_count = max(profile_count // (model_count * phase_count), 1)
+    units = np.arange(profile_count)
+    map_df = pd.DataFrame({"Index": units + 1, "No.": units % (phase_count * element_count) + 1,
+                           "Model": [f"Model_{i}" for i in units // (phase_count * element_count) % model_count],
+                           "Phase": [f"Phase_{i} [Phase_{i}]" for i in units // element_count % phase_count],
+                           "Element": [f"Plate_{i}" for i in units % element_count],
+                           "Profile": "Plate forces", "Extraction Status": "Extracted"})
+    y = np.tile(np.linspace(0, -30, node_count), profile_count)
+    data = np.column_stack((np.repeat(units + 1, node_count), np.zeros(len(y)), y,
+                            np.sin(y) * np.repeat(units, node_count), np.cos(y), y * 2, np.full((len(y), 5), np.nan)))
+    data_df = pd.DataFrame(data, columns=["Index", "X coordinate", "Y coordinate"] + VALUE_COLUMNS[2:])
+    profiles_df = pd.DataFrame([["Plate forces", "Plate", "M2D", "Q2D", "Nx2D"] + [None] * 5],
+                               columns=["Name", "Element Type"] + [f"Property {i}" for i in range(1, 9)])
+    return map_df, data_df, profiles_df
+
+
+def benchmark(profile_count: int = 100000, node_count: int = 20, query_count: int = 1000, path: str = None):
+    """ Writes the sidecar of profile_count profiles, opens it and times lookups by element and phase against
+        filtering the tables with pandas, as a script reading the workbook tables does
+    """
+    import tempfile
+    map_df, data_df, profiles_df = synthetic_tables(profile_count, node_count)
+    with tempfile.TemporaryDirectory() as folder:
+        path = path or os.path.join(folder, "Benchmark Results.npz")
+        start = time.perf_counter()
+        write_sidecar(path, map_df, data_df, profiles_df)
+        written = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reader = ResultsReader(path)
+        opened = time.perf_counter() - start
+
+        rng = np.random.default_rng(0)
+        queries = [(f"Plate_{e}", f"Phase_{p} [Phase_{p}]") for e, p in zip(rng.integers(0, 50, query_count), rng.integers(0, 20, query_count))]
+        start = time.perf_counter()
+        indexed = [reader.values("M2D", model="Model_3", phase=phase, element=element)[0] for element, phase in queries]
+        lookup = time.perf_counter() - start
+
+        start = time.perf_counter()
+        filtered = []
+        data_index = data_df["Index"].to_numpy()
+        for element, phase in queries[:max(query_count // 10, 1)]: # a tenth of the queries, the scans are slow
+            match = map_df.loc[(map_df["Model"] == "Model_3") & (map_df["Phase"] == phase) & (map_df["Element"] == element), "Index"]
+            filtered.append(data_df.loc[np.isin(data_index, match.to_numpy()), "Value 1"].to_numpy())
+        scan = (time.perf_counter() - start) * query_count / max(query_count // 10, 1)
+        for a, b in zip(indexed, filtered):
+            assert np.array_equal(a, b), "indexed lookup and table scan disagree"
+        size = os.path.getsize(path) / 2**20
+        reader.close()
+
+    print(f"{profile_count} profiles of {node_count} nodes: sidecar written in {written:.2f} s ({size:.0f} MB), opened in "
+          f"{opened * 1000:.1f} ms. {query_count} element/phase lookups {lookup * 1000:.0f} ms, "
+          f"scanning the tables {scan * 1000:.0f} ms ({scan / lookup:.0f}x)")
+    return written, opened, lookup, scan
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,135 @@
+import time
+import numpy as np
+
+### Notes ###
+
+# Optional tbl_Profiles columns reduce the nodes of a profile before it is written, enveloped or compared:
+#   Top Y, Bottom Y  keep the nodes within this elevation window (either bound may be left empty)
+#   Spacing          keep about one node per Spacing along the element (distance measured along X/Y)
+#   Keep peaks       with Spacing, also keep the nodes of the max and min of every property within each
+#                    interval (default Yes), so that the max and min of the profile, and the envelopes
+#                    built from it, are unchanged. At most 1 + 2 x properties nodes are kept per interval
+# The first and last node of the window are always kept. The same nodes are kept for X, Y and every property.
+
+def parse_level(value) -> float:
+    """ Float of an optional table value, None when the cell is empty
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)) or str(value).strip() == "":
+        return None
+    return float(value)
+
+
+def interval_extrema(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """ Indices of the first max and the first min of values within every interval, intervals being
+        the consecutive slices beginning at starts
+    """
+    counts = np.diff(np.append(starts, len(values)))
+    interval = np.repeat(np.arange(len(starts)), counts)
+    kept = []
+    for reduce in (np.maximum, np.minimum):
+        extreme = reduce.reduceat(values, starts)
+        hits = np.flatnonzero(values == extreme[interval])
+        first = np.ones(len(hits), dtype=bool)
+        first[1:] = interval[hits[1:]] != interval[hits[:-1]]
+        kept.append(hits[first])
+    return np.concatenate(kept)
+
+
+class ProfileReduction:
+    """ Node reduction of one profile, see Notes
+    """
+    __slots__ = ("top", "bottom", "spacing", "keep_peaks")
+    columns = ["Top Y", "Bottom Y", "Spacing", "Keep peaks"]
+
+    def __init__(self, top: float = None, bottom: float = None, spacing: float = None, keep_peaks: bool = True):
+        self.top = top
+        self.bottom = bottom
+        self.spacing = spacing if spacing and spacing > 0 else None
+        self.keep_peaks = keep_peaks
+
+    @classmethod
+    def from_profile(cls, row: dict) -> object:
+        """ Reduction given by the optional columns of a tbl_Profiles row, None when they are all empty
+        """
+        top, bottom, spacing = (parse_level(row.get(column)) for column in cls.columns[:3])
+        if top is None and bottom is None and not spacing:
+            return None
+        keep_peaks = str(row.get("Keep peaks") or "Yes").lower() not in ("no", "false", "0")
+        return cls(top, bottom, spacing, keep_peaks)
+
+    def node_indices(self, x: np.ndarray, y: np.ndarray, values: list) -> np.ndarray:
+        """ Indices of the nodes to keep, in their original order. values are the property arrays
+            of the same length as x
+        """
+        window = np.ones(len(y), dtype=bool)
+        if self.top is not None:
+            window &= y <= self.top
+        if self.bottom is not None:
+            window &= y >= self.bottom
+        nodes = np.flatnonzero(window)
+        if self.spacing is None or len(nodes) < 3:
+            return nodes
+
+        xw, yw = x[nodes], y[nodes]
+        chainage = np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(xw), np.diff(yw)))))
+        bins = np.floor(chainage / self.spacing)
+        keep = np.ones(len(nodes), dtype=bool)
+        keep[1:] = bins[1:] != bins[:-1] # first node of every spacing interval
+        keep[-1] = True
+        if self.keep_peaks:
+            starts = np.flatnonzero(keep[:-1])
+            for data in values:
+                keep[interval_extrema(data[nodes], starts)] = True
+        return nodes[keep]
+
+    def apply(self, block: object) -> object:
+        """ ResultBlock holding the kept nodes only
+        """
+        x, y = block['X'], block['Y']
+        if not len(y):
+            return block
+        values = [block[prop] for prop in block.properties() if len(block[prop]) == len(y)]
+        return block.take(self.node_indices(x, y, values))
+
+
+def profile_reductions(profiles_df: object) -> dict:
+    """ Dictionary of profile name:ProfileReduction for the profiles of tbl_Profiles that reduce their nodes
+    """
+    if not any(column in profiles_df.columns for column in ProfileReduction.columns):
+        return {}
+    reductions = {}
+    for row in profiles_df.to_dict("records"):
+        reduction = ProfileReduction.from_profile(row)
+        if reduction is not None:
+            reductions[row["Name"]] = reduction
+    return reductions
+
+
+def benchmark(profile_count: int = 1000, node_count: int = 2000, spacing: float = 0.5):
+    """ Reduces dense wall profiles (node_count nodes over 30 m) to spacing, checks that the max and min
+        of every property are kept and times the reduction
+    """
+    from Shovel_Results import ResultBlock
+    rng = np.random.default_rng(0)
+    y = np.repeat(np.linspace(0, -30, node_count // 2), 2) # plate nodes come in pairs, one per element end
+    blocks = [ResultBlock({'X': np.zeros(len(y)), 'Y': y,
+                           'M2D': 100 * np.sin(y / rng.uniform(2, 5)) + rng.normal(0, 3, len(y)),
+                           'Q2D': 50 * np.cos(y / rng.uniform(2, 5)) + rng.normal(0, 3, len(y))}) for _ in range(profile_count)]
+    reduction = ProfileReduction(spacing=spacing)
+
+    start = time.perf_counter()
+    reduced = [reduction.apply(block) for block in blocks]
+    elapsed = time.perf_counter() - start
+
+    for block, kept in zip(blocks, reduced):
+        for prop in ('M2D', 'Q2D'):
+            assert kept[prop].max() == block[prop].max() and kept[prop].min() == block[prop].min(), "peak lost"
+    before = sum(len(block['Y']) for block in blocks)
+    after = sum(len(block['Y']) for block in reduced)
+    print(f"{profile_count} profiles of {len(y)} nodes reduced to {spacing} m with peaks: {before} -> {after} nodes "
+          f"({before / after:.1f}x) in {elapsed * 1000:.1f} ms, max/min preserved")
+    return before, after, elapsed
+
+
+if __name__ == '__main__':
+    benchmark()
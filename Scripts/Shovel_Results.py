@@ -0,0 +1,129 @@
+import numpy as np
+
+### Notes ###
+
+# Nodal results of one (phase, element) are held as contiguous float64 arrays, X, Y and one array per
+# property in order, instead of lists of Python floats. A ResultBlock reads like the {X:[], Y:[], property:[]}
+# dictionaries it replaces (block['X'], iteration over the names, values(), get()), so envelopes and
+# pipelines use it unchanged, and converts straight to the layouts of the outputs:
+#   com_rows(*keys) -> one float64 array of [keys, X, Y, properties] rows, assigned to Range.Value as is
+#   long_columns()  -> Property/Node/X/Y/Value arrays of the long format written by ColumnarSink
+# A result type that Plaxis could not return is an empty array.
+
+def fetch_values(results) -> np.ndarray:
+    """ Reads the values returned by g.getresults straight into a float64 array
+    """
+    try:
+        return np.fromiter(results, dtype=np.float64, count=len(results))
+    except TypeError: # no len(), the array grows while reading
+        return np.fromiter(results, dtype=np.float64)
+
+
+class ResultBlock:
+    """ Results of one phase/element pair as a dictionary of name:float64 array, see Notes
+    """
+    __slots__ = ("phase", "element", "columns")
+
+    def __init__(self, columns: dict, phase: str = None, element: str = None):
+        self.phase = phase
+        self.element = element
+        self.columns = {name: np.asarray(data, dtype=np.float64) for name, data in columns.items()} # no copy of float64 arrays
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def get(self, name: str, default=None):
+        return self.columns.get(name, default)
+
+    def keys(self):
+        return self.columns.keys()
+
+    def values(self):
+        return self.columns.values()
+
+    def items(self):
+        return self.columns.items()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(data.nbytes for data in self.columns.values())
+
+    def properties(self) -> list:
+        return [name for name in self.columns if name not in ('X', 'Y')]
+
+    def select(self, names: list) -> object:
+        """ Block of the given columns in that order, sharing the arrays of this block
+        """
+        return ResultBlock({name: self.columns[name] for name in names}, self.phase, self.element)
+
+    def take(self, indices: np.ndarray) -> object:
+        """ Block of the nodes at indices. Columns without a value for every node are kept as they are
+        """
+        node_count = len(self.columns['X'])
+        return ResultBlock({name: data[indices] if len(data) == node_count else data for name, data in self.columns.items()},
+                           self.phase, self.element)
+
+    def com_rows(self, *keys) -> np.ndarray:
+        """ Nodes x (keys + columns) array, the keys repeated at the start of every row.
+            Rows stop at the shortest column, like the transposition of the result lists did
+        """
+        columns = list(self.columns.values())
+        row_count = min(len(data) for data in columns) if columns else 0
+        rows = np.empty((row_count, len(keys) + len(columns)))
+        if keys:
+            rows[:, :len(keys)] = keys
+        for j, data in enumerate(columns, start=len(keys)):
+            rows[:, j] = data[:row_count]
+        return rows
+
+    def long_columns(self) -> dict:
+        """ One row per property and node: Property, Node, X, Y and Value arrays.
+            Properties without a value for every node are skipped
+        """
+        x = self.columns['X']
+        y = self.columns['Y']
+        node_count = len(x)
+        properties = [prop for prop in self.properties() if len(self.columns[prop]) == node_count]
+        return {"Property": np.repeat(np.array(properties, dtype=object), node_count),
+                "Node": np.tile(np.arange(1, node_count + 1, dtype=np.int32), len(properties)),
+                "X": np.tile(x, len(properties)),
+                "Y": np.tile(y, len(properties)),
+                "Value": np.concatenate([self.columns[prop] for prop in properties] or [np.empty(0)])}
+
+
+def stack_rows(chunks: list) -> object:
+    """ Stacks chunks of rows, 2D arrays or lists of rows, into the rectangular block of one Range.Value assignment.
+        Float arrays of the same width are concatenated as they are, anything else is padded with None
+    """
+    chunks = [chunk for chunk in chunks if len(chunk)]
+    if not chunks:
+        return []
+    if all(isinstance(chunk, list) for chunk in chunks):
+        rows = [row for chunk in chunks for row in chunk]
+        col_count = max(len(row) for row in rows)
+        return [row + [None] * (col_count - len(row)) for row in rows]
+    widths = {chunk.shape[1] for chunk in chunks if isinstance(chunk, np.ndarray)}
+    if len(widths) == 1 and all(isinstance(chunk, np.ndarray) for chunk in chunks):
+        return np.concatenate(chunks)
+
+    col_count = max(chunk.shape[1] if isinstance(chunk, np.ndarray) else max(len(row) for row in chunk) for chunk in chunks)
+    stacked = np.full((sum(len(chunk) for chunk in chunks), col_count), None, dtype=object)
+    r = 0
+    for chunk in chunks:
+        if isinstance(chunk, np.ndarray):
+            stacked[r:r + len(chunk), :chunk.shape[1]] = chunk
+            r += len(chunk)
+        else:
+            for row in chunk:
+                stacked[r, :len(row)] = row
+                r += 1
+    return stacked
@@ -0,0 +1,191 @@
+import csv
+import os
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # pyarrow is only needed for the Parquet and Feather sinks
+    pa = None
+
+### Notes ###
+
+# A sink receives every extracted profile from Extractor in index order:
+#   open() -> [start_model() -> write_profile() * n -> end_model()] * models -> close()
+# start_model returns the highest index already used so that indexes keep running across runs.
+# Extractor goes through model(), which also calls end_model when the extraction of the model fails,
+# so that a sink can rely on end_model to restore what start_model changed (e.g. Excel's ScreenUpdating).
+
+class ResultSink:
+    """ Base class of the extraction outputs, discards every profile (the sink of a dry run)
+    """
+    last_index = 0 # highest index written so far
+
+    def open(self):
+        return
+
+    def start_model(self, model_name: str) -> int:
+        """ Prepares the output for a model and returns the highest index already in use
+        """
+        return self.last_index
+
+    @contextmanager
+    def model(self, model_name: str):
+        """ start_model and end_model around a block, end_model runs even if the block fails.
+            Usage: with sink.model(name) as max_index: ...
+        """
+        max_index = self.start_model(model_name)
+        try:
+            yield max_index
+        finally:
+            self.end_model(model_name)
+
+    def write_profile(self, index: int, no, model_name: str, phase: str, element: str, profile: str, status: str, results: dict):
+        """ Writes one extracted profile. results is a ResultBlock of X, Y and the profile properties in order
+        """
+        self.last_index = max(self.last_index, index)
+
+    def end_model(self, model_name: str):
+        return
+
+    def checkpoint(self):
+        """ Makes everything written so far durable
+        """
+        return
+
+    def close(self):
+        return
+
+
+class ColumnarSink(ResultSink):
+    """ Streams extraction results in long format (one row per index, property and node) into a Parquet,
+        Feather or CSV file in the output folder. The profile map is written next to it as a CSV file.
+        The output of an earlier run is added to, indexes carry on from the highest index of its map
+    """
+    columns = ["Index", "Model", "Phase", "Element", "Profile", "Property", "Node", "X", "Y", "Value"]
+    map_columns = ["Index", "No.", "Model", "Phase", "Element", "Profile", "Status"]
+    extensions = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv"}
+
+    def __init__(self, output_path: str, project_name: str, file_format: str = "parquet", row_group_size: int = 1000000):
+        self.file_format = file_format.lower()
+        if self.file_format not in self.extensions:
+            raise Exception(f"Unknown output format: {file_format}")
+        if self.file_format != "csv" and pa is None:
+            raise Exception(f"pyarrow is required to write {file_format} files")
+
+        file_name = os.path.join(output_path, project_name + " Plaxis Extraction")
+        self.data_path = file_name + self.extensions[self.file_format]
+        self.map_path = file_name + " Map.csv"
+        self.row_group_size = int(row_group_size)
+        self.chunks = []
+        self.chunk_rows = 0
+        self.rows_written = 0
+        self.writer = None
+        self.schema = None
+        self.write_path = self.data_path # a new file is written next to the file of an earlier run, see flush
+        self.data_file = None
+        self.map_file = None
+        self.map_writer = None
+
+    def open(self):
+        existing_map = os.path.exists(self.map_path)
+        if existing_map:
+            self.last_index = self.read_last_index()
+        self.map_file = open(self.map_path, "a" if existing_map else "w", newline="")
+        self.map_writer = csv.writer(self.map_file)
+        if not existing_map:
+            self.map_writer.writerow(self.map_columns)
+        if self.file_format == "csv":
+            existing_data = os.path.exists(self.data_path)
+            self.data_file = open(self.data_path, "a" if existing_data else "w", newline="")
+            self.writer = csv.writer(self.data_file)
+            if not existing_data:
+                self.writer.writerow(self.columns)
+        elif os.path.exists(self.data_path):
+            self.write_path = self.data_path + ".new"
+        return
+
+    def read_last_index(self) -> int:
+        """ Highest index of the map written by an earlier run
+        """
+        with open(self.map_path, newline="") as f:
+            return max((int(row["Index"]) for row in csv.DictReader(f) if row.get("Index")), default=0)
+
+    def write_profile(self, index: int, no, model_name: str, phase: str, element: str, profile: str, status: str, results: dict):
+        self.last_index = max(self.last_index, index) # indexes keep running across models
+        self.map_writer.writerow([index, no, model_name, phase, element, profile, status])
+        if status != 'Extracted':
+            return
+
+        chunk = results.long_columns() # skips properties without data
+        row_count = len(chunk["Value"])
+        chunk.update({"Index": np.full(row_count, index, dtype=np.int64),
+                      "Model": np.full(row_count, model_name, dtype=object),
+                      "Phase": np.full(row_count, phase, dtype=object),
+                      "Element": np.full(row_count, element, dtype=object),
+                      "Profile": np.full(row_count, profile, dtype=object)})
+        self.chunks.append(chunk)
+        self.chunk_rows += row_count
+        if self.chunk_rows >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """ Writes the collected rows as one row group
+        """
+        if not self.chunks:
+            return
+        columns = {column: np.concatenate([chunk[column] for chunk in self.chunks]) for column in self.columns}
+
+        if self.file_format == "csv":
+            self.writer.writerows(zip(*[columns[column].tolist() for column in self.columns]))
+        else:
+            table = pa.table({column: columns[column] for column in self.columns})
+            if self.writer is None:
+                self.open_writer(table.schema)
+            self.writer.write_table(table.cast(self.schema))
+
+        self.rows_written += self.chunk_rows
+        self.chunks = []
+        self.chunk_rows = 0
+
+    def open_writer(self, schema: object):
+        """ Parquet and Feather files cannot be appended to: the rows of an earlier run are copied into the new file
+            first, batch by batch, and the new file replaces the old one on close
+        """
+        self.schema = schema
+        if self.write_path == self.data_path:
+            self.writer = pq.ParquetWriter(self.write_path, schema) if self.file_format == "parquet" else pa.ipc.new_file(self.write_path, schema)
+            return
+        if self.file_format == "parquet":
+            source = pq.ParquetFile(self.data_path)
+            self.schema = source.schema_arrow
+            self.writer = pq.ParquetWriter(self.write_path, self.schema)
+            for i in range(source.num_row_groups):
+                self.writer.write_table(source.read_row_group(i))
+            source.close()
+        else:
+            with pa.OSFile(self.data_path, "rb") as f:
+                source = pa.ipc.open_file(f)
+                self.schema = source.schema
+                self.writer = pa.ipc.new_file(self.write_path, self.schema)
+                for i in range(source.num_record_batches):
+                    self.writer.write_batch(source.get_batch(i))
+
+    def end_model(self, model_name: str):
+        self.map_file.flush()
+
+    def checkpoint(self):
+        self.flush()
+        self.map_file.flush()
+
+    def close(self):
+        self.flush()
+        if self.writer is not None and self.file_format != "csv":
+            self.writer.close()
+            if self.write_path != self.data_path:
+                os.replace(self.write_path, self.data_path)
+        if self.data_file is not None:
+            self.data_file.close()
+        self.map_file.close()
+        return
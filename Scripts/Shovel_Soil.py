@@ -0,0 +1,275 @@
+import time
+import numpy as np
+try:
+    from scipy.spatial import cKDTree
+except ImportError: # the grid index below answers the same queries without scipy
+    cKDTree = None
+
+### Notes ###
+
+# Soil results are sampled along cut lines and at points named in the Element columns of tbl_Extraction
+# (element type Soil), coordinates in m separated by underscores:
+#   SoilLine_<x1>_<y1>_<x2>_<y2>[_<spacing>]  points every spacing m from (x1, y1) to (x2, y2), both ends
+#                                              included. Without spacing the line is cut into 50 intervals
+#   SoilNode_<x>_<y>                          the soil node nearest to (x, y), with its own coordinates
+# The results of the whole soil mesh are fetched once per phase and property (g.getresults without an element,
+# shared by every cut line of the phase) and the node coordinates once per model, fetched again only when
+# a phase returns another number of nodes. The nodes are put in a spatial index (a cKDTree when scipy is
+# installed, a uniform grid of cells otherwise) and the neighbours and weights of every cut line are computed
+# once per model. A phase is then one gather and weighted sum per property.
+# Line points are the inverse distance weighted average of the 4 nearest nodes, the value of a node when a
+# point lies on it. Line points further from their nearest node than 1.5 times the largest distance between one
+# of the 4 nodes and its own nearest neighbour are outside the mesh (beyond the model, in a hole or an excavation)
+# and are dropped.
+
+SOIL_MESH = "Soil" # element name of the results of every soil node
+LINE_PREFIX = "SoilLine"
+NODE_PREFIX = "SoilNode"
+DEFAULT_INTERVALS = 50
+NEIGHBOURS = 4
+
+
+def parse_cut_line(name: str) -> tuple:
+    """ (query points as an n x 2 array, number of neighbours) of a SoilLine or SoilNode name,
+        None when name is not one
+    """
+    parts = str(name).split('_')
+    if parts[0] not in (LINE_PREFIX, NODE_PREFIX):
+        return None
+    try:
+        numbers = [float(part) for part in parts[1:]]
+    except ValueError:
+        return None
+    if parts[0] == NODE_PREFIX:
+        return (np.array([numbers]), 1) if len(numbers) == 2 else None
+    if len(numbers) not in (4, 5):
+        return None
+    x1, y1, x2, y2 = numbers[:4]
+    length = np.hypot(x2 - x1, y2 - y1)
+    spacing = numbers[4] if len(numbers) == 5 and numbers[4] > 0 else length / DEFAULT_INTERVALS
+    count = int(np.floor(length / spacing + 1e-9)) + 1 if length > 0 else 1
+    t = np.minimum(np.arange(count) * spacing / length, 1.0) if length > 0 else np.zeros(1)
+    if t[-1] < 1.0: # the end of the line is always sampled
+        t = np.append(t, 1.0)
+    return np.column_stack((x1 + t * (x2 - x1), y1 + t * (y2 - y1))), NEIGHBOURS
+
+
+def is_cut_line(name: str) -> bool:
+    return parse_cut_line(name) is not None
+
+
+class GridIndex:
+    """ Nodes bucketed into a uniform grid of square cells, about nodes_per_cell nodes per cell.
+        Answers k nearest node queries exactly by searching growing rings of cells around every point
+    """
+    def __init__(self, x: np.ndarray, y: np.ndarray, nodes_per_cell: float = 2.0):
+        self.x, self.y = x, y
+        self.x0, self.y0 = x.min(), y.min()
+        width, height = max(x.max() - self.x0, 1e-9), max(y.max() - self.y0, 1e-9)
+        self.cell = max(np.sqrt(width * height * nodes_per_cell / len(x)), max(width, height) / 4096)
+        self.nx = int(width // self.cell) + 1
+        self.ny = int(height // self.cell) + 1
+        cells = self.cell_of(x, y)
+        self.order = np.argsort(cells, kind="stable") # node indices sorted by cell
+        self.starts = np.concatenate(([0], np.cumsum(np.bincount(cells, minlength=self.nx * self.ny))))
+
+    def cell_of(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        ix = np.clip(((x - self.x0) // self.cell).astype(np.int64), 0, self.nx - 1)
+        iy = np.clip(((y - self.y0) // self.cell).astype(np.int64), 0, self.ny - 1)
+        return ix * self.ny + iy
+
+    def query(self, points: np.ndarray, k: int) -> tuple:
+        """ (distances, node indices), both len(points) x k and sorted by distance
+        """
+        k = min(k, len(self.x))
+        px, py = points[:, 0], points[:, 1]
+        distances = np.full((len(points), k), np.inf)
+        nodes = np.zeros((len(points), k), dtype=np.int64)
+        pending = np.arange(len(points))
+        ring = 1
+        while len(pending):
+            found, ranks, d2, candidates = self.ring_candidates(px[pending], py[pending], ring)
+            keep = ranks < k
+            distances[pending[found[keep]], ranks[keep]] = np.sqrt(d2[keep])
+            nodes[pending[found[keep]], ranks[keep]] = candidates[keep]
+            # a node outside the searched cells is at least ring cells away from a point inside the grid
+            outside = np.hypot(np.maximum(0, np.maximum(self.x0 - px[pending], px[pending] - self.x0 - self.nx * self.cell)),
+                               np.maximum(0, np.maximum(self.y0 - py[pending], py[pending] - self.y0 - self.ny * self.cell)))
+            complete = distances[pending, k - 1] <= ring * self.cell - outside
+            if ring >= max(self.nx, self.ny): # every cell was searched
+                break
+            pending = pending[~complete]
+            ring += 1
+        return distances, nodes
+
+    def ring_candidates(self, px: np.ndarray, py: np.ndarray, ring: int) -> tuple:
+        """ Every node of the (2 ring + 1)^2 cells around every point, sorted by point and distance.
+            Returns (point, rank of the node for that point, squared distance, node) arrays
+        """
+        ix = np.clip(((px - self.x0) // self.cell).astype(np.int64), 0, self.nx - 1)
+        iy = np.clip(((py - self.y0) // self.cell).astype(np.int64), 0, self.ny - 1)
+        steps = np.arange(-ring, ring + 1)
+        cx = (ix[:, None, None] + steps[None, :, None]).repeat(len(steps), axis=2).reshape(len(px), -1)
+        cy = (iy[:, None, None] + steps[None, None, :]).repeat(len(steps), axis=1).reshape(len(px), -1)
+        valid = (cx >= 0) & (cx < self.nx) & (cy >= 0) & (cy < self.ny)
+        point = np.nonzero(valid)[0]
+        cells = cx[valid] * self.ny + cy[valid]
+        counts = self.starts[cells + 1] - self.starts[cells]
+        point = np.repeat(point, counts)
+        first = np.repeat(self.starts[cells] - (np.cumsum(counts) - counts), counts)
+        candidates = self.order[first + np.arange(len(point))]
+        d2 = (self.x[candidates] - px[point]) ** 2 + (self.y[candidates] - py[point]) ** 2
+        order = np.lexsort((d2, point))
+        point, d2, candidates = point[order], d2[order], candidates[order]
+        group_start = np.flatnonzero(np.concatenate(([True], point[1:] != point[:-1])))
+        ranks = np.arange(len(point)) - np.repeat(group_start, np.diff(np.append(group_start, len(point))))
+        return point, ranks, d2, candidates
+
+
+class KDTreeIndex:
+    """ Same queries as GridIndex on a scipy cKDTree
+    """
+    def __init__(self, x: np.ndarray, y: np.ndarray):
+        self.x, self.y = x, y
+        self.tree = cKDTree(np.column_stack((x, y)))
+
+    def query(self, points: np.ndarray, k: int) -> tuple:
+        k = min(k, len(self.x))
+        distances, nodes = self.tree.query(points, k)
+        return distances.reshape(len(points), k), nodes.reshape(len(points), k)
+
+
+def spatial_index(x: np.ndarray, y: np.ndarray) -> object:
+    return KDTreeIndex(x, y) if cKDTree is not None else GridIndex(x, y)
+
+
+def idw_weights(distances: np.ndarray) -> np.ndarray:
+    """ Inverse distance squared weights of every row of neighbour distances, all the weight on a node that is hit
+    """
+    scale = max(distances[:, -1].max() if distances.size else 0.0, 1e-12)
+    hit = distances[:, 0] <= 1e-9 * scale
+    with np.errstate(divide="ignore"):
+        weights = 1.0 / distances ** 2
+    weights[hit] = 0.0
+    weights[hit, 0] = 1.0
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+class SoilSampler:
+    """ Spatial index of the soil nodes of one model and the interpolation weights of its cut lines, see Notes
+    """
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self.x = None
+        self.y = None
+        self.index = None
+        self.node_spacing = None # distance of every node to its nearest neighbour
+        self.lines = {} # name: (query points, node indices, weights)
+
+    def set_nodes(self, x: np.ndarray, y: np.ndarray):
+        self.x, self.y = x, y
+        self.index = spatial_index(x, y)
+        distances, _ = self.index.query(np.column_stack((x, y)), 2)
+        self.node_spacing = distances[:, -1]
+        self.lines = {}
+
+    def line(self, name: str) -> tuple:
+        """ Query points inside the mesh, their neighbouring nodes and weights, computed once per set of nodes
+        """
+        if name not in self.lines:
+            points, k = parse_cut_line(name)
+            distances, nodes = self.index.query(points, k)
+            if k == 1: # a node query reports the node itself
+                points = np.column_stack((self.x[nodes[:, 0]], self.y[nodes[:, 0]]))
+            else:
+                inside = distances[:, 0] <= 1.5 * self.node_spacing[nodes].max(axis=1) + 1e-9
+                points, distances, nodes = points[inside], distances[inside], nodes[inside]
+            self.lines[name] = (points, nodes, idw_weights(distances))
+        return self.lines[name]
+
+    def sample_phase(self, fetch, phase_str: str, cut_lines: dict) -> dict:
+        """ Returns {cut line:{X, Y, property:array}} of a phase. cut_lines is a dictionary of name:[properties],
+            fetch(phase_str, properties) returns the {property:array} of every soil node
+        """
+        properties = []
+        for names in cut_lines.values():
+            properties.extend(prop for prop in names if prop not in ('X', 'Y') and prop not in properties)
+        values = fetch(phase_str, properties)
+        node_count = max((len(data) for data in values.values()), default=0)
+        if node_count and (self.x is None or len(self.x) != node_count):
+            coordinates = fetch(phase_str, ['X', 'Y'])
+            if len(coordinates['X']) == node_count and len(coordinates['Y']) == node_count:
+                self.set_nodes(np.asarray(coordinates['X']), np.asarray(coordinates['Y']))
+
+        sampled = {}
+        for name, names in cut_lines.items():
+            if self.x is None or len(self.x) != node_count:
+                sampled[name] = {prop: np.empty(0) for prop in names} # no soil results for this phase
+                continue
+            points, nodes, weights = self.line(name)
+            columns = {'X': points[:, 0], 'Y': points[:, 1]}
+            for prop in names:
+                if prop not in columns:
+                    data = values.get(prop)
+                    columns[prop] = (data[nodes] * weights).sum(axis=1) if data is not None and len(data) == node_count else np.empty(0)
+            sampled[name] = columns
+        return sampled
+
+
+def synthetic_mesh(node_count: int, seed: int = 0) -> tuple:
+    """ Jittered soil nodes over a 100 x 40 m model with an excavation left of a wall at x = 0
+    """
+    rng = np.random.default_rng(seed)
+    side = int(np.sqrt(node_count * 2.5))
+    gx, gy = np.meshgrid(np.linspace(-50, 50, side), np.linspace(-40, 0, max(node_count // side, 2)))
+    x = gx.ravel() + rng.uniform(-0.1, 0.1, gx.size)
+    y = gy.ravel() + rng.uniform(-0.05, 0.05, gy.size)
+    excavated = (x < 0) & (x > -15) & (y > -8)
+    return x[~excavated], y[~excavated]
+
+
+def benchmark(node_count: int = 200000, line_count: int = 10, phase_count: int = 10):
+    """ Samples line_count vertical cut lines behind the wall of a synthetic mesh over phase_count phases,
+        with the spatial index against filtering every soil node per phase and line. Checks both agree
+    """
+    x, y = synthetic_mesh(node_count)
+    fields = [{'Ux': np.sin(x / 10) * (p + 1), 'Uy': y * 0.01 * (p + 1)} for p in range(phase_count)]
+    lines = {f"SoilLine_{1 + i * 0.5}_0_{1 + i * 0.5}_-30_0.5": ['X', 'Y', 'Ux', 'Uy'] for i in range(line_count)}
+
+    start = time.perf_counter()
+    sampler = SoilSampler("Synthetic")
+    sampled = []
+    for p in range(phase_count):
+        coordinates = {'X': x, 'Y': y}
+        sampled.append(sampler.sample_phase(lambda phase, props: {prop: coordinates.get(prop, fields[p].get(prop)) for prop in props},
+                                            p, lines))
+    indexed = time.perf_counter() - start
+
+    kept_points = {name: sampler.line(name)[0] for name in lines} # the points inside the mesh
+    start = time.perf_counter()
+    filtered = []
+    for p in range(phase_count): # every node compared with every point, per phase and line
+        phase_lines = {}
+        for name, points in kept_points.items():
+            k = NEIGHBOURS
+            d2 = (x[None, :] - points[:, 0:1]) ** 2 + (y[None, :] - points[:, 1:2]) ** 2
+            nodes = np.argpartition(d2, k, axis=1)[:, :k]
+            nodes = np.take_along_axis(nodes, np.argsort(np.take_along_axis(d2, nodes, axis=1), axis=1), axis=1)
+            weights = idw_weights(np.sqrt(np.take_along_axis(d2, nodes, axis=1)))
+            phase_lines[name] = {prop: (fields[p][prop][nodes] * weights).sum(axis=1) for prop in ('Ux', 'Uy')}
+        filtered.append(phase_lines)
+    brute = time.perf_counter() - start
+
+    for indexed_lines, filtered_lines in zip(sampled, filtered):
+        for name, columns in indexed_lines.items():
+            for prop in ('Ux', 'Uy'):
+                assert np.allclose(columns[prop], filtered_lines[name][prop]), "spatial index and filtering disagree"
+    point_count = sum(len(columns['Y']) for columns in sampled[0].values())
+    print(f"{len(x)} soil nodes, {line_count} cut lines of {point_count // line_count} points, {phase_count} phases: "
+          f"{type(sampler.index).__name__} {indexed * 1000:.0f} ms, filtering every node {brute * 1000:.0f} ms "
+          f"({brute / indexed:.0f}x)")
+    return indexed, brute
+
+
+if __name__ == '__main__':
+    benchmark()
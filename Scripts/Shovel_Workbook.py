@@ -0,0 +1,425 @@
+import datetime
+import math
+import numbers
+import os
+import posixpath
+import re
+import zipfile
+from contextlib import contextmanager
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter, column_index_from_string, range_boundaries
+from openpyxl.utils.datetime import to_excel
+from Shovel_Classes import ExcelTable
+from Shovel_Metrics import metrics
+
+### Notes ###
+
+# Headless counterpart of ExcelTable working on the .xlsm file with openpyxl.
+# Workbooks are loaded once per path and shared by every table opened on them. Saving writes the file
+# without going through openpyxl, so the loaded workbook is dropped then and the next table opened on the
+# path reads the saved file. A long-lived process (Shovel_Daemon) releases every workbook after each job.
+# Table rows are held in memory as lists, every mutation happens there and the sheet cells
+# are only rewritten when the workbook is saved or committed.
+# Formula cells are read through a second, values-only copy of the workbook (the values cached by Excel).
+# openpyxl only reads: a workbook saved by openpyxl loses every part it does not know (form control
+# buttons, comments, rich data, chart styles, ...). Saving copies the file part by part instead and only
+# rewrites the cells of the tables, their table ref and the calculation flags, see patch_workbook.
+
+class OpenpyxlTable(ExcelTable):
+    """ Same interface as ExcelTable, without a running Excel application
+    """
+    workbooks = {} # path: openpyxl workbook
+    value_workbooks = {} # path: values-only openpyxl workbook, loaded when a formula is read
+    tables = {} # path: [OpenpyxlTable], synced into the sheets before saving
+
+    def __init__(self, wb, sheet, tablename):
+        """ wb is the path of the workbook, or the name of a workbook already opened by this class
+        """
+        self.path = self.find_path(wb)
+        if self.path not in self.workbooks:
+            self.workbooks[self.path] = load_workbook(self.path)
+            self.tables.setdefault(self.path, [])
+        self.wb = self.workbooks[self.path]
+        self.sheet = self.wb[sheet]
+        self.table = self.sheet.tables[tablename]
+        self.df = None
+        self.buffer = None
+
+        min_col, min_row, max_col, max_row = range_boundaries(self.table.ref)
+        self.first_col = min_col
+        self.header_row = min_row
+        self.header = list(next(self.sheet.iter_rows(min_row, min_row, min_col, max_col, values_only=True)))
+        self.rows = [list(row) for row in self.sheet.iter_rows(min_row + 1, max_row, min_col, max_col, values_only=True)]
+        if self.rows and all(value is None for value in self.rows[-1]): # the empty insert row of a ListObject
+            self.rows.pop()
+        self.value_rows = None # cached values of the rows, only kept when the table holds formulas
+        if any(self.is_formula(value) for row in self.rows for value in row):
+            if self.path not in self.value_workbooks:
+                self.value_workbooks[self.path] = load_workbook(self.path, data_only=True)
+            value_sheet = self.value_workbooks[self.path][sheet]
+            self.value_rows = [list(row) for row in value_sheet.iter_rows(min_row + 1, min_row + len(self.rows), min_col, max_col, values_only=True)]
+        self.synced_rows = max_row - min_row # rows currently written in the sheet
+        self.calculated = {i: column.calculatedColumnFormula.attr_text for i, column in enumerate(self.table.tableColumns)
+                           if column.calculatedColumnFormula is not None}
+        self.tables[self.path].append(self)
+
+    @classmethod
+    def find_path(cls, wb: str) -> str:
+        for path in list(cls.workbooks) + list(cls.tables):
+            if wb in (path, os.path.basename(path), os.path.splitext(os.path.basename(path))[0]):
+                return path
+        return os.path.abspath(wb)
+
+    @classmethod
+    def open_wb(cls, wb_path, sheet, tablename):
+        return cls(wb_path, sheet, tablename)
+
+    def sibling(self, sheet, tablename):
+        return type(self)(self.path, sheet, tablename)
+
+    def headerlist(self):
+        return tuple(self.header)
+
+    def column_count(self) -> int:
+        return len(self.header)
+
+    def row_count(self) -> int:
+        return len(self.rows)
+
+    @staticmethod
+    def is_formula(value) -> bool:
+        return isinstance(value, str) and value.startswith("=")
+
+    def values(self) -> list:
+        """ Rows as values, formulas written since loading have no value yet and read as None
+        """
+        return self.rows if self.value_rows is None else self.value_rows
+
+    def column_values(self, column: str) -> list:
+        i = self.header.index(column)
+        return [row[i] for row in self.values()]
+
+    def dataframe(self, first_col_as_index: bool = False) -> object:
+        rows = self.values()
+        if not rows: # an empty ListObject still has its insert row
+            rows = [[None] * len(self.header)]
+        self.df = pd.DataFrame(rows, columns=self.header)
+        if first_col_as_index:
+            self.df.set_index(self.df.iloc[:, 0].name, inplace=True)
+        return self.df
+
+    def new_row(self, values: list, start_col: int = 1) -> list:
+        """ Full table row with values placed from start_col, calculated columns are filled in
+        """
+        row = [None] * (start_col - 1) + list(values)
+        row += [None] * (len(self.header) - len(row))
+        for i, formula in self.calculated.items():
+            if row[i] is None:
+                row[i] = "=" + formula
+        return row
+
+    def append_rows(self, rows: list, start_col: int = 1):
+        new_rows = [self.new_row(row, start_col) for row in rows]
+        self.rows.extend(new_rows)
+        if self.value_rows is not None:
+            self.value_rows.extend([None if self.is_formula(value) else value for value in row] for row in new_rows)
+
+    def clear_table(self):
+        self.rows = []
+        if self.value_rows is not None:
+            self.value_rows = []
+
+    def bulk_delete(self, criteria: dict, max_ranges: int = 20) -> int:
+        if not self.rows:
+            return 0
+        mask = self.match_rows(criteria)
+        self.rows = [row for row, delete in zip(self.rows, mask) if not delete]
+        if self.value_rows is not None:
+            self.value_rows = [row for row, delete in zip(self.value_rows, mask) if not delete]
+        return int(np.count_nonzero(mask))
+
+    def write_dict_to_table(self, data_dict: dict, wipe_table: bool = False, start_col: int = 1):
+        if wipe_table:
+            self.clear_table()
+        self.append_rows(self.dict_to_rows(data_dict, start_col), start_col)
+
+    def write_array_to_table(self, rows: np.ndarray, start_col: int = 1):
+        if rows.shape[1] > len(self.header) - start_col + 1:
+            raise Exception("Data will fall outside table")
+        self.append_rows(rows.tolist(), start_col)
+
+    def write_df_to_table(self, df: object, wipe_table: bool = False, starting_col: int = 1) -> bool:
+        if wipe_table:
+            self.clear_table()
+        self.append_rows(np.ascontiguousarray(df).tolist(), starting_col)
+        return True
+
+    def flush(self):
+        return
+
+    @contextmanager
+    def buffered(self, freeze_app: bool = True):
+        """ Every write already happens in memory
+        """
+        yield self
+
+    def sync(self) -> tuple:
+        """ Rows to write into the sheet and the new table ref. The rows cover the old extent of the table
+            so that rows left over by a shrinking table are emptied
+        """
+        row_total = max(len(self.rows), 1) # a table keeps at least one (empty) row
+        width = len(self.header)
+        rows = self.rows + [[None] * width] * (max(self.synced_rows, row_total) - len(self.rows))
+        self.synced_rows = row_total
+        last_col = get_column_letter(self.first_col + width - 1)
+        self.table.ref = f"{get_column_letter(self.first_col)}{self.header_row}:{last_col}{self.header_row + row_total}"
+        if self.table.autoFilter is not None:
+            self.table.autoFilter.ref = self.table.ref
+        return rows
+
+    def commit(self):
+        self.save()
+
+    def save(self, full_path: str = None):
+        """ Saves the workbook, as full_path if given (.xlsm is added when there is no extension)
+        """
+        with metrics.timer("save"):
+            if full_path and not os.path.splitext(full_path)[1]:
+                full_path += ".xlsm"
+            target = os.path.abspath(full_path) if full_path else self.path
+            patch_workbook(self.path, target, [(table.sheet.title, table.table.name, table.header_row + 1, table.first_col,
+                                                table.sync(), table.table.ref) for table in self.tables[self.path]])
+        # the loaded workbooks no longer match the file, tables opened from now on read the saved file
+        self.workbooks.pop(self.path, None)
+        self.value_workbooks.pop(self.path, None)
+        if target != self.path: # like Excel, the workbook is now the saved copy
+            self.rename(target)
+
+    def rename(self, path: str):
+        tables = self.tables.pop(self.path)
+        if self.path in self.workbooks:
+            self.workbooks[path] = self.workbooks.pop(self.path)
+        if self.path in self.value_workbooks:
+            self.value_workbooks[path] = self.value_workbooks.pop(self.path)
+        for table in tables:
+            table.path = path
+        self.tables[path] = tables
+
+    def save_as(self, full_path, close: bool=False):
+        self.save(full_path)
+        if close:
+            self.close()
+
+    def close(self, save: bool=False):
+        if save:
+            self.save()
+        self.release(self.path)
+
+    @classmethod
+    def release(cls, path: str = None):
+        """ Forgets the workbook at path, or every workbook, and the tables opened on it
+        """
+        for cache in (cls.workbooks, cls.value_workbooks, cls.tables):
+            if path is None:
+                cache.clear()
+            else:
+                cache.pop(path, None)
+
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CALC_PR_FOLLOWERS = ("oleSize", "customWorkbookViews", "pivotCaches", "smartTagPr", "smartTagTypes", "webPublishing",
+                     "fileRecoveryPr", "webPublishObjects", "extLst")
+
+
+def part_path(source: str, target: str) -> str:
+    """ Zip path of a relationship target of the part source
+    """
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source), target))
+
+
+def rels_path(part: str) -> str:
+    return posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+
+
+def relationships(zin: zipfile.ZipFile, part: str) -> dict:
+    """ Id: zip path of the targets of part
+    """
+    try:
+        root = ElementTree.fromstring(zin.read(rels_path(part)))
+    except KeyError:
+        return {}
+    return {rel.get("Id"): part_path(part, rel.get("Target")) for rel in root.iter(f"{{{PACKAGE_REL_NS}}}Relationship")
+            if rel.get("TargetMode") != "External"}
+
+
+def table_parts(zin: zipfile.ZipFile) -> dict:
+    """ (sheet name, table name): (sheet part, table part) of every table of the workbook
+    """
+    workbook = "xl/workbook.xml"
+    sheets = relationships(zin, workbook)
+    parts = {}
+    for sheet in ElementTree.fromstring(zin.read(workbook)).iter(f"{{{MAIN_NS}}}sheet"):
+        sheet_part = sheets.get(sheet.get(f"{{{REL_NS}}}id"))
+        if sheet_part is None:
+            continue
+        for table_part in relationships(zin, sheet_part).values():
+            if not table_part.startswith("xl/tables/"):
+                continue
+            table = ElementTree.fromstring(zin.read(table_part))
+            for name in {table.get("name"), table.get("displayName")}:
+                parts[(sheet.get("name"), name)] = (sheet_part, table_part)
+    return parts
+
+
+def cell_xml(prefix: str, ref: str, value, style: str) -> str:
+    """ Cell element of value, strings are written inline so the shared strings part is left alone
+    """
+    c = f'<{prefix}c r="{ref}"' + (f' s="{style}"' if style else "")
+    if hasattr(value, "text") and not isinstance(value, str): # an openpyxl array formula
+        value = value.text
+    if isinstance(value, (bool, np.bool_)):
+        return f'{c} t="b"><{prefix}v>{int(value)}</{prefix}v></{prefix}c>'
+    if isinstance(value, numbers.Integral):
+        return f'{c}><{prefix}v>{int(value)}</{prefix}v></{prefix}c>'
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        if not math.isfinite(value): # not representable in a cell
+            value = None
+        else:
+            return f'{c}><{prefix}v>{value!r}</{prefix}v></{prefix}c>'
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return f'{c}><{prefix}v>{to_excel(value)!r}</{prefix}v></{prefix}c>'
+    if value is None:
+        return c + "/>" if style else ""
+    text = str(value)
+    if text.startswith("="):
+        return f'{c}><{prefix}f>{escape(text[1:])}</{prefix}f></{prefix}c>'
+    return f'{c} t="inlineStr"><{prefix}is><{prefix}t xml:space="preserve">{escape(text)}</{prefix}t></{prefix}is></{prefix}c>'
+
+
+ROW_PATTERN = re.compile(r"<(\w+:)?row\b([^>]*?)(?:/>|>(.*?)</(?:\w+:)?row>)", re.S)
+CELL_PATTERN = re.compile(r"<(?:\w+:)?c\b([^>]*?)(?:/>|>(.*?)</(?:\w+:)?c>)", re.S)
+ROW_NUMBER = re.compile(r'\br="(\d+)"')
+CELL_REF = re.compile(r'\br="([A-Z]+)(\d+)"')
+CELL_STYLE = re.compile(r'\bs="(\d+)"')
+
+
+def patch_sheet(xml: str, first_row: int, first_col: int, rows: list) -> str:
+    """ Sheet xml with rows written from (first_row, first_col). Cells of other columns and rows are kept as they are,
+        rewritten cells keep their style and new cells take the style of the first row of their column
+    """
+    data = re.search(r"<(\w+:)?sheetData\s*/>|<(\w+:)?sheetData>(.*?)</(?:\w+:)?sheetData>", xml, re.S)
+    prefix = data.group(1) or data.group(2) or ""
+    body = data.group(3) or ""
+    width = len(rows[0]) if rows else 0
+    last_row, last_col = first_row + len(rows) - 1, first_col + width - 1
+
+    existing = {} # row number: (attributes, {column: (attributes, xml)})
+    before, after = [], []
+    row_number = 0
+    for match in ROW_PATTERN.finditer(body):
+        number = ROW_NUMBER.search(match.group(2))
+        row_number = int(number.group(1)) if number else row_number + 1
+        if row_number < first_row:
+            before.append(match.group(0))
+        elif row_number > last_row:
+            after.append(match.group(0))
+        else:
+            cells, column = {}, 0
+            for cell in CELL_PATTERN.finditer(match.group(3) or ""):
+                ref = CELL_REF.search(cell.group(1))
+                column = column_index_from_string(ref.group(1)) if ref else column + 1
+                cells[column] = (cell.group(1), cell.group(0))
+            existing[row_number] = (match.group(2), cells)
+
+    def style(row_number: int, column: int) -> str:
+        cell = existing.get(row_number, ("", {}))[1].get(column)
+        found = CELL_STYLE.search(cell[0]) if cell else None
+        return found.group(1) if found else ""
+    column_styles = {column: style(first_row, column) for column in range(first_col, last_col + 1)}
+
+    patched = []
+    for r, row in enumerate(rows, start=first_row):
+        attributes, cells = existing.get(r, (f' r="{r}"', {}))
+        attributes = re.sub(r'\s+spans="[^"]*"', "", attributes)
+        if not ROW_NUMBER.search(attributes):
+            attributes = f' r="{r}"' + attributes
+        written = {column: xml for column, (_, xml) in cells.items() if not first_col <= column <= last_col}
+        for column, value in enumerate(row, start=first_col):
+            cell = cell_xml(prefix, f"{get_column_letter(column)}{r}", value, style(r, column) if column in cells else column_styles[column])
+            if cell:
+                written[column] = cell
+        if written or r in existing:
+            patched.append(f"<{prefix}row{attributes}>" + "".join(written[column] for column in sorted(written)) + f"</{prefix}row>")
+
+    sheet_data = f"<{prefix}sheetData>" + "".join(before + patched + after) + f"</{prefix}sheetData>"
+    xml = xml[:data.start()] + sheet_data + xml[data.end():]
+
+    dimension = re.search(r'(<(?:\w+:)?dimension\s+ref=")([^"]*)(")', xml)
+    if dimension and rows:
+        bounds = range_boundaries(dimension.group(2) if ":" in dimension.group(2) else f"{dimension.group(2)}:{dimension.group(2)}")
+        min_col, min_row = min(bounds[0], first_col), min(bounds[1], first_row)
+        max_col, max_row = max(bounds[2], last_col), max(bounds[3], last_row)
+        ref = f"{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row}"
+        xml = xml[:dimension.start(2)] + ref + xml[dimension.end(2):]
+    return xml
+
+
+def patch_table(xml: str, ref: str) -> str:
+    """ Table xml with the range of the table and of its autofilter set to ref
+    """
+    xml = re.sub(r'(<(?:\w+:)?table\b[^>]*?\sref=")[^"]*(")', lambda m: m.group(1) + ref + m.group(2), xml, count=1)
+    return re.sub(r'(<(?:\w+:)?autoFilter\b[^>]*?\sref=")[^"]*(")', lambda m: m.group(1) + ref + m.group(2), xml, count=1)
+
+
+def patch_workbook_xml(xml: str) -> str:
+    """ Workbook xml asking Excel to recalculate on load, written formulas have no cached value
+    """
+    calc = re.search(r"<(?:\w+:)?calcPr\b[^>]*?(/?>)", xml)
+    if calc:
+        if "fullCalcOnLoad" in calc.group(0):
+            return re.sub(r'fullCalcOnLoad="[^"]*"', 'fullCalcOnLoad="1"', xml, count=1)
+        return xml[:calc.start(1)] + ' fullCalcOnLoad="1"' + xml[calc.start(1):]
+    prefix = re.search(r"<(\w+:)?workbook\b", xml).group(1) or ""
+    follower = re.search(r"<(?:\w+:)?(?:" + "|".join(CALC_PR_FOLLOWERS) + r")\b|</(?:\w+:)?workbook>", xml)
+    return xml[:follower.start()] + f'<{prefix}calcPr fullCalcOnLoad="1"/>' + xml[follower.start():]
+
+
+def patch_workbook(source: str, target: str, tables: list):
+    """ Copies the workbook source to target with the cells of tables rewritten, every other part is copied as is.
+        tables holds (sheet name, table name, first row, first column, rows, table ref).
+        The calculation chain is dropped, Excel rebuilds it when recalculating on load
+    """
+    with zipfile.ZipFile(source) as zin:
+        parts = table_parts(zin)
+        patched = {}
+        for sheet, name, first_row, first_col, rows, ref in tables:
+            sheet_part, table_part = parts[(sheet, name)]
+            xml = patched.get(sheet_part) or zin.read(sheet_part).decode("utf-8")
+            patched[sheet_part] = patch_sheet(xml, first_row, first_col, rows)
+            patched[table_part] = patch_table(zin.read(table_part).decode("utf-8"), ref)
+        workbook_rels = rels_path("xl/workbook.xml")
+        patched["xl/workbook.xml"] = patch_workbook_xml(zin.read("xl/workbook.xml").decode("utf-8"))
+        patched[workbook_rels] = re.sub(r'<Relationship\b[^>]*Target="[^"]*calcChain\.xml"[^>]*/>', "",
+                                        zin.read(workbook_rels).decode("utf-8"))
+        patched["[Content_Types].xml"] = re.sub(r'<Override\b[^>]*PartName="/xl/calcChain\.xml"[^>]*/>', "",
+                                                zin.read("[Content_Types].xml").decode("utf-8"))
+
+        temp_path = target + ".saving"
+        with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as zout:
+            for item in zin.infolist():
+                if item.filename == "xl/calcChain.xml":
+                    continue
+                if item.filename in patched:
+                    zout.writestr(item, patched[item.filename].encode("utf-8"), zipfile.ZIP_DEFLATED)
+                else:
+                    zout.writestr(item, zin.read(item))
+    os.replace(temp_path, target)
@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+
+# The scripts import each other from the Scripts folder, as when run from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Shovel_Benchmark
+
+
+@pytest.fixture
+def shovel():
+    """ Shovel_Classes, importable without the Windows only dependencies
+    """
+    return Shovel_Benchmark.import_shovel()
+
+
+def output_rows(xl, table_name: str, width: int) -> list:
+    """ Non-empty rows of a table of the extraction output held by a FakeExcel
+    """
+    sheet = xl.workbooks["Benchmark Plaxis Extraction"].sheets["Extractor"]
+    table = sheet.tables[table_name]
+    rows = sheet.read(table.header_row + 1, table.first_col, table.bottom, table.first_col + width - 1)
+    return [list(row) for row in rows if row[0] is not None]
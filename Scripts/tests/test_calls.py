@@ -0,0 +1,36 @@
+from Shovel_Benchmark import FakeExcel, FakePlaxis, build_shovel_workbooks, run_bulk_delete, simulated
+from conftest import output_rows
+
+PROPERTIES = ["M2D", "Q2D", "Nx2D"] # of the "Plate forces" profile of build_shovel_workbooks
+
+
+def extract(shovel, folder, model_count: int, element_count: int, phase_count: int) -> tuple:
+    folder.mkdir(exist_ok=True)
+    xl = FakeExcel()
+    plaxis = FakePlaxis(element_count, phase_count)
+    build_shovel_workbooks(xl, str(folder), model_count, element_count, phase_count, "Extract Data", plaxis.port)
+    with simulated(shovel, xl, plaxis):
+        shovel.Extractor("Shovel").process_flow()
+    plaxis.close()
+    assert len(output_rows(xl, "tbl_Extraction", 7)) == model_count * element_count * phase_count
+    return xl, plaxis
+
+
+def test_plaxis_is_called_once_per_result_type_and_element(shovel, tmp_path):
+    xl, plaxis = extract(shovel, tmp_path, 2, 5, 3)
+    assert plaxis.calls["getresults"] == 2 * 5 * 3 * (2 + len(PROPERTIES)) # X, Y and the properties
+    assert plaxis.calls["lookup"] <= 2 * (2 + len(PROPERTIES)) # result types are resolved once per model
+    assert plaxis.calls["open"] == 2
+
+
+def test_excel_calls_do_not_grow_with_the_rows_written(shovel, tmp_path):
+    few, _ = extract(shovel, tmp_path / "few", 2, 5, 3)
+    many, _ = extract(shovel, tmp_path / "many", 2, 50, 3)
+    assert many.calls == few.calls # each table is written in one assignment per model
+
+
+def test_bulk_delete_makes_a_few_calls_whatever_the_matches():
+    result = run_bulk_delete(10000)
+    assert result["contiguous"]["deleted"] == 1000 and result["scattered"]["deleted"] == 900
+    assert result["contiguous"]["com_calls"] < 20 # one Delete per contiguous run
+    assert result["scattered"]["com_calls"] < 20 # the survivors are rewritten at once, not 900 deletes
@@ -0,0 +1,73 @@
+import os
+from Shovel_Benchmark import FakeExcel, FakePlaxis, build_shovel_workbooks, run_resume, set_setting, simulated
+from Shovel_Checkpoint import CheckpointJournal
+from conftest import output_rows
+
+
+def test_units_are_only_journaled_once_committed(tmp_path):
+    journal = CheckpointJournal(str(tmp_path), "Project", every=2)
+    journal.start("output.xlsm", last_index=7)
+    journal.record("Model_1", "Phase_1", "Plate_1", "Plate forces", 1, 8, "Extracted")
+    assert not journal.due()
+    journal.record("Model_1", "Phase_1", "Plate_2", "Plate forces", 1, 9, "Extracted")
+    assert journal.due()
+    reloaded = CheckpointJournal(str(tmp_path), "Project")
+    assert reloaded.load() # the header alone is a journal
+    assert reloaded.completed == set()
+    assert reloaded.last_index == 7 # rows of earlier runs are not discarded on resume
+
+    journal.commit()
+    reloaded = CheckpointJournal(str(tmp_path), "Project")
+    assert reloaded.load()
+    assert reloaded.output_file == "output.xlsm"
+    assert reloaded.is_complete("Model_1", "Phase_1", "Plate_2", "Plate forces")
+    assert reloaded.last_index == 9
+    assert reloaded.models() == {"Model_1"}
+
+    journal.finish()
+    assert not journal.exists()
+
+
+def test_resume_completes_a_crashed_run_once():
+    result = run_resume(element_count=10, phase_count=3, model_count=3, checkpoint_every=7)
+    assert result["crash"]["crashed"]
+    assert result["output_ok"] # every unit once, with contiguous indexes
+    assert result["resume"]["plaxis_calls"]["getresults"] < result["crash"]["plaxis_calls"]["getresults"]
+
+
+def test_resume_replaces_the_rows_of_a_model_crashed_before_its_first_checkpoint(shovel, tmp_path):
+    """ A second run into the existing output crashes in the second model before any checkpoint in it,
+        the old rows of that model must not survive next to the new ones
+    """
+    elements, phases, models = 10, 2, 3
+    folder = str(tmp_path)
+    xl = FakeExcel()
+    plaxis = FakePlaxis(elements, phases)
+    build_shovel_workbooks(xl, folder, models, elements, phases, "Extract Data", plaxis.port)
+    with simulated(shovel, xl, plaxis):
+        shovel.Extractor("Shovel").process_flow()
+    plaxis.close()
+
+    set_setting(xl, "Existing Excel path", os.path.join(folder, "Benchmark Plaxis Extraction.xlsm"))
+    set_setting(xl, "Checkpoint every", 1000) # only checkpointed at the end of each model
+    plaxis = FakePlaxis(elements, phases, crash_after=5 * (elements * phases + 5)) # 5 calls per unit
+    set_setting(xl, "Plaxis output port", plaxis.port)
+    with simulated(shovel, xl, plaxis):
+        try:
+            shovel.Extractor("Shovel").process_flow()
+            crashed = False
+        except Exception:
+            crashed = True
+    assert crashed
+
+    plaxis = FakePlaxis(elements, phases)
+    set_setting(xl, "Plaxis output port", plaxis.port)
+    with simulated(shovel, xl, plaxis):
+        shovel.Extractor("Shovel", resume=True).process_flow()
+    plaxis.close()
+
+    extractions = output_rows(xl, "tbl_Extraction", 7)
+    units = [tuple(row[2:6]) for row in extractions]
+    assert len(units) == len(set(units)) == elements * phases * models
+    indexes = {row[0] for row in extractions}
+    assert {row[0] for row in output_rows(xl, "tbl_Data", 3)} == indexes
@@ -0,0 +1,21 @@
+import numpy as np
+from Shovel_Compare import compare_models
+
+
+def test_horizontal_elements_are_compared_along_x():
+    x = np.linspace(0, 10, 11)
+    records = [(model, "Phase [Phase_1]", "Strut_1", {'X': x, 'Y': np.full(len(x), -2.0), 'N2D': factor * x})
+               for model, factor in (("SLS", 1.0), ("ULS", 1.5))]
+    comparison = compare_models(records)
+    values = comparison.values.loc[("Strut_1", "Phase_1", "N2D")]
+    assert len(values) == len(x)
+    assert np.allclose(values["ULS"], 1.5 * values["SLS"])
+
+
+def test_walls_are_compared_along_y():
+    records = [(model, "Excavation [Phase_2]", "Plate_1", {'X': np.zeros(len(y)), 'Y': y, 'M2D': -y})
+               for model, y in (("Coarse", np.linspace(0, -20, 5)), ("Fine", np.linspace(0, -20, 41)))]
+    comparison = compare_models(records, reference="Coarse")
+    values = comparison.values.loc[("Plate_1", "Phase_2", "M2D")]
+    assert np.allclose(values["Fine"], values["Coarse"])
+    assert np.allclose(comparison.difference.loc[("Plate_1", "Phase_2", "M2D")]["Fine"], 0)
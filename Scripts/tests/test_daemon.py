@@ -0,0 +1,108 @@
+import os
+import shutil
+import socket
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+import pytest
+import toolkit
+import Shovel_Daemon
+
+SHOVEL_WB = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "Shovel.xlsm")
+
+
+def free_address() -> tuple:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return ("localhost", s.getsockname()[1])
+
+
+@pytest.fixture
+def serve(tmp_path, monkeypatch):
+    """ Starts a daemon serving the given handlers in a thread, the key is written into tmp_path
+    """
+    monkeypatch.setattr(toolkit, "user_folder", lambda: str(tmp_path))
+    started = []
+
+    def start(handlers: dict) -> tuple:
+        address = free_address()
+        daemon = Shovel_Daemon.ShovelDaemon(handlers, address)
+        thread = threading.Thread(target=daemon.serve, daemon=True)
+        thread.start()
+        for _ in range(100): # the key is written when the daemon listens
+            if Shovel_Daemon.submit({"job": "ping"}, address):
+                break
+            thread.join(0.05)
+        started.append((address, thread))
+        return address
+
+    yield start
+    for address, thread in started:
+        Shovel_Daemon.submit({"job": "stop"}, address)
+        thread.join(5)
+
+
+def test_jobs_are_dispatched_to_their_handler(serve):
+    jobs = []
+    address = serve({"load": lambda job: jobs.append(job) or "Load complete"})
+    assert Shovel_Daemon.submit({"job": "ping"}, address) == {"status": "ok", "message": "ready"}
+    assert Shovel_Daemon.run_job("load", "Shovel", "openpyxl", address=address)
+    assert jobs == [{"job": "load", "wb": "Shovel", "backend": "openpyxl", "all": False}]
+
+
+def test_errors_are_returned_to_the_client(serve):
+    def fail(job):
+        raise ValueError("no such model")
+
+    def nothing_to_do(job):
+        raise SystemExit
+
+    address = serve({"load": fail, "extract": nothing_to_do})
+    with pytest.raises(Exception, match="ValueError: no such model"):
+        Shovel_Daemon.run_job("load", "Shovel", address=address)
+    assert Shovel_Daemon.run_job("extract", "Shovel", address=address)
+    assert Shovel_Daemon.submit({"job": "unknown"}, address)["status"] == "error"
+
+
+def test_only_clients_with_the_key_are_served(serve, tmp_path):
+    address = serve({})
+    with pytest.raises(AuthenticationError):
+        Client(address, authkey=b"not the key")
+    key_file = Shovel_Daemon.authkey_path()
+    if os.name != "nt":
+        assert os.stat(key_file).st_mode & 0o777 == 0o600
+    key = Shovel_Daemon.read_authkey()
+    with open(key_file, "wb") as f:
+        f.write(b"another user's key")
+    assert Shovel_Daemon.submit({"job": "ping"}, address) is None # refused, the caller runs the job itself
+    with open(key_file, "wb") as f:
+        f.write(key)
+    assert Shovel_Daemon.submit({"job": "ping"}, address)["status"] == "ok" # still serving
+
+
+def test_openpyxl_jobs_read_the_workbook_saved_by_the_previous_job(shovel, serve, tmp_path, monkeypatch):
+    wb = str(tmp_path / "Shovel.xlsm")
+    shutil.copy(SHOVEL_WB, wb)
+    table_class = shovel.table_class("openpyxl")
+    counts = []
+
+    class Loader:
+        """ Adds one element to tbl_AllElements and saves, like a load job
+        """
+        def __init__(self, wb, load_all=False, backend="com", bp=None):
+            self.table = table_class(wb, "_system", "tbl_AllElements")
+
+        def extract_to_table(self):
+            counts.append(self.table.row_count())
+            self.table.append_rows([["Plate", "Model", f"Plate_{len(counts)}"]])
+            self.table.commit()
+
+    jobs = Shovel_Daemon.PlaxisJobs(wb, "openpyxl")
+    monkeypatch.setattr(jobs, "output", lambda: None)
+    monkeypatch.setattr(shovel, "Loader", Loader)
+    address = serve(jobs.handlers())
+    assert Shovel_Daemon.run_job("load", wb, "openpyxl", address=address)
+    assert Shovel_Daemon.run_job("load", wb, "openpyxl", address=address)
+    assert counts[1] == counts[0] + 1
+    assert table_class(wb, "_system", "tbl_AllElements").column_values("Element Name")[-2:] == ["Plate_1", "Plate_2"]
+    table_class.release()
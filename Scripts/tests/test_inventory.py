@@ -0,0 +1,92 @@
+import pytest
+from Shovel_Benchmark import FakeExcel, FakePlaxis, build_shovel_workbooks, set_setting, simulated
+
+ELEMENT_COUNT = 3000
+MODELS = ["Model_1", "Model_2", "Model_3"]
+
+
+def model_inventory(model: str, first: int = 1, count: int = ELEMENT_COUNT) -> list:
+    return [f"Phase_{p}" for p in range(1, 6)] + [f"{model} Plate_{e}" for e in range(first, first + count)]
+
+
+@pytest.fixture
+def inventory(shovel, tmp_path, monkeypatch):
+    """ Shovel workbook in a FakeExcel listing models whose Plaxis inventories are held in memory.
+        Returns (inventories, load), load(load_all) running the Loader and returning the models it opened
+    """
+    xl = FakeExcel()
+    plaxis = FakePlaxis(1, 1)
+    build_shovel_workbooks(xl, str(tmp_path), len(MODELS), 1, 1, "Load Model", plaxis.port)
+    set_setting(xl, "Incremental load", "Yes")
+    inventories = {model: model_inventory(model) for model in MODELS}
+    for model in MODELS:
+        (tmp_path / f"{model}.p2dx").write_text(model)
+    opened = []
+
+    def list_elements(self, model, path):
+        opened.append(model)
+        return list(inventories[model])
+
+    def load(load_all: bool = False) -> list:
+        opened.clear()
+        with simulated(shovel, xl, plaxis):
+            shovel.Loader("Shovel", load_all=load_all).extract_to_table()
+        return list(opened)
+
+    monkeypatch.setattr(shovel.Loader, "plx_list_elements", list_elements)
+    yield xl, inventories, load
+    plaxis.close()
+
+
+def table_inventory(xl) -> dict:
+    sheet = xl.workbooks["Shovel"].sheets["_system"]
+    table = sheet.tables["tbl_AllElements"]
+    listed = {}
+    for element_type, model, element in sheet.read(table.header_row + 1, table.first_col, table.bottom, table.last_col):
+        listed.setdefault(model, []).append(element)
+    return listed
+
+
+def test_unchanged_models_are_skipped(inventory):
+    xl, inventories, load = inventory
+    assert load() == MODELS
+    assert table_inventory(xl) == inventories
+    calls = xl.calls
+    assert load() == []
+    assert table_inventory(xl) == inventories
+    assert xl.calls - calls < 50 # a skipped model costs no table write
+
+
+def test_a_changed_model_is_reloaded_and_only_its_difference_written(inventory, tmp_path):
+    xl, inventories, load = inventory
+    load()
+    inventories["Model_2"] = model_inventory("Model_2", first=101) # 100 elements removed, 100 added
+    (tmp_path / "Model_2.p2dx").write_text("Model_2 with more plates")
+    calls = xl.calls
+    assert load() == ["Model_2"]
+    listed = table_inventory(xl)
+    assert {model: sorted(elements) for model, elements in listed.items()} == \
+           {model: sorted(elements) for model, elements in inventories.items()}
+    assert xl.calls - calls < 100 # not a write per element
+
+
+def test_a_model_no_longer_listed_is_dropped_by_a_full_load(inventory):
+    xl, inventories, load = inventory
+    load()
+    sheet = xl.workbooks["Shovel"].sheets["Plaxis_extractor"]
+    files = sheet.tables["tbl_PlaxisFiles"]
+    sheet.delete(files.bottom, files.first_col, files.bottom, files.last_col) # Model_3 is removed from the model list
+    assert load(load_all=True) == []
+    del inventories["Model_3"]
+    assert table_inventory(xl) == inventories
+
+
+def test_a_model_missing_from_the_table_is_reloaded(inventory):
+    xl, inventories, load = inventory
+    load()
+    sheet = xl.workbooks["Shovel"].sheets["_system"]
+    elements = sheet.tables["tbl_AllElements"]
+    first = elements.header_row + 1 + len(inventories["Model_1"])
+    sheet.delete(first, elements.first_col, first + len(inventories["Model_2"]) - 1, elements.last_col)
+    assert load() == ["Model_2"] # unchanged file, but its rows were deleted by hand
+    assert sorted(table_inventory(xl)["Model_2"]) == sorted(inventories["Model_2"])
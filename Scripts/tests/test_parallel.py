@@ -0,0 +1,26 @@
+from Shovel_Benchmark import FakeExcel, FakePlaxis, FakePlaxisPool, build_shovel_workbooks, set_setting, simulated
+from conftest import output_rows
+
+MODEL_COUNT = 4
+
+
+def extract(shovel, folder, plaxis, workers: int) -> tuple:
+    folder.mkdir(exist_ok=True)
+    xl = FakeExcel()
+    build_shovel_workbooks(xl, str(folder), MODEL_COUNT, plaxis.element_count, plaxis.phase_count, "Extract Data", plaxis.port)
+    set_setting(xl, "Plaxis workers", workers)
+    with simulated(shovel, xl, plaxis):
+        shovel.Extractor("Shovel").process_flow()
+    plaxis.close()
+    return output_rows(xl, "tbl_Data", 6), output_rows(xl, "tbl_Extraction", 7)
+
+
+def test_parallel_output_matches_sequential_output(shovel, tmp_path):
+    sequential_data, sequential_map = extract(shovel, tmp_path / "sequential", FakePlaxis(3, 2), 1)
+    pool = FakePlaxisPool(2, 3, 2, open_latency=0.02)
+    parallel_data, parallel_map = extract(shovel, tmp_path / "parallel", pool, 2)
+    assert len(sequential_map) == MODEL_COUNT * 3 * 2
+    assert parallel_map == sequential_map
+    assert parallel_data == sequential_data
+    assert all(plaxis.calls["open"] for plaxis in pool.servers.values()) # both workers extracted models
+    assert pool.calls["open"] == MODEL_COUNT
@@ -0,0 +1,120 @@
+import time
+import pytest
+from Shovel_Benchmark import FakeExcel, FakePlaxis, build_shovel_workbooks, set_setting, simulated
+from Shovel_Pipeline import Pipeline
+from conftest import output_rows
+
+
+def test_items_arrive_in_order():
+    assert list(Pipeline(iter(range(100)), max_items=3)) == list(range(100))
+
+
+def test_buffer_is_bounded_by_items():
+    pipeline = Pipeline(iter(range(50)), max_items=4)
+    for item in pipeline:
+        time.sleep(0.001) # slow consumer, the producer fills the buffer
+    assert 1 <= pipeline.peak_items <= 4
+
+
+def test_buffer_is_bounded_by_bytes():
+    pipeline = Pipeline(iter(range(50)), max_items=100, max_bytes=30, sizeof=lambda item: 10)
+    for item in pipeline:
+        time.sleep(0.001)
+    assert pipeline.peak_bytes <= 30
+
+
+def test_an_item_larger_than_the_limit_still_passes():
+    assert list(Pipeline(iter([1, 2]), max_bytes=0, sizeof=lambda item: 100)) == [1, 2]
+
+
+def test_producer_error_is_raised_to_the_consumer():
+    def producer():
+        yield 1
+        raise ValueError("fetch failed")
+
+    received = []
+    with pytest.raises(ValueError, match="fetch failed"):
+        for item in Pipeline(producer()):
+            received.append(item)
+    assert received == [1]
+
+
+def test_stopping_early_releases_the_producer():
+    produced = []
+
+    def producer():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    pipeline = Pipeline(producer(), max_items=2)
+    for item in pipeline:
+        if item == 5:
+            break
+    assert not pipeline.thread.is_alive()
+    assert len(produced) < 1000
+
+
+def extract(shovel, folder, depth, memory=None) -> tuple:
+    folder.mkdir(exist_ok=True)
+    folder = str(folder)
+    xl = FakeExcel()
+    plaxis = FakePlaxis(4, 3)
+    build_shovel_workbooks(xl, folder, 2, 4, 3, "Extract Data", plaxis.port)
+    set_setting(xl, "Pipeline queue depth", depth)
+    set_setting(xl, "Pipeline memory (MB)", memory)
+    with simulated(shovel, xl, plaxis):
+        extractor = shovel.Extractor("Shovel")
+        extractor.process_flow()
+    plaxis.close()
+    return extractor, output_rows(xl, "tbl_Data", 6), output_rows(xl, "tbl_Extraction", 7)
+
+
+def test_zero_settings_are_not_replaced_by_defaults(shovel, tmp_path):
+    extractor, data, extractions = extract(shovel, tmp_path, 0, 0)
+    assert extractor.pipeline_depth == 0
+    assert extractor.pipeline_max_bytes == 0
+
+
+def test_empty_settings_take_the_defaults(shovel, tmp_path):
+    extractor, data, extractions = extract(shovel, tmp_path, None, None)
+    assert extractor.pipeline_depth == 16
+    assert extractor.pipeline_max_bytes is None
+
+
+def test_pipelined_output_matches_sequential_output(shovel, tmp_path):
+    _, sequential_data, sequential_map = extract(shovel, tmp_path / "sequential", 0)
+    _, pipelined_data, pipelined_map = extract(shovel, tmp_path / "pipelined", 2, 0.0001)
+    assert len(sequential_map) == 2 * 4 * 3
+    assert pipelined_map == sequential_map
+    assert pipelined_data == sequential_data
+
+
+def test_fetching_overlaps_writing(shovel, tmp_path, monkeypatch):
+    delay = 0.04 # per element fetched, and per profile written
+    element_count = 8
+    extract_phase = shovel.PlaxisSession.extract_phase
+    write_profile = shovel.ExcelSink.write_profile
+
+    def slow_extract_phase(self, phase_str, element_props):
+        time.sleep(delay * len(element_props))
+        return extract_phase(self, phase_str, element_props)
+
+    def slow_write_profile(self, *args):
+        time.sleep(delay)
+        return write_profile(self, *args)
+
+    monkeypatch.setattr(shovel.PlaxisSession, "extract_phase", slow_extract_phase)
+    monkeypatch.setattr(shovel.ExcelSink, "write_profile", slow_write_profile)
+    xl = FakeExcel()
+    plaxis = FakePlaxis(element_count, 1)
+    build_shovel_workbooks(xl, str(tmp_path), 2, element_count, 1, "Extract Data", plaxis.port)
+    set_setting(xl, "Pipeline queue depth", 4)
+    with simulated(shovel, xl, plaxis):
+        start = time.perf_counter()
+        shovel.Extractor("Shovel").process_flow()
+        elapsed = time.perf_counter() - start
+    plaxis.close()
+    profile_count = len(output_rows(xl, "tbl_Extraction", 7))
+    assert profile_count == 2 * element_count
+    assert elapsed < 0.8 * 2 * delay * profile_count # fetching and writing in sequence would take the sum
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from Shovel_Plan import ExtractionPlan
+from Shovel_Results import ResultBlock
+
+PROFILES = {"Forces": ["M2D", "Q2D"], "Axial": ["Nx2D"]}
+
+
+def fake_fetch(calls: list):
+    def fetch(phase, element_props):
+        calls.append((phase, dict(element_props)))
+        return {element: ResultBlock({prop: np.arange(3.0) for prop in props}, phase, element)
+                for element, props in element_props.items()}
+    return fetch
+
+
+def test_each_element_is_fetched_once_per_phase_with_every_result_type():
+    extractions = [[1, "Phase_1", "Plate_1", "Forces"], [2, "Phase_1", "Plate_1", "Plate_2", "Axial"]]
+    plan = ExtractionPlan(extractions, PROFILES)
+    calls = []
+    rows = list(plan.fan_out("Phase_1", fake_fetch(calls)))
+    assert calls == [("Phase_1", {"Plate_1": ["X", "Y", "M2D", "Q2D", "Nx2D"]}),
+                     ("Phase_1", {"Plate_2": ["X", "Y", "Nx2D"]})]
+    assert plan.planned_calls == 8 and plan.naive_calls == 4 + 3 + 3
+    assert list(rows[1][1]["Plate_1"]) == ["X", "Y", "Nx2D"]
+
+
+def test_rows_are_yielded_before_the_rest_of_the_phase_is_fetched():
+    extractions = [[i, "Phase_1", f"Plate_{i}", "Forces"] for i in range(1, 4)]
+    plan = ExtractionPlan(extractions, PROFILES)
+    calls = []
+    rows = plan.fan_out("Phase_1", fake_fetch(calls))
+    ext, results = next(rows)
+    assert ext[0] == 1 and list(results) == ["Plate_1"]
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("properties", [["M2D", "M2D"], ["X", "M2D"], ["Y"]])
+def test_profiles_without_a_column_per_property_are_rejected(properties):
+    with pytest.raises(Exception, match="Profile Forces"):
+        ExtractionPlan([[1, "Phase_1", "Plate_1", "Forces"]], {"Forces": properties})
@@ -0,0 +1,98 @@
+import time
+import pytest
+from Shovel_Benchmark import FakeExcel, FakePlaxis, FakeProcess, build_shovel_workbooks, set_setting, simulated
+from conftest import output_rows
+
+
+@pytest.fixture
+def plaxis():
+    plaxis = FakePlaxis(3, 2)
+    yield plaxis
+    plaxis.close()
+
+
+def boilerplate(shovel, plaxis):
+    return shovel.Boilerplate("localhost", plaxis.port, "benchmark", "C:\\Plaxis")
+
+
+def test_wait_ready_times_out_without_server(shovel, plaxis):
+    bp = boilerplate(shovel, plaxis)
+    start = time.perf_counter()
+    assert not bp.app_wait_ready(timeout=0.2)
+    assert time.perf_counter() - start < 2
+
+
+def test_wait_ready_stops_when_the_process_exits(shovel, plaxis):
+    bp = boilerplate(shovel, plaxis)
+    bp.process = FakeProcess(exit_code=1)
+    start = time.perf_counter()
+    assert not bp.app_wait_ready(timeout=30)
+    assert time.perf_counter() - start < 2
+
+
+def test_start_reuses_a_running_server(shovel, plaxis):
+    with simulated(shovel, FakeExcel(), plaxis):
+        first = boilerplate(shovel, plaxis)
+        first.app_start(plx_output=True)
+        second = boilerplate(shovel, plaxis)
+        second.app_start(plx_output=True, reuse=True)
+        assert second.app_connected()
+        assert plaxis.calls["launch"] == 1
+        boilerplate(shovel, plaxis).app_start(plx_output=True, reuse=False)
+        assert plaxis.calls["launch"] == 2
+
+
+def test_reconnect_to_the_same_server(shovel, plaxis):
+    with simulated(shovel, FakeExcel(), plaxis):
+        bp = boilerplate(shovel, plaxis)
+        bp.app_start(plx_output=True)
+        plaxis.server.active = False # the session dropped, the server still answers
+        assert not bp.app_alive()
+        bp.app_reconnect(plx_output=True)
+        assert bp.app_alive()
+        assert plaxis.calls["launch"] == 1
+        assert plaxis.calls["new_server"] == 2
+
+
+def extract(shovel, folder: str, plaxis, model_count: int = 2) -> FakeExcel:
+    xl = FakeExcel()
+    build_shovel_workbooks(xl, folder, model_count, plaxis.element_count, plaxis.phase_count, "Extract Data", plaxis.port)
+    with simulated(shovel, xl, plaxis):
+        shovel.Extractor("Shovel").process_flow()
+    return xl
+
+
+def test_extraction_survives_a_dropped_session(shovel, tmp_path):
+    plaxis = FakePlaxis(3, 2, drop_after=10)
+    xl = extract(shovel, str(tmp_path), plaxis)
+    plaxis.close()
+    extractions = output_rows(xl, "tbl_Extraction", 7)
+    assert len(extractions) == 2 * 3 * 2
+    assert all(row[6] == "Extracted" for row in extractions)
+    assert plaxis.calls["new_server"] == 2 # reconnected once
+    assert plaxis.calls["launch"] == 1 # to the server that was still running
+
+
+def test_extraction_stops_when_plaxis_cannot_be_relaunched(shovel, tmp_path):
+    plaxis = FakePlaxis(3, 2, crash_after=10)
+    with pytest.raises(Exception):
+        extract(shovel, str(tmp_path), plaxis)
+    assert plaxis.calls["launch"] == 2 # the relaunch was attempted
+
+
+def test_a_failed_extraction_restores_excel_and_stops_the_progress(shovel, tmp_path):
+    plaxis = FakePlaxis(3, 2, crash_after=12)
+    xl = FakeExcel()
+    build_shovel_workbooks(xl, str(tmp_path), 2, plaxis.element_count, plaxis.phase_count, "Extract Data", plaxis.port)
+    set_setting(xl, "Progress display", "Log")
+    with simulated(shovel, xl, plaxis):
+        extractor = shovel.Extractor("Shovel")
+        with pytest.raises(Exception):
+            extractor.process_flow()
+    plaxis.close()
+    assert xl.ScreenUpdating and xl.Calculation == -4105
+    assert not extractor.progress.thread.is_alive()
+    sheet = xl.workbooks["Template"].sheets["Extractor"] # not saved as the extraction file yet
+    table = sheet.tables["tbl_Extraction"]
+    rows = sheet.read(table.header_row + 1, table.first_col, table.bottom, table.first_col)
+    assert len([row for row in rows if row[0] is not None]) == 2 # the rows extracted before the failure were written
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Shovel_Benchmark import run_reduction
+from Shovel_Reduce import ProfileReduction, interval_extrema, parse_level, profile_reductions
+from Shovel_Results import ResultBlock
+
+
+def wall(node_count: int = 201, seed: int = 0) -> ResultBlock:
+    """ Vertical wall from 0 to -20 m with a noisy moment
+    """
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, -20, node_count)
+    return ResultBlock({'X': np.zeros(node_count), 'Y': y, 'M2D': 100 * np.sin(y / 3) + rng.normal(0, 5, node_count)})
+
+
+@pytest.mark.parametrize("value, level", [(None, None), (np.nan, None), ("", None), (" ", None), (0, 0.0), ("-2.5", -2.5)])
+def test_parse_level(value, level):
+    assert parse_level(value) == level
+
+
+def test_interval_extrema_finds_the_first_max_and_min_of_every_interval():
+    values = np.array([1.0, 5.0, 5.0, 0.0, 3.0, -1.0, 7.0])
+    kept = sorted(interval_extrema(values, np.array([0, 3])))
+    assert kept == [0, 1, 5, 6]
+
+
+def test_window_keeps_the_nodes_between_the_levels():
+    block = ProfileReduction(top=-5, bottom=-10).apply(wall())
+    assert block['Y'].max() <= -5 and block['Y'].min() >= -10
+    assert len(block['Y']) == len(block['M2D']) == len(block['X'])
+    assert np.isclose(block['Y'].max(), -5) and np.isclose(block['Y'].min(), -10)
+
+
+def test_spacing_thins_the_nodes_and_keeps_the_ends():
+    block = wall()
+    reduced = ProfileReduction(spacing=2.0, keep_peaks=False).apply(block)
+    assert len(reduced['Y']) == 11 # one node every 2 m over 20 m, and the last one
+    assert reduced['Y'][0] == block['Y'][0] and reduced['Y'][-1] == block['Y'][-1]
+    assert np.all(np.diff(reduced['Y']) < 0) # original order
+
+
+def test_peaks_are_kept():
+    block = wall()
+    reduced = ProfileReduction(spacing=2.0).apply(block)
+    assert len(reduced['Y']) < len(block['Y'])
+    assert reduced['M2D'].max() == block['M2D'].max()
+    assert reduced['M2D'].min() == block['M2D'].min()
+
+
+def test_from_profile_reads_the_optional_columns():
+    assert ProfileReduction.from_profile({"Top Y": None, "Bottom Y": np.nan, "Spacing": None}) is None
+    reduction = ProfileReduction.from_profile({"Top Y": 0, "Bottom Y": -12, "Spacing": 0.5, "Keep peaks": "No"})
+    assert (reduction.top, reduction.bottom, reduction.spacing, reduction.keep_peaks) == (0.0, -12.0, 0.5, False)
+
+
+def test_profile_reductions_only_lists_reducing_profiles():
+    profiles = pd.DataFrame({"Name": ["Full", "Thinned"], "Spacing": [None, 1.0]})
+    assert list(profile_reductions(profiles)) == ["Thinned"]
+    assert profile_reductions(pd.DataFrame({"Name": ["Full"]})) == {}
+
+
+def test_extraction_writes_the_reduced_profiles():
+    result = run_reduction(element_count=2, phase_count=2, node_count=200, spacing=10.0)
+    assert result["reduced"]["data_rows"] < result["full"]["data_rows"]
@@ -0,0 +1,23 @@
+import numpy as np
+import Shovel_Benchmark
+from Shovel_Results import ResultBlock, stack_rows
+
+
+def test_com_rows_start_with_the_keys():
+    block = ResultBlock({'X': [0.0, 1.0, 2.0], 'Y': [5.0, 4.0, 3.0], 'M2D': [1.0, 2.0]})
+    rows = block.com_rows(7)
+    assert rows.tolist() == [[7, 0, 5, 1], [7, 1, 4, 2]] # rows stop at the shortest column
+
+
+def test_stack_rows_pads_rows_of_other_widths():
+    stacked = stack_rows([np.ones((2, 3)), [[1, 2]]])
+    assert stacked.shape == (3, 3) and stacked[2, 2] is None
+
+
+def test_arrays_take_less_memory_than_lists():
+    peak = np.ones(2**25) # 256 MB, the child of a process that peaked higher than itself still measures its own peak
+    del peak
+    result = Shovel_Benchmark.run_memory(value_count=500000)
+    lists, arrays = result["lists"]["extraction_rss_mb"], result["arrays"]["extraction_rss_mb"]
+    assert lists > 10 # measured in the child process only, whatever the size of this one
+    assert arrays < lists / 2
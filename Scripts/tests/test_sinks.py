@@ -0,0 +1,50 @@
+import csv
+import numpy as np
+import pandas as pd
+import pytest
+from Shovel_Results import ResultBlock
+from Shovel_Sinks import ColumnarSink
+
+
+def run(folder, file_format: str, model: str, profile_count: int = 3) -> list:
+    """ Writes profile_count profiles of a model as one extraction run would, returns their indexes
+    """
+    sink = ColumnarSink(str(folder), "Test", file_format)
+    sink.open()
+    indexes = []
+    with sink.model(model) as max_index:
+        for i in range(profile_count):
+            index = max_index + i + 1
+            results = ResultBlock({'X': np.zeros(4), 'Y': -np.arange(4.0), 'M2D': np.arange(4.0) * (i + 1)})
+            sink.write_profile(index, i + 1, model, "Phase_1", f"Plate_{i + 1}", "Forces", "Extracted", results)
+            indexes.append(index)
+    sink.close()
+    return indexes
+
+
+def read_data(sink_path: str, file_format: str) -> pd.DataFrame:
+    if file_format == "csv":
+        return pd.read_csv(sink_path)
+    if file_format == "parquet":
+        return pd.read_parquet(sink_path)
+    return pd.read_feather(sink_path)
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet", "feather"])
+def test_a_second_run_adds_to_the_output(tmp_path, file_format):
+    if file_format != "csv":
+        pytest.importorskip("pyarrow")
+    first = run(tmp_path, file_format, "Model_1")
+    second = run(tmp_path, file_format, "Model_2")
+    assert first == [1, 2, 3] and second == [4, 5, 6] # indexes carry on from the earlier map
+
+    sink = ColumnarSink(str(tmp_path), "Test", file_format)
+    with open(sink.map_path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ColumnarSink.map_columns # one header
+    assert [int(row[0]) for row in rows[1:]] == first + second
+    data = read_data(sink.data_path, file_format)
+    assert sorted(data["Index"].unique()) == first + second
+    assert len(data) == 6 * 4
+    assert set(data["Model"]) == {"Model_1", "Model_2"}
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(["Test Plaxis Extraction Map.csv", "Test Plaxis Extraction" + ColumnarSink.extensions[file_format]])
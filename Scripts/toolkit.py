@@ -1,10 +1,15 @@
-from ctypes import windll
+try:
+    from ctypes import windll
+except ImportError: # not on Windows, e.g. headless or benchmark runs
+    windll = None
+import os
 import re
-import win32com.client
-from tkinter import ttk, Tk, HORIZONTAL
 import logging
     
 def mbox(title, text, style=0x40000):
+    if windll is None:
+        print(f"{title}: {text}")
+        return 0
     return windll.user32.MessageBoxW(0, text, title, style)
     
 def integerize_row(lst, param):
@@ -18,28 +23,12 @@ def alphanum(str):
     #Converts a string to only alphanumeric characters without spaces
     return(re.sub(r'[^A-Za-z0-9]+', '', str))
 
-def create_window(title):
-    root = Tk()
-    root.title(title)
-
-    return root
-
-def create_progressbar(root, label, rownum, determinate=True):
-
-    ttk.Label(root,text=label).grid(row=rownum, column=0, padx=20, pady=10)
-    if determinate:
-        progress = ttk.Progressbar(root, orient=HORIZONTAL,mode='determinate',length = 400)
-    else:
-        progress = ttk.Progressbar(root, orient=HORIZONTAL,mode='indeterminate',length = 400)
-    progress.grid(row=rownum,column=1, padx=(0,10),pady=10)
-    root.update()
-    
-    return progress
-
-def step_progressbar(progressbar, step):
-
-    progressbar['value'] += step
-    progressbar._root().update()
+def user_folder():
+    #Folder of the files kept per user (%LOCALAPPDATA%\\Shovel on Windows, ~/.shovel otherwise), only accessible to the user
+    base = os.environ.get("LOCALAPPDATA")
+    folder = os.path.join(base, "Shovel") if base else os.path.join(os.path.expanduser("~"), ".shovel")
+    os.makedirs(folder, mode=0o700, exist_ok=True)
+    return folder
 
 def activate_window(root):
     root.lift()